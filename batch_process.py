@@ -0,0 +1,276 @@
+"""
+Offline batch processing of YouTube videos and transcript files
+
+Pre-generates learning materials for a whole catalog, e.g. overnight, so
+students get cache hits instead of waiting on first click. Progress is
+checkpointed so an interrupted run resumes without redoing finished items.
+
+Examples:
+    python batch_process.py --urls catalog.txt --output results.jsonl
+    python batch_process.py --jsonl items.jsonl --workers 8 --rate 30
+    python batch_process.py --transcripts lectures/*.txt --no-output
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Set
+
+from services.http_clients import HttpClients
+from services.openai_service import OpenAIService
+from services.pipeline import MaterialsPipeline
+from services.shared_cache import SharedCache
+from services.storage_service import MaterialsStore
+from services.transcript_service import TranscriptService
+from services.usage_ledger import UsageLedger, set_usage_context
+
+
+class RateLimiter:
+    """Spaces out item starts to at most `per_minute` across all workers"""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class Checkpoint:
+    """
+    Append-only JSONL log of finished item IDs
+
+    Each line is flushed and fsynced, so a crash loses at most the items that
+    were in flight.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: Set[str] = set()
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn final line from a crash
+                    if record.get("status") == "ok":
+                        self.done.add(record["id"])
+
+    def record(self, item_id: str, status: str, error: Optional[str] = None) -> None:
+        entry = {"id": item_id, "status": status, "at": time.time()}
+        if error:
+            entry["error"] = error
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            if status == "ok":
+                self.done.add(item_id)
+
+
+class JsonlWriter:
+    """Thread-safe JSONL output"""
+
+    def __init__(self, path: str):
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict) -> None:
+        with self._lock:
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def read_items(args, extract_video_id) -> Iterator[Dict]:
+    """
+    Yield work items from every input source
+
+    Items are dicts with 'id' plus either 'youtube_url' or 'transcript' and
+    'video_title'. IDs match the API's video_id, so checkpoints stay valid
+    across runs and inputs. A line that can't be read becomes an item with
+    an 'error' (and a '<file>:<line>' ID) instead of stopping the run, and
+    so does a file that can't be opened (with the path as its ID).
+    """
+    for path in args.urls or []:
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line_number, line in enumerate(f, 1):
+                    url = line.strip()
+                    if url and not url.startswith("#"):
+                        try:
+                            yield {"id": extract_video_id(url), "youtube_url": url}
+                        except ValueError as e:
+                            yield {"id": f"{path}:{line_number}", "error": f"{e}: {url[:200]}"}
+        except OSError as e:
+            yield {"id": path, "error": f"Can't read input file: {e}"}
+
+    for path in args.transcripts or []:
+        try:
+            with open(path, encoding="utf-8") as f:
+                transcript = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            yield {"id": path, "error": f"Can't read input file: {e}"}
+            continue
+        title = os.path.splitext(os.path.basename(path))[0].replace("_", " ")
+        yield {
+            "id": MaterialsStore.content_hash(transcript)[:16],
+            "transcript": transcript,
+            "video_title": title
+        }
+
+    for path in args.jsonl or []:
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line_number, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        yield _jsonl_item(json.loads(line), extract_video_id)
+                    except (ValueError, TypeError, AttributeError) as e:
+                        # json.JSONDecodeError is a ValueError
+                        yield {"id": f"{path}:{line_number}", "error": str(e)}
+        except OSError as e:
+            yield {"id": path, "error": f"Can't read input file: {e}"}
+
+
+def _jsonl_item(record: Dict, extract_video_id) -> Dict:
+    if "youtube_url" in record:
+        return {"id": extract_video_id(record["youtube_url"]), "youtube_url": record["youtube_url"]}
+    if "transcript" in record:
+        return {
+            "id": MaterialsStore.content_hash(record["transcript"])[:16],
+            "transcript": record["transcript"],
+            "video_title": record.get("video_title", "Video Learning Materials")
+        }
+    raise ValueError("expected 'youtube_url' or 'transcript'")
+
+
+def process_item(pipeline: MaterialsPipeline, item: Dict, use_cache: bool) -> Dict:
+    """Run one item through the same pipeline the API uses"""
+    if "youtube_url" in item:
+        if use_cache:
+            return pipeline.process_video(item["youtube_url"], item["id"])
+        return pipeline.generate_from_video(item["youtube_url"], item["id"])
+
+    if use_cache:
+        return pipeline.process_transcript(item["transcript"], item["video_title"])
+    return pipeline.generate_from_transcript(item["transcript"], item["video_title"])
+
+
+def run(args, pipeline: MaterialsPipeline) -> Dict[str, int]:
+    """Process all pending items; returns counts of ok / failed / skipped"""
+    checkpoint = Checkpoint(args.checkpoint)
+    writer = JsonlWriter(args.output) if args.output else None
+    limiter = RateLimiter(args.rate)
+    counts = {"ok": 0, "failed": 0, "skipped": 0}
+
+    pending: List[Dict] = []
+    seen: Set[str] = set()
+    for item in read_items(args, pipeline.transcript_service.extract_video_id):
+        if item["id"] in checkpoint.done or item["id"] in seen:
+            counts["skipped"] += 1
+            continue
+        seen.add(item["id"])
+        if "error" in item:
+            counts["failed"] += 1
+            checkpoint.record(item["id"], "error", item["error"])
+            print(f"  FAILED {item['id']}: {item['error']}", file=sys.stderr)
+            continue
+        pending.append(item)
+
+    print(f"{len(pending)} items to process, {counts['skipped']} already done")
+
+    def work(item: Dict) -> Dict:
+        limiter.wait()
+        set_usage_context("batch", "batch", item["id"])
+        return process_item(pipeline, item, args.cache)
+
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            futures = {executor.submit(work, item): item for item in pending}
+            for future in as_completed(futures):
+                item = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    counts["failed"] += 1
+                    checkpoint.record(item["id"], "error", str(e))
+                    print(f"  FAILED {item['id']}: {e}", file=sys.stderr)
+                    continue
+
+                if writer:
+                    writer.write({"id": item["id"], "result": result})
+                checkpoint.record(item["id"], "ok")
+                counts["ok"] += 1
+                print(f"  ok {item['id']} ({counts['ok'] + counts['failed']}/{len(pending)})")
+    finally:
+        if writer:
+            writer.close()
+
+    return counts
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Batch-generate learning materials with checkpoint/resume")
+    parser.add_argument("--urls", nargs="*", help="Text files with one YouTube URL per line")
+    parser.add_argument("--transcripts", nargs="*", help="Plain-text transcript files (title from file name)")
+    parser.add_argument("--jsonl", nargs="*", help="JSONL files of {youtube_url} or {transcript, video_title}")
+    parser.add_argument("--output", default="batch_results.jsonl", help="JSONL file results are appended to")
+    parser.add_argument("--no-output", dest="output", action="store_const", const=None,
+                        help="Don't write a JSONL file (only warm the result cache)")
+    parser.add_argument("--no-cache", dest="cache", action="store_false",
+                        help="Don't read or write the shared result cache")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent items (default: 4)")
+    parser.add_argument("--rate", type=float, default=0, help="Max items started per minute (default: unlimited)")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if not (args.urls or args.transcripts or args.jsonl):
+        parser.error("provide at least one of --urls, --transcripts or --jsonl")
+    if not args.output and not args.cache:
+        parser.error("--no-output with --no-cache would discard every result")
+    if not args.checkpoint:
+        args.checkpoint = (args.output or "batch_cache_warm") + ".checkpoint"
+
+    http_clients = HttpClients()
+    http_clients.start()
+    usage_ledger = UsageLedger()
+    try:
+        pipeline = MaterialsPipeline(
+            TranscriptService(http_clients.youtube),
+            OpenAIService(http_clients.groq, usage_ledger),
+            MaterialsStore(),
+            SharedCache()
+        )
+        counts = run(args, pipeline)
+    finally:
+        http_clients.close()
+        usage_ledger.close()
+    print(f"\nDone: {counts['ok']} ok, {counts['failed']} failed, {counts['skipped']} skipped")
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
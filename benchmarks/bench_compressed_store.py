@@ -0,0 +1,158 @@
+"""
+Benchmark the compressed in-memory cache: memory saved vs hit-path cost
+
+Builds the entries the shared cache holds per video (the transcript entry with
+its segment index, six section extractions and the final materials), with
+Zipf-distributed text like bench_search. For each codec, reports the bytes held
+against keeping the JSON uncompressed and against keeping parsed objects, plus
+the cost of a hit: decompression alone and the full get_json, next to a hit on
+the SQLite shared cache the front sits in front of.
+
+Usage:
+    python -m benchmarks.bench_compressed_store [videos] [transcript_words] [--write-dictionary PATH]
+"""
+import argparse
+import base64
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.bench_search import _text, _vocabulary
+from services import compressed_store
+from services.compressed_store import CompressedStore
+from services.segment_store import SegmentsBuilder
+from services.shared_cache import SharedCache
+
+
+def _entries(videos: int, transcript_words: int, seed: int = 11) -> dict:
+    """Shared cache key -> JSON bytes, shaped like the pipeline's entries"""
+    rng = random.Random(seed)
+    vocabulary = _vocabulary(random.Random(0))
+    rng.shuffle(vocabulary)
+    weights, total = [], 0.0
+    for rank in range(1, len(vocabulary) + 1):
+        total += 1.0 / rank
+        weights.append(total)
+
+    def text(words):
+        return _text(rng, vocabulary, weights, words)
+
+    def quiz(count):
+        return [
+            {"question": text(12) + "?", "options": [text(4) for _ in range(4)], "correct_answer": ""}
+            for _ in range(count)
+        ]
+
+    entries = {}
+    for v in range(videos):
+        builder = SegmentsBuilder()
+        for n in range(transcript_words // 12):
+            builder.add(text(12), start=n * 4.0, duration=4.0)
+        entries[f"transcript:video{v}"] = {
+            "title": text(6),
+            "duration": "0:40:00",
+            "segments": base64.b64encode(builder.build().to_bytes()).decode("ascii"),
+        }
+        for c in range(6):
+            entries[f"chunk:v1:video{v}:{c}"] = {
+                "summary": text(50), "points": [text(10) for _ in range(4)],
+                "notes": [text(45) for _ in range(2)], "quiz": quiz(3),
+            }
+        entries[f"result:video:video{v}"] = {
+            "summary": text(250), "key_points": [text(10) for _ in range(5)],
+            "notes": [text(50) for _ in range(7)], "quiz": quiz(10),
+            "video_title": text(6), "duration": "0:40:00", "video_id": f"video{v}",
+        }
+    return {key: json.dumps(value).encode("utf-8") for key, value in entries.items()}
+
+
+def _object_bytes(entries: dict) -> int:
+    """Python heap taken by the same entries held as parsed objects"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    parsed = {key: json.loads(value) for key, value in entries.items()}
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del parsed
+    return size
+
+
+def _hit_costs(get, keys, rounds: int = 3) -> float:
+    """Median microseconds per hit"""
+    timings = []
+    for _ in range(rounds):
+        for key in keys:
+            started = time.perf_counter()
+            get(key)
+            timings.append((time.perf_counter() - started) * 1e6)
+    return statistics.median(timings)
+
+
+def _codecs(samples):
+    configs = [("zlib-1", "zlib", 1, b""), ("zlib-3", "zlib", 3, b""), ("zlib-6", "zlib", 6, b"")]
+    configs.append(("zlib-3+dict", "zlib", 3, CompressedStore.build_dictionary(samples)))
+    if compressed_store.zstandard is not None:
+        configs += [("zstd-3", "zstd", 3, b""), ("zstd-9", "zstd", 9, b"")]
+        configs.append(("zstd-3+dict", "zstd", 3, CompressedStore.build_dictionary(samples, 112 * 1024)))
+    return configs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("videos", type=int, nargs="?", default=100)
+    parser.add_argument("transcript_words", type=int, nargs="?", default=6000)
+    parser.add_argument("--write-dictionary", metavar="PATH",
+                        help="write a preset dictionary built from the sample entries (MEMORY_CACHE_DICTIONARY_PATH)")
+    args = parser.parse_args()
+
+    entries = _entries(args.videos, args.transcript_words)
+    raw = sum(len(v) for v in entries.values())
+    objects = _object_bytes(entries)
+    # Small entries are where a dictionary helps; train on a different sample
+    samples = [v for k, v in _entries(20, args.transcript_words, seed=3).items() if not k.startswith("transcript:")]
+    if args.write_dictionary:
+        with open(args.write_dictionary, "wb") as f:
+            f.write(CompressedStore.build_dictionary(samples))
+        print(f"wrote dictionary to {args.write_dictionary}")
+
+    kinds = {
+        "transcript": [k for k in entries if k.startswith("transcript:")],
+        "chunk": [k for k in entries if k.startswith("chunk:")],
+        "result": [k for k in entries if k.startswith("result:")],
+    }
+    print(f"{len(entries)} entries for {args.videos} videos: {raw / 1e6:.1f}MB as JSON, "
+          f"{objects / 1e6:.1f}MB as parsed objects")
+
+    plain = dict(entries)
+    print(f"{'uncompressed dict':16} held={raw / 1e6:6.1f}MB           "
+          + "  ".join(f"{kind} get_json={_hit_costs(lambda k: json.loads(plain[k]), keys):7.1f}us"
+                      for kind, keys in kinds.items()))
+
+    for label, codec, level, zdict in _codecs(samples):
+        store = CompressedStore(max_bytes=1 << 40, codec=codec, level=level, zdict=zdict)
+        started = time.perf_counter()
+        for key, value in entries.items():
+            store.put(key, value)
+        put_us = (time.perf_counter() - started) * 1e6 / len(entries)
+        held = store.compressed_bytes + len(store.zdict or b"")
+        costs = []
+        for kind, keys in kinds.items():
+            blobs = [store._entries[k][0] for k in keys]
+            decompress = _hit_costs(store.decompress, blobs)
+            costs.append(f"{kind} decompress={decompress:6.1f}us get_json={_hit_costs(store.get_json, keys):7.1f}us")
+        print(f"{label:16} held={held / 1e6:6.1f}MB ({raw / held:4.1f}x) put={put_us:6.1f}us  " + "  ".join(costs))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = SharedCache(os.path.join(tmp, "shared.db"))
+        for key, value in entries.items():
+            cache.set(key, value)
+        print(f"{'sqlite (no front)':16} " + " " * 32
+              + "  ".join(f"{kind} get_json={_hit_costs(cache.get_json, keys):7.1f}us" for kind, keys in kinds.items()))
+
+
+if __name__ == "__main__":
+    main()
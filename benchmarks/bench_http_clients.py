@@ -0,0 +1,82 @@
+"""
+Benchmark per-request upstream latency: fresh connections vs pooled clients
+
+A local HTTP server adds a fixed delay to every *new* connection to stand in
+for DNS + TCP + TLS setup against a remote upstream, so the numbers show what
+keep-alive pooling saves per call.
+
+Usage:
+    python -m benchmarks.bench_http_clients [requests] [connect_ms]
+"""
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import requests
+
+from services.http_clients import HttpClients
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    connect_delay = 0.05
+
+    def setup(self):
+        # Charged once per connection, like a TLS handshake
+        time.sleep(self.connect_delay)
+        super().setup()
+
+    def do_GET(self):
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_HEAD = do_GET
+
+    def log_message(self, *args):
+        pass
+
+
+def _measure(label: str, call, count: int) -> None:
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    print(
+        f"{label:34} p50={statistics.median(timings):7.2f}ms "
+        f"p95={timings[int(len(timings) * 0.95) - 1]:7.2f}ms"
+    )
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    _Handler.connect_delay = (float(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1000
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    print(f"Simulated connection setup: {_Handler.connect_delay * 1000:.0f}ms, {count} requests each")
+
+    clients = HttpClients()
+    clients.start()
+    try:
+        _measure("requests, new connection per call", lambda: requests.get(url), count)
+        _measure("requests, pooled session", lambda: clients.youtube.get(url), count)
+        _measure("httpx, new client per call", lambda: httpx.get(url), count)
+        _measure("httpx, pooled client", lambda: clients.groq.get(url), count)
+    finally:
+        clients.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Benchmark prompt layout: time to first token and prompt cost with prefix caching
+
+Sends the same mixed workload (full-materials prompts and section-merge
+prompts for different videos) to the fake provider twice: once laid out as
+before the prompt templates, with the generation instructions after the
+transcript and the merge prompt opening with the video title, and once with
+the templates from services.prompts, which keep every static
+instruction ahead of the per-request content. The fake caches prompt prefixes
+in 128-token blocks like providers with automatic prompt caching, and charges
+prefill time only for uncached tokens.
+
+Usage:
+    python -m benchmarks.bench_prompt_cache [videos] [prefill_tokens_per_second] [cached_token_price]
+"""
+import json
+import statistics
+import sys
+import time
+
+import httpx
+
+from benchmarks.fake_upstreams import FakeConfig, FakeUpstreams, fake_transcript
+from services import prompts
+
+
+def legacy_materials(transcript: str, video_title: str):
+    """Materials prompt as built before the prompt templates (instructions after the transcript)"""
+    return [
+        {"role": "system", "content": prompts._MATERIALS_RULES},
+        {"role": "user", "content": f"""Video Title: {video_title}
+
+Transcript:
+{transcript}
+
+Generate:
+1. A 3-paragraph summary (high-level overview of the content)
+2. 5 key points (brief, one-line insights - keep these SHORT)
+3. 7 detailed study notes (COMPREHENSIVE and DETAILED - each should be 2-4 sentences with examples, context, explanations, and real-world applications)
+4. 10 multiple-choice quiz questions (varied difficulty levels)
+
+Return as JSON only."""},
+    ]
+
+
+def legacy_merge(sections: str, video_title: str):
+    """Section-merge prompt as built before the prompt templates (title first)"""
+    return [
+        {"role": "system", "content": prompts._MATERIALS_RULES},
+        {"role": "user", "content": f"""Video Title: {video_title}
+
+The transcript was analyzed section by section, in order. Section extractions:
+{sections}
+
+Using only these extractions, generate for the whole video:
+1. A 3-paragraph summary (high-level overview of the content)
+2. 5 key points (brief, one-line insights - keep these SHORT)
+3. 7 detailed study notes (COMPREHENSIVE and DETAILED - each should be 2-4 sentences)
+4. 10 multiple-choice quiz questions covering all sections (reuse or improve the candidate questions)
+
+Return as JSON only."""},
+    ]
+
+
+def _workload(videos: int):
+    """(transcript, sections, title) per video"""
+    work = []
+    for i in range(videos):
+        transcript = " ".join(e["text"] for e in fake_transcript(f"bench{i}", 1200))
+        sections = "\n\n".join(
+            f"Section {n + 1}:\n" + json.dumps({"summary": e["text"], "points": [e["text"][:40]]})
+            for n, e in enumerate(fake_transcript(f"sections{i}", 400)[:6])
+        )
+        work.append((transcript, sections, f"Lecture {i}"))
+    return work
+
+
+def _ttft(client: httpx.Client, url: str, messages) -> tuple:
+    """Seconds to the first streamed token, plus the reply's usage"""
+    started = time.perf_counter()
+    first = None
+    usage = {}
+    with client.stream("POST", url, json={"model": "fake-model", "messages": messages, "stream": True}) as response:
+        for line in response.iter_lines():
+            if not line.startswith("data: ") or line == "data: [DONE]":
+                continue
+            chunk = json.loads(line[6:])
+            if first is None and chunk["choices"][0]["delta"].get("content"):
+                first = time.perf_counter() - started
+            usage = chunk.get("usage") or usage
+    return first, usage
+
+
+def _run(label: str, build, work, prefill: float, cached_price: float) -> None:
+    upstreams = FakeUpstreams(FakeConfig(latency_ms=20, tokens_per_second=0, prefill_tokens_per_second=prefill)).start()
+    url = f"{upstreams.url}/openai/v1/chat/completions"
+    ttfts, prompt_tokens, cached_tokens = [], 0, 0
+    try:
+        with httpx.Client(timeout=60) as client:
+            for transcript, sections, title in work:
+                for messages in build(transcript, sections, title):
+                    ttft, usage = _ttft(client, url, messages)
+                    ttfts.append(ttft * 1000)
+                    prompt_tokens += usage["prompt_tokens"]
+                    cached_tokens += usage["prompt_tokens_details"]["cached_tokens"]
+    finally:
+        upstreams.stop()
+    ttfts.sort()
+    cost = (prompt_tokens - cached_tokens) + cached_tokens * cached_price
+    print(
+        f"{label:22} TTFT p50={statistics.median(ttfts):6.1f}ms mean={statistics.mean(ttfts):6.1f}ms  "
+        f"prompt tokens={prompt_tokens} cached={cached_tokens} ({cached_tokens / prompt_tokens:5.1%})  "
+        f"billed-equivalent={cost:,.0f}"
+    )
+
+
+def _build_time(build, work, rounds: int = 200, repeats: int = 7) -> float:
+    """Best-of-repeats microseconds per prompt"""
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for transcript, sections, title in work:
+                build(transcript, sections, title)
+        best = min(best, time.perf_counter() - started)
+    return best * 1e6 / (rounds * len(work) * 2)
+
+
+def main():
+    videos = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    prefill = float(sys.argv[2]) if len(sys.argv) > 2 else 4000
+    cached_price = float(sys.argv[3]) if len(sys.argv) > 3 else 0.5
+    work = _workload(videos)
+
+    def legacy(transcript, sections, title):
+        return [legacy_materials(transcript, title), legacy_merge(sections, title)]
+
+    def templates(transcript, sections, title):
+        return [
+            prompts.MATERIALS.messages(transcript=transcript, video_title=title),
+            prompts.MERGE_EXTRACTIONS.messages(sections=sections, video_title=title),
+        ]
+
+    print(f"{videos} videos x 2 prompts, prefill {prefill:.0f} tok/s for uncached tokens, "
+          f"cached tokens billed at {cached_price:.0%}")
+    _run("before (legacy layout)", legacy, work, prefill, cached_price)
+    _run(f"after ({prompts.PROMPT_VERSION} templates)", templates, work, prefill, cached_price)
+    print(f"prompt build: legacy {_build_time(legacy, work):.1f}us, "
+          f"templates {_build_time(templates, work):.1f}us per prompt")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark quiz post-processing: full retries before and after repair
+
+Replays a bundled corpus of model replies (benchmarks/data/quiz_responses.json)
+with the usual failure modes: answers given as a letter or paraphrase, labelled
+options, three or five options, duplicate options or questions, nine or eleven
+questions, missing answers. Each reply goes through the old answer fixer and
+through QuizPostProcessor, then through response validation.
+
+Before: any validation failure costs a full retry, and unmatched answers were
+silently set to the first option. After: repairable questions are fixed, and
+replies short of questions need only a small top-up call for the gap.
+
+Usage:
+    python -m benchmarks.bench_quiz_repair [corpus.json]
+"""
+import copy
+import json
+import os
+import sys
+import time
+
+from config import settings
+from services.openai_service import OpenAIService
+from services.quiz_postprocessor import QuizPostProcessor
+
+CORPUS = os.path.join(os.path.dirname(__file__), "data", "quiz_responses.json")
+
+
+def legacy_fix_quiz_answers(result):
+    """The answer fixer OpenAIService used before QuizPostProcessor; returns blind guesses made"""
+    guesses = 0
+    for q in result.get("quiz", []):
+        if "correct_answer" not in q or "options" not in q:
+            continue
+        correct, options = q["correct_answer"], q["options"]
+        if correct in options:
+            continue
+        for opt in options:
+            if opt.lower().strip() == correct.lower().strip():
+                q["correct_answer"] = opt
+                break
+        else:
+            for opt in options:
+                if correct.lower() in opt.lower() or opt.lower() in correct.lower():
+                    q["correct_answer"] = opt
+                    break
+            else:
+                q["correct_answer"] = options[0]
+                guesses += 1
+    return guesses
+
+
+def _valid(service, result) -> bool:
+    try:
+        service._validate_response(result)
+        return True
+    except (ValueError, KeyError, TypeError):
+        return False
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else CORPUS
+    with open(path, encoding="utf-8") as f:
+        corpus = [item["response"] for item in json.load(f)]
+
+    service = OpenAIService()
+    processor = QuizPostProcessor()
+
+    before_rejected = before_guesses = 0
+    for response in corpus:
+        result = copy.deepcopy(response)
+        before_guesses += legacy_fix_quiz_answers(result)
+        before_rejected += not _valid(service, result)
+
+    after_rejected = top_ups = gap_questions = 0
+    totals = {}
+    started = time.perf_counter()
+    for n, response in enumerate(corpus):
+        result = copy.deepcopy(response)
+        result["quiz"], stats = processor.repair(result["quiz"], settings.REQUIRED_QUIZ_QUESTIONS)
+        for name, value in stats.items():
+            totals[name] = totals.get(name, 0) + value
+        if stats["missing"]:
+            # Stand in for the top-up call with questions that are already valid
+            top_ups += 1
+            gap_questions += stats["missing"]
+            filler = [
+                {"question": f"Top-up question {n}.{i}?", "options": [f"{c}{n}x{i}" for c in "wxyz"],
+                 "correct_answer": f"w{n}x{i}"}
+                for i in range(stats["missing"])
+            ]
+            more, _ = processor.repair(filler, settings.REQUIRED_QUIZ_QUESTIONS, existing=result["quiz"])
+            result["quiz"] += more
+        after_rejected += not _valid(service, result)
+    repair_ms = (time.perf_counter() - started) * 1000 / len(corpus)
+
+    count = len(corpus)
+    print(f"{count} model replies from {path}")
+    print(f"before: {before_rejected / count:6.1%} rejected (full retry), {before_guesses} answers guessed as option A")
+    print(f"after:  {after_rejected / count:6.1%} rejected (full retry), {top_ups / count:6.1%} needed a top-up "
+          f"call for {gap_questions} questions, 0 answers guessed")
+    print("repairs: " + ", ".join(f"{name}={value}" for name, value in totals.items()))
+    print(f"repair cost: {repair_ms:.3f}ms per reply")
+    print("(remaining rejections fail checks outside the quiz, e.g. key point count)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark full-text search latency over a large materials store
+
+Usage:
+    python -m benchmarks.bench_search [num_videos] [db_path]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from services.storage_service import MaterialsStore
+
+TOPIC_WORDS = (
+    "algorithm network neural gradient descent matrix vector calculus derivative "
+    "integral probability statistics regression classification cluster entropy "
+    "photosynthesis cell protein enzyme genome evolution ecology climate energy "
+    "economics market supply demand inflation history revolution empire democracy "
+    "language grammar poetry novel physics quantum relativity particle chemistry"
+).split()
+
+
+def _vocabulary(rng: random.Random, size: int = 30_000) -> list:
+    """Topic words plus random filler words, ranked for a Zipf-like draw"""
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    filler = {"".join(rng.choice(letters) for _ in range(rng.randint(3, 10))) for _ in range(size)}
+    return sorted(filler) + TOPIC_WORDS
+
+
+def _text(rng: random.Random, vocabulary: list, weights: list, words: int) -> str:
+    return " ".join(rng.choices(vocabulary, cum_weights=weights, k=words))
+
+
+def populate(store: MaterialsStore, count: int, seed: int = 7) -> None:
+    """Insert synthetic videos with realistic field sizes"""
+    rng = random.Random(seed)
+    vocabulary = _vocabulary(random.Random(0))
+    rng.shuffle(vocabulary)
+    cum_weights, total = [], 0.0
+    for rank in range(1, len(vocabulary) + 1):
+        total += 1.0 / rank
+        cum_weights.append(total)
+
+    for i in range(count):
+        response = {
+            "summary": _text(rng, vocabulary, cum_weights, 250),
+            "key_points": [_text(rng, vocabulary, cum_weights, 10) for _ in range(5)],
+            "notes": [_text(rng, vocabulary, cum_weights, 50) for _ in range(7)],
+            "quiz": [],
+            "video_title": _text(rng, vocabulary, cum_weights, 6),
+            "duration": "0:20:00",
+        }
+        store.save(f"video{seed + i}", f"transcript {seed + i}", response)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    db_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(tempfile.mkdtemp(), "bench.db")
+    store = MaterialsStore(db_path)
+
+    existing = store._conn().execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+    if existing < count:
+        print(f"Populating {count - existing} videos into {db_path}...")
+        start = time.perf_counter()
+        populate(store, count - existing, seed=existing)
+        print(f"  done in {time.perf_counter() - start:.1f}s")
+
+    queries = ["neural network", "photosynthesis", "quantum relativity", "supply demand inflation", "gradi"]
+    for query in queries:
+        timings = []
+        for page in range(20):
+            start = time.perf_counter()
+            store.search(query, limit=10, offset=(page % 5) * 10)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        print(
+            f"{query!r:28} p50={statistics.median(timings):6.2f}ms "
+            f"p95={timings[int(len(timings) * 0.95) - 1]:6.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+"""
+Local stand-ins for Groq and YouTube, for load tests that must run offline
+
+One HTTP server answers:
+    POST /openai/v1/chat/completions   Groq (OpenAI-compatible) chat completions
+    POST /v1/chat/completions          same, at the plain OpenAI path
+    GET  /transcripts/{video_id}       caption entries, as TRANSCRIPT_SOURCE_URL expects
+    GET  /videos/{video_id}            title and duration
+
+Completions are shaped for whichever prompt the app sent (full materials,
+chunk extraction, quiz top-up, course merge or Q&A) and are deterministic per prompt.
+Latency, token rate and fault injection (5xx, 429, malformed JSON) are
+configurable. Video IDs starting with "missing" have no transcript.
+
+Like providers with automatic prompt caching, the fake remembers prompt
+prefixes in 128-token blocks: tokens of a previously seen prefix are reported
+as usage.prompt_tokens_details.cached_tokens and skip the simulated prefill
+time (--prefill-tokens-per-second). "stream": true is answered with
+server-sent events, so time to first token can be measured.
+
+Usage:
+    python -m benchmarks.fake_upstreams [--port 9100] [--latency-ms 300] [--error-rate 0.02] ...
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+WORDS = (
+    "gradient descent model training loss function learning rate neural network layer "
+    "weights bias activation backpropagation dataset validation overfitting regularization "
+    "matrix vector probability distribution inference optimization batch epoch feature"
+).split()
+
+
+class FakeConfig:
+    """Latency and fault settings shared by every request"""
+
+    def __init__(self, latency_ms: float = 300, tokens_per_second: float = 400, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, malformed_rate: float = 0.0, youtube_latency_ms: float = 80,
+                 transcript_words: int = 3000, prefill_tokens_per_second: float = 0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.malformed_rate = malformed_rate
+        self.youtube_latency_ms = youtube_latency_ms
+        self.transcript_words = transcript_words
+        self.prefill_tokens_per_second = prefill_tokens_per_second
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+
+class PrefixCache:
+    """Prompt prefixes seen recently, as chained hashes of fixed-size blocks"""
+
+    BLOCK_CHARS = 512  # about 128 tokens at 4 characters per token
+
+    def __init__(self, capacity: int = 50_000):
+        self.capacity = capacity
+        self._blocks: "OrderedDict[bytes, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup_and_store(self, prompt: str) -> int:
+        """Characters of `prompt` covered by cached blocks; then caches all of its blocks"""
+        digest = hashlib.sha256()
+        cached, hit = 0, True
+        with self._lock:
+            for end in range(self.BLOCK_CHARS, len(prompt) + 1, self.BLOCK_CHARS):
+                digest.update(prompt[end - self.BLOCK_CHARS:end].encode("utf-8"))
+                key = digest.copy().digest()
+                if hit and key in self._blocks:
+                    cached = end
+                    self._blocks.move_to_end(key)
+                else:
+                    hit = False
+                    self._blocks[key] = None
+            while len(self._blocks) > self.capacity:
+                self._blocks.popitem(last=False)
+        return cached
+
+
+def _rng_for(text: str) -> random.Random:
+    return random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+
+
+def _sentence(rng: random.Random, words: int = 12) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _quiz(rng: random.Random, count: int) -> List[Dict]:
+    quiz = []
+    for i in range(count):
+        options = [f"{rng.choice(WORDS)} {rng.choice(WORDS)} {n}" for n in range(4)]
+        quiz.append({
+            "question": f"Question {i + 1}: what does {rng.choice(WORDS)} {rng.choice(WORDS)} affect?",
+            "options": options,
+            "correct_answer": rng.choice(options),
+        })
+    return quiz
+
+
+def fake_completion(messages: List[Dict]) -> str:
+    """Reply text shaped for the app prompt in `messages`"""
+    system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+    user = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+    rng = _rng_for(system + user)
+
+    if "teaching assistant" in system:
+        return " ".join(_sentence(rng) for _ in range(3))
+    if "write multiple-choice quiz questions" in system:
+        wanted = re.search(r"Write (\d+) new questions", user)
+        return json.dumps({"quiz": _quiz(rng, int(wanted.group(1)) if wanted else 3)})
+    if "one section of a lecture transcript" in system:
+        payload = {
+            "summary": " ".join(_sentence(rng) for _ in range(2)),
+            "points": [_sentence(rng, 6) for _ in range(3)],
+            "notes": [" ".join(_sentence(rng) for _ in range(2)) for _ in range(2)],
+            "quiz": _quiz(rng, 3),
+        }
+    elif "combine summaries" in system:
+        payload = {
+            "title": _sentence(rng, 4).rstrip("."),
+            "summary": "\n\n".join(_sentence(rng, 30) for _ in range(2)),
+            "key_points": [_sentence(rng, 6) for _ in range(6)],
+        }
+    else:
+        payload = {
+            "summary": "\n\n".join(" ".join(_sentence(rng) for _ in range(4)) for _ in range(3)),
+            "key_points": [_sentence(rng, 6) for _ in range(5)],
+            "notes": [" ".join(_sentence(rng) for _ in range(3)) for _ in range(7)],
+            "quiz": _quiz(rng, 10),
+        }
+    return json.dumps(payload)
+
+
+def fake_transcript(video_id: str, words: int) -> List[Dict]:
+    """Caption entries of about `words` words, the same every time for a video"""
+    rng = _rng_for(video_id)
+    entries = []
+    start = 0.0
+    for _ in range(max(1, words // 10)):
+        entries.append({"text": _sentence(rng, 10), "start": round(start, 2), "duration": 4.0})
+        start += 4.0
+    return entries
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    @property
+    def config(self) -> FakeConfig:
+        return self.server.config
+
+    def _send_json(self, status: int, payload, headers: Dict[str, str] = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        match = re.fullmatch(r"/(transcripts|videos)/([\w-]+)", self.path.split("?")[0])
+        if not match:
+            self._send_json(404, {"error": "not found"})
+            return
+        time.sleep(self.config.youtube_latency_ms / 1000)
+        kind, video_id = match.groups()
+        if kind == "videos":
+            self._send_json(200, {"title": f"Lecture {video_id}", "duration": "0:42:00"})
+        elif video_id.startswith("missing"):
+            self._send_json(404, {"error": "transcripts disabled"})
+        else:
+            self._send_json(200, fake_transcript(video_id, self.config.transcript_words))
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.split("?")[0] not in ("/openai/v1/chat/completions", "/v1/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        request = json.loads(body or b"{}")
+        messages = request.get("messages", [])
+        config = self.config
+
+        time.sleep(config.latency_ms / 1000)
+        draw = config.draw()
+        if draw < config.error_rate:
+            self._send_json(500, {"error": {"message": "injected upstream error", "type": "server_error"}})
+            return
+        draw -= config.error_rate
+        if draw < config.rate_limit_rate:
+            self._send_json(
+                429, {"error": {"message": "injected rate limit", "type": "rate_limit_exceeded"}},
+                headers={"Retry-After": "1"}
+            )
+            return
+        draw -= config.rate_limit_rate
+
+        content = fake_completion(messages)
+        if draw < config.malformed_rate:
+            content = content[: len(content) // 2]  # cut off mid-object, like a truncated reply
+
+        prompt = "".join(f"{m.get('role')}\n{m.get('content', '')}\n" for m in messages)
+        prompt_tokens = len(prompt) // 4
+        cached_tokens = self.server.prefix_cache.lookup_and_store(prompt) // 4
+        if config.prefill_tokens_per_second > 0:
+            time.sleep((prompt_tokens - cached_tokens) / config.prefill_tokens_per_second)
+
+        completion_tokens = max(1, len(content) // 4)
+        reply_id = f"chatcmpl-{hashlib.sha1(body).hexdigest()[:12]}"
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens},
+        }
+        if request.get("stream"):
+            self._stream(reply_id, request.get("model", "fake-model"), content, usage)
+            return
+
+        if config.tokens_per_second > 0:
+            time.sleep(completion_tokens / config.tokens_per_second)
+        self._send_json(200, {
+            "id": reply_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake-model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        })
+
+    def _stream(self, reply_id: str, model: str, content: str, usage: Dict) -> None:
+        """Send the reply as server-sent events, about 16 tokens per event"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(delta: Dict, finish_reason=None, **extra) -> None:
+            chunk = {"id": reply_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}], **extra}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        step = 64
+        for i in range(0, len(content), step):
+            if i and self.config.tokens_per_second > 0:
+                time.sleep(step / 4 / self.config.tokens_per_second)
+            event({"content": content[i:i + step]} if i else {"role": "assistant", "content": content[:step]})
+        event({}, "stop", usage=usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeUpstreams:
+    """Runs the stand-in server on a background thread"""
+
+    def __init__(self, config: FakeConfig, host: str = "127.0.0.1", port: int = 0):
+        self.server = ThreadingHTTPServer((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.config = config
+        self.server.prefix_cache = PrefixCache()
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeUpstreams":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Fake upstream options, shared with the load-test runner"""
+    parser.add_argument("--latency-ms", type=float, default=300, help="Groq time before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=400, help="Groq completion speed (0 = instant)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of Groq calls answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of Groq calls answered with 429")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="fraction of Groq replies with broken JSON")
+    parser.add_argument("--prefill-tokens-per-second", type=float, default=0,
+                        help="Groq prompt processing speed for uncached prompt tokens (0 = instant)")
+    parser.add_argument("--youtube-latency-ms", type=float, default=80, help="transcript/metadata latency")
+    parser.add_argument("--transcript-words", type=int, default=3000, help="words per fake video transcript")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def config_from_args(args: argparse.Namespace) -> FakeConfig:
+    return FakeConfig(
+        latency_ms=args.latency_ms,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        malformed_rate=args.malformed_rate,
+        youtube_latency_ms=args.youtube_latency_ms,
+        transcript_words=args.transcript_words,
+        prefill_tokens_per_second=args.prefill_tokens_per_second,
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=9100)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    upstreams = FakeUpstreams(config_from_args(args), port=args.port).start()
+    print(f"Fake Groq:     GROQ_BASE_URL={upstreams.url}")
+    print(f"Fake YouTube:  TRANSCRIPT_SOURCE_URL={upstreams.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        upstreams.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+End-to-end load test against local stand-ins for Groq and YouTube
+
+Starts the fake upstreams (benchmarks.fake_upstreams) and the app under
+uvicorn with its stores in a temporary directory, drives concurrent
+/process-video and /process-transcript traffic, and reports throughput,
+p50/p95/p99 latency and error rates per endpoint. Nothing leaves the
+machine and no Groq quota is used.
+
+A share of requests repeats earlier videos/transcripts so the cache hit
+path is part of the mix; every virtual user sends its own X-Client-ID,
+with an X-API-Key the app is started to trust (CLIENT_API_KEYS) so each
+user gets its own per-client admission limits.
+
+Usage:
+    python -m benchmarks.loadtest [--requests 200] [--concurrency 16] [--app-workers 1]
+                                  [--error-rate 0.02] [--rate-limit-rate 0.02] [--malformed-rate 0.02] ...
+
+To drive an app you started yourself, run it with GROQ_BASE_URL and
+TRANSCRIPT_SOURCE_URL set to http://127.0.0.1:9100 and CLIENT_API_KEYS=loadtest-key,
+then:
+    python -m benchmarks.loadtest --app-url http://127.0.0.1:8000 --upstream-port 9100
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+
+import httpx
+
+from benchmarks import fake_upstreams
+
+VIDEO_ENDPOINT = "/process-video"
+TRANSCRIPT_ENDPOINT = "/process-transcript"
+# Sent as X-API-Key so the app honours each virtual user's X-Client-ID
+API_KEY = "loadtest-key"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted values"""
+    if not values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(values) + 0.5)))
+    return values[min(rank, len(values)) - 1]
+
+
+def _plan(total: int, video_share: float, repeat_share: float, transcript_words: int,
+          seed: int) -> List[Tuple[str, Dict]]:
+    """The request mix, fixed up front so runs with the same seed send the same traffic"""
+    rng = random.Random(seed)
+    tag = uuid.uuid4().hex[:6]
+    sent = {VIDEO_ENDPOINT: [], TRANSCRIPT_ENDPOINT: []}
+    plan = []
+    for i in range(total):
+        endpoint = VIDEO_ENDPOINT if rng.random() < video_share else TRANSCRIPT_ENDPOINT
+        if sent[endpoint] and rng.random() < repeat_share:
+            body = rng.choice(sent[endpoint])
+        elif endpoint == VIDEO_ENDPOINT:
+            body = {"youtube_url": f"https://www.youtube.com/watch?v=load{tag}{i:05d}"}
+        else:
+            entries = fake_upstreams.fake_transcript(f"text{tag}{i}", transcript_words)
+            body = {"transcript": " ".join(e["text"] for e in entries), "video_title": f"Lecture text{tag}{i}"}
+        sent[endpoint].append(body)
+        plan.append((endpoint, body))
+    return plan
+
+
+async def drive(app_url: str, plan: List[Tuple[str, Dict]], concurrency: int,
+                timeout: float = 180, api_key: str = API_KEY) -> Tuple[List[Tuple[str, int, float]], float]:
+    """
+    Send the planned requests with `concurrency` virtual users
+
+    Returns:
+        (endpoint, status, latency_ms) per request (status 0 for transport
+        errors) and the wall-clock seconds the run took
+    """
+    results = []
+    queue = asyncio.Queue()
+    for item in plan:
+        queue.put_nowait(item)
+
+    async def user(client: httpx.AsyncClient, number: int) -> None:
+        headers = {"X-Client-ID": f"loadtest-{number}", "X-API-Key": api_key}
+        while not queue.empty():
+            endpoint, body = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                response = await client.post(endpoint, json=body, headers=headers)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0
+            results.append((endpoint, status, (time.perf_counter() - started) * 1000))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=app_url, timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(user(client, n) for n in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return results, elapsed
+
+
+def report(results: List[Tuple[str, int, float]], elapsed: float) -> str:
+    """Per-endpoint throughput, latency percentiles, error rate and status counts"""
+    groups = defaultdict(list)
+    for endpoint, status, latency in results:
+        groups[endpoint].append((status, latency))
+        groups["all"].append((status, latency))
+
+    lines = [
+        f"{len(results)} requests in {elapsed:.1f}s",
+        f"{'endpoint':20} {'requests':>8} {'req/s':>7} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}",
+    ]
+    for endpoint in (VIDEO_ENDPOINT, TRANSCRIPT_ENDPOINT, "all"):
+        rows = groups.get(endpoint)
+        if not rows:
+            continue
+        latencies = sorted(latency for _, latency in rows)
+        errors = sum(1 for status, _ in rows if not 200 <= status < 300)
+        lines.append(
+            f"{endpoint:20} {len(rows):8d} {len(rows) / elapsed:7.2f} {errors / len(rows):7.1%} "
+            f"{percentile(latencies, 50):8.0f} {percentile(latencies, 95):8.0f} {percentile(latencies, 99):8.0f}"
+        )
+    statuses = Counter(status for _, status, _ in results)
+    lines.append("status codes: " + ", ".join(
+        f"{status or 'transport error'}={count}" for status, count in sorted(statuses.items())
+    ))
+    return "\n".join(lines)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_app(upstream_url: str, data_dir: str, workers: int) -> Tuple[subprocess.Popen, str]:
+    """Run the app under uvicorn, pointed at the stand-ins, and wait until it is healthy"""
+    port = _free_port()
+    env = dict(
+        os.environ,
+        GROQ_API_KEY="loadtest",
+        GROQ_BASE_URL=upstream_url,
+        TRANSCRIPT_SOURCE_URL=upstream_url,
+        YOUTUBE_API_KEY="",
+        HTTP_WARMUP_ENABLED="False",
+        DATABASE_PATH=os.path.join(data_dir, "materials.db"),
+        SHARED_CACHE_PATH=os.path.join(data_dir, "shared_cache.db"),
+        USAGE_DB_PATH=os.path.join(data_dir, "usage.db"),
+        CLIENT_API_KEYS=API_KEY,
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        env=env,
+    )
+    app_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"App exited during startup with code {process.returncode}")
+        try:
+            if httpx.get(f"{app_url}/health", timeout=2).status_code == 200:
+                return process, app_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("App did not become healthy within 60s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--video-share", type=float, default=0.5, help="fraction of traffic to /process-video")
+    parser.add_argument("--repeat-share", type=float, default=0.3, help="fraction repeating earlier content")
+    parser.add_argument("--text-words", type=int, default=1200, help="words per /process-transcript body")
+    parser.add_argument("--app-workers", type=int, default=1)
+    parser.add_argument("--app-url", help="drive an already running app instead of starting one")
+    parser.add_argument("--upstream-port", type=int, default=0, help="fixed port for the fakes (with --app-url)")
+    fake_upstreams.add_arguments(parser)
+    parser.set_defaults(tokens_per_second=2000)
+    args = parser.parse_args()
+
+    upstreams = fake_upstreams.FakeUpstreams(
+        fake_upstreams.config_from_args(args), port=args.upstream_port
+    ).start()
+    process = None
+    try:
+        with tempfile.TemporaryDirectory(prefix="svlt-loadtest-") as data_dir:
+            app_url = args.app_url
+            if app_url is None:
+                process, app_url = start_app(upstreams.url, data_dir, args.app_workers)
+            print(
+                f"Fake upstreams at {upstreams.url}: latency {args.latency_ms:.0f}ms, "
+                f"{args.tokens_per_second:.0f} tok/s, errors {args.error_rate:.0%}, "
+                f"429s {args.rate_limit_rate:.0%}, malformed {args.malformed_rate:.0%}"
+            )
+            print(f"Driving {app_url}: {args.requests} requests, {args.concurrency} concurrent users\n")
+            plan = _plan(args.requests, args.video_share, args.repeat_share, args.text_words, args.seed)
+            results, elapsed = asyncio.run(drive(app_url, plan, args.concurrency))
+            print(report(results, elapsed))
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=30)
+    finally:
+        if process is not None and process.poll() is None:
+            process.kill()
+        upstreams.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -29,9 +29,120 @@ class Settings:
     GROQ_MODEL: str = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
     GROQ_TEMPERATURE: float = float(os.getenv("GROQ_TEMPERATURE", "0.7"))
     GROQ_MAX_TOKENS: int = int(os.getenv("GROQ_MAX_TOKENS", "4000"))
+    GROQ_BASE_URL: str = os.getenv("GROQ_BASE_URL", "https://api.groq.com")
+    GROQ_TIMEOUT_SECONDS: float = float(os.getenv("GROQ_TIMEOUT_SECONDS", "60"))
+    
+    # Transcript and metadata source speaking the load-test stand-in's API
+    # (GET /transcripts/{id}, GET /videos/{id}) instead of YouTube; empty uses YouTube
+    TRANSCRIPT_SOURCE_URL: str = os.getenv("TRANSCRIPT_SOURCE_URL", "")
+    
+    # Threads for metadata lookups that run alongside transcript fetches
+    METADATA_FETCH_WORKERS: int = int(os.getenv("METADATA_FETCH_WORKERS", "8"))
+    
+    # Upstream HTTP connection pools
+    YOUTUBE_TIMEOUT_SECONDS: float = float(os.getenv("YOUTUBE_TIMEOUT_SECONDS", "15"))
+    HTTP_POOL_MAX_CONNECTIONS: int = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "32"))
+    HTTP_POOL_MAX_KEEPALIVE: int = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "16"))
+    HTTP_POOL_KEEPALIVE_SECONDS: float = float(os.getenv("HTTP_POOL_KEEPALIVE_SECONDS", "60"))
+    HTTP2_ENABLED: bool = os.getenv("HTTP2_ENABLED", "True").lower() == "true"
+    HTTP_WARMUP_ENABLED: bool = os.getenv("HTTP_WARMUP_ENABLED", "True").lower() == "true"
+    HTTP_WARMUP_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_WARMUP_TIMEOUT_SECONDS", "5"))
+    
+    # Circuit breakers for YouTube and Groq (per worker process)
+    BREAKER_WINDOW_SIZE: int = int(os.getenv("BREAKER_WINDOW_SIZE", "20"))
+    BREAKER_MIN_CALLS: int = int(os.getenv("BREAKER_MIN_CALLS", "5"))
+    BREAKER_FAILURE_RATE: float = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+    BREAKER_SLOW_CALL_RATE: float = float(os.getenv("BREAKER_SLOW_CALL_RATE", "0.8"))
+    BREAKER_OPEN_SECONDS: float = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+    BREAKER_HALF_OPEN_CALLS: int = int(os.getenv("BREAKER_HALF_OPEN_CALLS", "1"))
+    # Calls slower than this count towards the slow-call rate
+    YOUTUBE_SLOW_CALL_SECONDS: float = float(os.getenv("YOUTUBE_SLOW_CALL_SECONDS", "8"))
+    GROQ_SLOW_CALL_SECONDS: float = float(os.getenv("GROQ_SLOW_CALL_SECONDS", "45"))
+    # Client-level retries; each retry can take a full timeout
+    GROQ_MAX_RETRIES: int = int(os.getenv("GROQ_MAX_RETRIES", "1"))
+    # Send prompt_cache_key with each call, for OpenAI-compatible providers that
+    # accept it (Groq caches matching prompt prefixes without a hint)
+    PROMPT_CACHE_HINTS: bool = os.getenv("PROMPT_CACHE_HINTS", "False").lower() == "true"
     
     # Transcript Processing
     MAX_TRANSCRIPT_TOKENS: int = int(os.getenv("MAX_TRANSCRIPT_TOKENS", "12000"))
+    # Long transcripts are split into content-defined chunks whose extractions
+    # are cached, so resubmitting a lightly edited transcript only reprocesses
+    # the edited chunks plus a cheap merge
+    CHUNKED_MIN_CHARS: int = int(os.getenv("CHUNKED_MIN_CHARS", "12000"))
+    CHUNK_MIN_WORDS: int = int(os.getenv("CHUNK_MIN_WORDS", "200"))
+    CHUNK_AVG_WORDS: int = int(os.getenv("CHUNK_AVG_WORDS", "512"))
+    CHUNK_MAX_WORDS: int = int(os.getenv("CHUNK_MAX_WORDS", "1500"))
+    CHUNK_EXTRACT_WORKERS: int = int(os.getenv("CHUNK_EXTRACT_WORKERS", "4"))
+    CHUNK_EXTRACT_MAX_TOKENS: int = int(os.getenv("CHUNK_EXTRACT_MAX_TOKENS", "1200"))
+    # Streamed transcript file uploads (raw bytes received / cleaned characters kept)
+    UPLOAD_MAX_BYTES: int = int(os.getenv("UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+    UPLOAD_MAX_CHARS: int = int(os.getenv("UPLOAD_MAX_CHARS", "200000"))
+    
+    # Storage
+    DATABASE_PATH: str = os.getenv("DATABASE_PATH", "data/materials.db")
+    SEARCH_MAX_LIMIT: int = int(os.getenv("SEARCH_MAX_LIMIT", "50"))
+    
+    # Host-local cache shared by all worker processes
+    SHARED_CACHE_PATH: str = os.getenv("SHARED_CACHE_PATH", "data/shared_cache.db")
+    SHARED_CACHE_TTL_SECONDS: float = float(os.getenv("SHARED_CACHE_TTL_SECONDS", "86400"))
+    # In-flight leases are renewed every third of this while the owner works;
+    # others take over this long after the owner stops renewing (e.g. crashed)
+    SHARED_CACHE_LEASE_SECONDS: float = float(os.getenv("SHARED_CACHE_LEASE_SECONDS", "30"))
+    # Per-worker in-memory front for the shared cache, holding entries compressed
+    # and bounded by compressed bytes. Off by default: it pays off when the cache
+    # database is on slow or network storage, not against a warm local page cache
+    MEMORY_CACHE_MAX_BYTES: int = int(os.getenv("MEMORY_CACHE_MAX_BYTES", "0"))
+    # "auto" uses zstd when the zstandard package is installed, zlib otherwise
+    MEMORY_CACHE_CODEC: str = os.getenv("MEMORY_CACHE_CODEC", "auto")
+    MEMORY_CACHE_LEVEL: int = int(os.getenv("MEMORY_CACHE_LEVEL", "3"))
+    # Optional preset dictionary (see benchmarks/bench_compressed_store.py --write-dictionary)
+    MEMORY_CACHE_DICTIONARY_PATH: str = os.getenv("MEMORY_CACHE_DICTIONARY_PATH", "")
+    
+    # Admission control for LLM-bound endpoints (per worker process)
+    ADMISSION_MAX_IN_FLIGHT: int = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "8"))
+    ADMISSION_MAX_QUEUE: int = int(os.getenv("ADMISSION_MAX_QUEUE", "16"))
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "20"))
+    # 0 disables the per-client limits; they also stay off unless CLIENT_API_KEYS
+    # or TRUSTED_PROXIES below is set, since otherwise clients can't be told apart
+    ADMISSION_CLIENT_CONCURRENCY: int = int(os.getenv("ADMISSION_CLIENT_CONCURRENCY", "2"))
+    ADMISSION_CLIENT_TOKENS_PER_MINUTE: int = int(os.getenv("ADMISSION_CLIENT_TOKENS_PER_MINUTE", "60000"))
+    
+    # Token usage ledger and per-client daily budgets
+    USAGE_DB_PATH: str = os.getenv("USAGE_DB_PATH", "data/usage.db")
+    USAGE_FLUSH_BATCH: int = int(os.getenv("USAGE_FLUSH_BATCH", "200"))
+    USAGE_FLUSH_SECONDS: float = float(os.getenv("USAGE_FLUSH_SECONDS", "1.0"))
+    # Budget for clients without an explicit one; 0 means unlimited
+    DEFAULT_DAILY_TOKEN_BUDGET: int = int(os.getenv("DEFAULT_DAILY_TOKEN_BUDGET", "0"))
+    # Required in the X-Admin-Key header for /admin endpoints; empty disables them
+    ADMIN_API_KEY: str = os.getenv("ADMIN_API_KEY", "")
+    # Quotas and budgets key on the caller's address. The X-Client-ID header is
+    # only trusted with one of these keys in X-API-Key (comma-separated) ...
+    CLIENT_API_KEYS: list = [k for k in os.getenv("CLIENT_API_KEYS", "").split(",") if k]
+    # ... or from these proxy addresses, which may also pass X-Forwarded-For
+    TRUSTED_PROXIES: list = [p for p in os.getenv("TRUSTED_PROXIES", "").split(",") if p]
+    
+    # Video Q&A (retrieval over cached transcripts)
+    QA_CHUNK_WORDS: int = int(os.getenv("QA_CHUNK_WORDS", "120"))
+    QA_CHUNK_OVERLAP_WORDS: int = int(os.getenv("QA_CHUNK_OVERLAP_WORDS", "30"))
+    QA_TOP_K: int = int(os.getenv("QA_TOP_K", "4"))
+    QA_MAX_TOP_K: int = int(os.getenv("QA_MAX_TOP_K", "8"))
+    QA_INDEX_CACHE_SIZE: int = int(os.getenv("QA_INDEX_CACHE_SIZE", "256"))
+    QA_MAX_ANSWER_TOKENS: int = int(os.getenv("QA_MAX_ANSWER_TOKENS", "600"))
+    
+    # Course synthesis (tree-reduce over stored per-video summaries)
+    COURSE_MAX_VIDEOS: int = int(os.getenv("COURSE_MAX_VIDEOS", "100"))
+    # Average parts merged per LLM call (groups are at most twice this)
+    COURSE_FANOUT: int = int(os.getenv("COURSE_FANOUT", "4"))
+    COURSE_WORKERS: int = int(os.getenv("COURSE_WORKERS", "4"))
+    COURSE_MERGE_MAX_TOKENS: int = int(os.getenv("COURSE_MERGE_MAX_TOKENS", "1500"))
+    COURSE_QUIZ_QUESTIONS: int = int(os.getenv("COURSE_QUIZ_QUESTIONS", "20"))
+    
+    # Quiz repair: tokens for regenerating only the questions that had to be dropped
+    QUIZ_REGENERATE_MAX_TOKENS: int = int(os.getenv("QUIZ_REGENERATE_MAX_TOKENS", "1200"))
+    
+    # Width of the transcript windows used to attach source timestamps
+    SOURCE_WINDOW_SECONDS: float = float(os.getenv("SOURCE_WINDOW_SECONDS", "30"))
     
     # CORS - Allow React frontend
     CORS_ORIGINS: list = os.getenv("CORS_ORIGINS", "http://localhost:3000,http://127.0.0.1:3000,*").split(",")
@@ -1,15 +1,73 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import hmac
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict
+
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
 from config import settings
-from models import VideoRequest, TranscriptRequest, VideoResponse, HealthResponse, QuizQuestion
+from models import (
+    VideoRequest, TranscriptRequest, VideoResponse, HealthResponse,
+    SearchResponse, SearchResult, AskRequest, AskResponse, AskSource,
+    UsageResponse, UsageRow, BudgetRequest, BudgetResponse,
+    CourseRequest, CourseResponse
+)
 from services.transcript_service import TranscriptService
 from services.openai_service import OpenAIService
+from services.storage_service import MaterialsStore
+from services.qa_service import QAService
+from services.shared_cache import SharedCache
+from services.compressed_store import CompressedStore
+from services.http_clients import HttpClients
+from services.admission import AdmissionController, AdmissionRejected
+from services.circuit_breaker import CircuitOpenError
+from services.caption_parser import CaptionParser
+from services.course_service import CourseSynthesizer, VideosNotFoundError
+from services.segment_store import SegmentsBuilder
+from services.pipeline import MaterialsPipeline, TranscriptUnavailableError, TranscriptTooLongError
+from services.usage_ledger import UsageLedger, BudgetExceededError, set_usage_context
+
+# Initialize services
+usage_ledger = UsageLedger()
+transcript_service = TranscriptService()
+openai_service = OpenAIService(usage_ledger=usage_ledger)
+materials_store = MaterialsStore()
+qa_service = QAService()
+memory_cache = CompressedStore() if settings.MEMORY_CACHE_MAX_BYTES > 0 else None
+shared_cache = SharedCache(front=memory_cache)
+http_clients = HttpClients()
+admission = AdmissionController()
+pipeline = MaterialsPipeline(transcript_service, openai_service, materials_store, shared_cache)
+course_synthesizer = CourseSynthesizer(openai_service, materials_store, shared_cache)
+# Generations running in this worker, by cache key
+_generations: Dict[str, asyncio.Task] = {}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open pooled upstream connections at startup and close them on shutdown"""
+    http_clients.start()
+    transcript_service.set_http_session(http_clients.youtube)
+    openai_service.set_http_client(http_clients.groq)
+    if settings.HTTP_WARMUP_ENABLED:
+        await run_in_threadpool(http_clients.warm_up)
+    try:
+        yield
+    finally:
+        transcript_service.set_http_session(None)
+        openai_service.set_http_client(None)
+        http_clients.close()
+        await run_in_threadpool(usage_ledger.flush)
+
 
 app = FastAPI(
     title=settings.APP_NAME,
     description=settings.APP_DESCRIPTION,
-    version=settings.APP_VERSION
+    version=settings.APP_VERSION,
+    lifespan=lifespan
 )
 
 # CORS middleware - Allow all origins for deployment
@@ -21,9 +79,112 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize services
-transcript_service = TranscriptService()
-openai_service = OpenAIService()
+
+def _client_id(http_request: Request) -> str:
+    """
+    Identify the caller for per-client quotas and budgets
+
+    X-Client-ID is chosen by the caller, so it only counts when sent with a
+    configured client API key or by a trusted proxy; otherwise a client could
+    escape its budget by changing it. Everyone else is keyed on their address.
+    """
+    peer = http_request.client.host if http_request.client else "unknown"
+    client_id = http_request.headers.get("X-Client-ID")
+    from_proxy = peer in settings.TRUSTED_PROXIES
+    if client_id and (from_proxy or _has_client_key(http_request)):
+        return client_id[:128]
+    if from_proxy:
+        # The proxy appends the address it received the request from
+        forwarded = http_request.headers.get("X-Forwarded-For", "").split(",")[-1].strip()
+        if forwarded:
+            return forwarded
+    return peer
+
+
+def _has_client_key(http_request: Request) -> bool:
+    provided = http_request.headers.get("X-API-Key", "")
+    return bool(provided) and any(hmac.compare_digest(provided, key) for key in settings.CLIENT_API_KEYS)
+
+
+def _rejected(e: AdmissionRejected) -> HTTPException:
+    """Turn a shed request into a fast 503/429 with a Retry-After hint"""
+    return HTTPException(
+        status_code=e.status_code,
+        detail=e.detail,
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+
+def _unavailable(e: CircuitOpenError) -> HTTPException:
+    """Fail fast with 503 while an upstream dependency's circuit is open"""
+    return HTTPException(
+        status_code=503,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+
+def _serve_stale(stored, response: Response) -> VideoResponse:
+    """Return previously generated materials, marked stale, during an upstream outage"""
+    response.headers["Warning"] = '110 - "Response is Stale"'
+    return VideoResponse(**stored["response"])
+
+
+def _budget_exceeded(e: BudgetExceededError) -> HTTPException:
+    """Turn an exhausted daily budget into a 429 that retries after UTC midnight"""
+    now = datetime.now(timezone.utc)
+    midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return HTTPException(
+        status_code=429,
+        detail=str(e),
+        headers={"Retry-After": str(max(1, int((midnight - now).total_seconds())))}
+    )
+
+
+def _require_admin(http_request: Request) -> None:
+    """Allow admin endpoints only with the configured X-Admin-Key"""
+    provided = http_request.headers.get("X-Admin-Key", "")
+    if not settings.ADMIN_API_KEY or not hmac.compare_digest(provided, settings.ADMIN_API_KEY):
+        raise HTTPException(status_code=403, detail="Admin access denied")
+
+
+def _record_cache_hit(endpoint: str, video_id: str = None) -> None:
+    """Log a result served from cache so usage reports show avoided LLM calls"""
+    usage_ledger.record(
+        model=settings.GROQ_MODEL, prompt_tokens=0, completion_tokens=0, latency_ms=0.0,
+        cache_status="hit", endpoint=endpoint, video_id=video_id
+    )
+
+
+async def _generate_once(key: str, generate: Callable[[], Awaitable[Dict]]) -> Dict:
+    """
+    Run generate() once per cache key in this worker
+
+    Concurrent requests for the same uncached video or transcript await the
+    first one's result instead of each taking an admission slot and a thread
+    just to wait on the shared-cache lease. The generation keeps running if
+    the request that started it disconnects.
+    """
+    while True:
+        task = _generations.get(key)
+        if task is None:
+            task = asyncio.ensure_future(generate())
+            _generations[key] = task
+            task.add_done_callback(lambda t: _generation_done(key, t))
+            return await asyncio.shield(task)
+        try:
+            return await asyncio.shield(task)
+        except AdmissionRejected:
+            # The first caller was shed under its own quota; try under ours
+            continue
+
+
+def _generation_done(key: str, task: asyncio.Task) -> None:
+    if _generations.get(key) is task:
+        del _generations[key]
+    if not task.cancelled():
+        task.exception()  # mark retrieved even if every waiter has gone
+
 
 @app.get("/")
 async def root():
@@ -32,10 +193,21 @@ async def root():
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
-    return {"status": "healthy", "service": settings.APP_NAME}
+    dependencies = {
+        "youtube": transcript_service.breaker.snapshot(),
+        "groq": openai_service.breaker.snapshot()
+    }
+    degraded = any(d["state"] != "closed" for d in dependencies.values())
+    return {
+        "status": "degraded" if degraded else "healthy",
+        "service": settings.APP_NAME,
+        "dependencies": dependencies,
+        "load": admission.snapshot(),
+        "memory_cache": memory_cache.stats() if memory_cache is not None else None
+    }
 
 @app.post("/process-transcript", response_model=VideoResponse)
-async def process_transcript(request: TranscriptRequest):
+async def process_transcript(request: TranscriptRequest, http_request: Request, response: Response):
     """
     Process a video transcript directly to generate:
     - A 3-paragraph summary
@@ -56,31 +228,43 @@ async def process_transcript(request: TranscriptRequest):
                 detail="Transcript is too long. Please provide a shorter transcript (max 50,000 characters)."
             )
         
-        # Process with Groq (synchronous)
-        ai_result = openai_service.process_transcript(
-            request.transcript,
-            request.video_title
-        )
+        client_id = _client_id(http_request)
+        set_usage_context(client_id, "/process-transcript")
+        
+        # Cache hits are served immediately and never queued
+        cache_key = pipeline.transcript_cache_key(request.transcript, request.video_title)
+        cached = await run_in_threadpool(shared_cache.get_json, cache_key)
+        if cached is not None:
+            _record_cache_hit("/process-transcript", cached.get("video_id"))
+            return VideoResponse(**cached)
         
-        # Build response
-        return VideoResponse(
-            summary=ai_result["summary"],
-            key_points=ai_result["key_points"],
-            notes=ai_result["notes"],
-            quiz=[
-                QuizQuestion(
-                    question=q["question"],
-                    options=q["options"],
-                    correct_answer=q["correct_answer"]
+        await run_in_threadpool(usage_ledger.check_budget, client_id)
+        
+        # Identical transcript + title is generated once per host, across workers
+        cost = len(request.transcript) // 4 + settings.GROQ_MAX_TOKENS
+        async def generate():
+            async with admission.admit(client_id, cost):
+                return await run_in_threadpool(
+                    pipeline.process_transcript,
+                    request.transcript,
+                    request.video_title
                 )
-                for q in ai_result["quiz"]
-            ],
-            video_title=request.video_title,
-            duration="N/A"
-        )
+        result = await _generate_once(cache_key, generate)
+        return VideoResponse(**result)
         
     except HTTPException:
         raise
+    except AdmissionRejected as e:
+        raise _rejected(e)
+    except BudgetExceededError as e:
+        raise _budget_exceeded(e)
+    except CircuitOpenError as e:
+        stored = await run_in_threadpool(
+            materials_store.get_by_content_hash, MaterialsStore.content_hash(request.transcript)
+        )
+        if stored and stored["title"] == request.video_title:
+            return _serve_stale(stored, response)
+        raise _unavailable(e)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -88,7 +272,7 @@ async def process_transcript(request: TranscriptRequest):
         )
 
 @app.post("/process-video", response_model=VideoResponse)
-async def process_video(request: VideoRequest):
+async def process_video(request: VideoRequest, http_request: Request, response: Response):
     """
     Process a YouTube video to generate:
     - A 3-paragraph summary
@@ -98,54 +282,302 @@ async def process_video(request: VideoRequest):
     try:
         # Extract video ID from URL
         video_url = str(request.youtube_url)
+        video_id = transcript_service.extract_video_id(video_url)
+        client_id = _client_id(http_request)
+        set_usage_context(client_id, "/process-video", video_id)
         
-        # Step 1: Fetch and clean transcript
-        transcript_data = transcript_service.get_transcript(video_url)
+        # Cache hits are served immediately and never queued
+        cached = await run_in_threadpool(shared_cache.get_json, pipeline.video_cache_key(video_id))
+        if cached is not None:
+            _record_cache_hit("/process-video", video_id)
+            return VideoResponse(**cached)
         
-        if not transcript_data:
+        await run_in_threadpool(usage_ledger.check_budget, client_id)
+        
+        # Each unique video is generated once per host, across workers
+        cost = settings.MAX_TRANSCRIPT_TOKENS // 2 + settings.GROQ_MAX_TOKENS
+        async def generate():
+            async with admission.admit(client_id, cost):
+                return await run_in_threadpool(pipeline.process_video, video_url, video_id)
+        result = await _generate_once(pipeline.video_cache_key(video_id), generate)
+        return VideoResponse(**result)
+        
+    except HTTPException:
+        raise
+    except TranscriptUnavailableError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except TranscriptTooLongError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except AdmissionRejected as e:
+        raise _rejected(e)
+    except BudgetExceededError as e:
+        raise _budget_exceeded(e)
+    except CircuitOpenError as e:
+        stored = await run_in_threadpool(materials_store.get_by_video_id, video_id)
+        if stored:
+            return _serve_stale(stored, response)
+        raise _unavailable(e)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing video: {str(e)}"
+        )
+
+# Content types that name a caption format when ?format=auto
+_UPLOAD_CONTENT_TYPES = {"text/vtt": "vtt", "application/x-subrip": "srt", "text/srt": "srt"}
+
+@app.post("/upload-transcript", response_model=VideoResponse)
+async def upload_transcript(
+    http_request: Request,
+    response: Response,
+    video_title: str = Query("Video Learning Materials", min_length=1, max_length=300),
+    fmt: str = Query("auto", alias="format", pattern="^(auto|srt|vtt|txt)$")
+):
+    """
+    Process a transcript file sent as the raw request body:
+    - SRT or WebVTT captions (key points and quiz questions get timestamps)
+    - Plain text
+    The body is parsed as it streams in, so the file is never held in memory whole.
+    """
+    try:
+        content_type = http_request.headers.get("content-type", "").split(";")[0].strip().lower()
+        if content_type.startswith("multipart/"):
             raise HTTPException(
-                status_code=404,
-                detail="Unable to fetch transcript. Video may not have captions or is unavailable."
+                status_code=415,
+                detail="Send the file as the raw request body (e.g. curl --data-binary @lecture.srt)."
             )
+        if fmt == "auto":
+            fmt = _UPLOAD_CONTENT_TYPES.get(content_type, "auto")
         
-        # Step 2: Check transcript length (context window management)
-        if transcript_service.is_too_long(transcript_data["text"]):
+        client_id = _client_id(http_request)
+        set_usage_context(client_id, "/upload-transcript")
+        
+        # Parse cues as bytes arrive; only the current line and cue are buffered
+        parser = CaptionParser(fmt, clean=transcript_service._clean_segment_text)
+        builder = SegmentsBuilder()
+        received = 0
+        async for chunk in http_request.stream():
+            received += len(chunk)
+            if received > settings.UPLOAD_MAX_BYTES:
+                raise HTTPException(status_code=413, detail="File is too large.")
+            for cue in parser.feed(chunk):
+                builder.add(cue["text"], cue["start"], cue["duration"])
+            if builder.length > settings.UPLOAD_MAX_CHARS:
+                raise HTTPException(status_code=413, detail="Transcript is too long.")
+        for cue in parser.close():
+            builder.add(cue["text"], cue["start"], cue["duration"])
+        
+        segments = builder.build()
+        if len(segments.text) < 100:
             raise HTTPException(
-                status_code=413,
-                detail="Video is too long. Please try a video under 60 minutes."
+                status_code=400,
+                detail="Transcript is too short. Please provide at least 100 characters of text."
+            )
+        
+        # Cache hits are served immediately and never queued
+        cache_key = pipeline.upload_cache_key(segments.text, video_title)
+        cached = await run_in_threadpool(shared_cache.get_json, cache_key)
+        if cached is not None:
+            _record_cache_hit("/upload-transcript", cached.get("video_id"))
+            return VideoResponse(**cached)
+        
+        await run_in_threadpool(usage_ledger.check_budget, client_id)
+        
+        cost = min(len(segments.text) // 4, settings.MAX_TRANSCRIPT_TOKENS) + settings.GROQ_MAX_TOKENS
+        async def generate():
+            async with admission.admit(client_id, cost):
+                return await run_in_threadpool(pipeline.process_upload, segments, video_title, parser.timed)
+        result = await _generate_once(cache_key, generate)
+        return VideoResponse(**result)
+        
+    except HTTPException:
+        raise
+    except AdmissionRejected as e:
+        raise _rejected(e)
+    except BudgetExceededError as e:
+        raise _budget_exceeded(e)
+    except CircuitOpenError as e:
+        stored = await run_in_threadpool(materials_store.get_by_content_hash, MaterialsStore.content_hash(segments.text))
+        if stored and stored["title"] == video_title:
+            return _serve_stale(stored, response)
+        raise _unavailable(e)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing transcript file: {str(e)}"
+        )
+
+@app.get("/search", response_model=SearchResponse)
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(10, ge=1),
+    offset: int = Query(0, ge=0)
+):
+    """
+    Full-text search over stored videos' titles, summaries, notes and key points
+    """
+    limit = min(limit, settings.SEARCH_MAX_LIMIT)
+    try:
+        found = await run_in_threadpool(materials_store.search, q, limit=limit, offset=offset)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error searching materials: {str(e)}"
+        )
+    
+    return SearchResponse(
+        query=q,
+        results=[SearchResult(**r) for r in found["results"]],
+        limit=limit,
+        offset=offset,
+        has_more=found["has_more"]
+    )
+
+@app.post("/videos/{video_id}/ask", response_model=AskResponse)
+async def ask_video(video_id: str, request: AskRequest, http_request: Request):
+    """
+    Answer a follow-up question about a processed video.
+    Only the transcript passages most relevant to the question are sent to the model.
+    """
+    try:
+        client_id = _client_id(http_request)
+        set_usage_context(client_id, "/videos/{video_id}/ask", video_id)
+        
+        info = await run_in_threadpool(materials_store.get_video_info, video_id)
+        if not info:
+            raise HTTPException(
+                status_code=404,
+                detail="Video not found. Process the video or transcript first."
             )
         
-        # Step 3: Process with Groq
-        ai_result = openai_service.process_transcript(
-            transcript_data["text"],
-            transcript_data["title"]
+        top_k = min(request.top_k or settings.QA_TOP_K, settings.QA_MAX_TOP_K)
+        hits = await run_in_threadpool(
+            qa_service.retrieve,
+            video_id,
+            info["content_hash"],
+            lambda: materials_store.get_segments(video_id) or materials_store.get_transcript(video_id) or "",
+            request.question,
+            top_k
         )
         
-        # Step 4: Build response
-        return VideoResponse(
-            summary=ai_result["summary"],
-            key_points=ai_result["key_points"],
-            notes=ai_result["notes"],
-            quiz=[
-                QuizQuestion(
-                    question=q["question"],
-                    options=q["options"],
-                    correct_answer=q["correct_answer"]
+        if not hits:
+            answer = "The video transcript does not appear to cover this question."
+        else:
+            await run_in_threadpool(usage_ledger.check_budget, client_id)
+            passages = [chunk["text"] for chunk, _ in hits]
+            cost = sum(len(p) for p in passages) // 4 + settings.QA_MAX_ANSWER_TOKENS
+            async with admission.admit(client_id, cost):
+                answer = await run_in_threadpool(
+                    openai_service.answer_question,
+                    request.question,
+                    passages,
+                    info["title"]
+                )
+        
+        return AskResponse(
+            video_id=video_id,
+            question=request.question,
+            answer=answer,
+            sources=[
+                AskSource(
+                    text=chunk["text"],
+                    start_char=chunk["start_char"],
+                    start_time=chunk.get("start_time"),
+                    score=score
                 )
-                for q in ai_result["quiz"]
-            ],
-            video_title=transcript_data["title"],
-            duration=transcript_data["duration"]
+                for chunk, score in hits
+            ]
         )
         
     except HTTPException:
         raise
+    except AdmissionRejected as e:
+        raise _rejected(e)
+    except BudgetExceededError as e:
+        raise _budget_exceeded(e)
+    except CircuitOpenError as e:
+        raise _unavailable(e)
     except Exception as e:
         raise HTTPException(
             status_code=500,
-            detail=f"Error processing video: {str(e)}"
+            detail=f"Error answering question: {str(e)}"
+        )
+
+@app.post("/courses/synthesize", response_model=CourseResponse)
+async def synthesize_course(request: CourseRequest, http_request: Request):
+    """
+    Build a course summary and cumulative quiz from already processed videos.
+    Stored per-video summaries are merged in a cached tree, so adding a video
+    only recomputes the merges on its path to the root.
+    """
+    try:
+        if len(request.video_ids) > settings.COURSE_MAX_VIDEOS:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Too many videos. A course can have at most {settings.COURSE_MAX_VIDEOS}."
+            )
+        
+        client_id = _client_id(http_request)
+        set_usage_context(client_id, "/courses/synthesize")
+        await run_in_threadpool(usage_ledger.check_budget, client_id)
+        
+        # Roughly one merge call per COURSE_FANOUT parts at each level
+        merges = max(1, len(request.video_ids) // max(1, settings.COURSE_FANOUT - 1))
+        cost = merges * (settings.COURSE_MERGE_MAX_TOKENS * 2)
+        async with admission.admit(client_id, cost):
+            result = await run_in_threadpool(course_synthesizer.synthesize, request.video_ids)
+        return CourseResponse(title=request.title, **result)
+        
+    except HTTPException:
+        raise
+    except VideosNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except AdmissionRejected as e:
+        raise _rejected(e)
+    except BudgetExceededError as e:
+        raise _budget_exceeded(e)
+    except CircuitOpenError as e:
+        raise _unavailable(e)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error synthesizing course: {str(e)}"
         )
 
+@app.get("/admin/usage", response_model=UsageResponse)
+async def admin_usage(
+    http_request: Request,
+    client_id: str = Query(None, max_length=128),
+    days: int = Query(7, ge=1, le=90)
+):
+    """
+    Token usage per client per UTC day (requires X-Admin-Key)
+    """
+    _require_admin(http_request)
+    rows = await run_in_threadpool(usage_ledger.usage, client_id, days)
+    return UsageResponse(days=days, usage=[UsageRow(**row) for row in rows])
+
+@app.get("/admin/budgets/{client_id}", response_model=BudgetResponse)
+async def get_budget(client_id: str, http_request: Request):
+    """
+    A client's daily token budget and today's usage (requires X-Admin-Key)
+    """
+    _require_admin(http_request)
+    return BudgetResponse(
+        client_id=client_id,
+        daily_tokens=await run_in_threadpool(usage_ledger.get_budget, client_id),
+        used_today=await run_in_threadpool(usage_ledger.used_today, client_id)
+    )
+
+@app.put("/admin/budgets/{client_id}", response_model=BudgetResponse)
+async def set_budget(client_id: str, request: BudgetRequest, http_request: Request):
+    """
+    Set or remove a client's daily token budget (requires X-Admin-Key)
+    """
+    _require_admin(http_request)
+    await run_in_threadpool(usage_ledger.set_budget, client_id, request.daily_tokens)
+    return await get_budget(client_id, http_request)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
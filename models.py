@@ -1,8 +1,8 @@
 """
 Pydantic models for request/response validation
 """
-from pydantic import BaseModel, HttpUrl
-from typing import List
+from pydantic import BaseModel, Field, HttpUrl
+from typing import Dict, List, Optional
 
 
 class VideoRequest(BaseModel):
@@ -36,13 +36,15 @@ class QuizQuestion(BaseModel):
     question: str
     options: List[str]
     correct_answer: str
+    source_timestamp: Optional[float] = None
     
     class Config:
         json_schema_extra = {
             "example": {
                 "question": "What is the main topic of this video?",
                 "options": ["Machine Learning", "Web Development", "Data Science", "Cloud Computing"],
-                "correct_answer": "Machine Learning"
+                "correct_answer": "Machine Learning",
+                "source_timestamp": 42.5
             }
         }
 
@@ -51,10 +53,12 @@ class VideoResponse(BaseModel):
     """Response model for processed video"""
     summary: str
     key_points: List[str]
+    key_point_timestamps: Optional[List[Optional[float]]] = None
     notes: List[str]
     quiz: List[QuizQuestion]
     video_title: str
     duration: str
+    video_id: Optional[str] = None
     
     class Config:
         json_schema_extra = {
@@ -84,15 +88,129 @@ class VideoResponse(BaseModel):
                     }
                 ],
                 "video_title": "Introduction to Machine Learning",
-                "duration": "0:15:30"
+                "duration": "0:15:30",
+                "video_id": "dQw4w9WgXcQ"
             }
         }
 
 
+class SearchResult(BaseModel):
+    """A single ranked search hit"""
+    video_id: str
+    title: str
+    snippet: str
+    highlights: List[List[int]] = Field(default_factory=list)
+    score: float
+    created_at: float
+
+
+class SearchResponse(BaseModel):
+    """Paginated full-text search results"""
+    query: str
+    results: List[SearchResult]
+    limit: int
+    offset: int
+    has_more: bool
+
+
+class AskRequest(BaseModel):
+    """Request model for a follow-up question about a processed video"""
+    question: str = Field(..., min_length=3, max_length=1000)
+    top_k: Optional[int] = Field(None, ge=1)
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "question": "How does the lecturer define overfitting?"
+            }
+        }
+
+
+class AskSource(BaseModel):
+    """A transcript passage used to answer a question"""
+    text: str
+    start_char: int
+    start_time: Optional[float] = None
+    score: float
+
+
+class AskResponse(BaseModel):
+    """Answer to a follow-up question with its supporting passages"""
+    video_id: str
+    question: str
+    answer: str
+    sources: List[AskSource]
+
+
+class CourseRequest(BaseModel):
+    """Request model for course-level synthesis over processed videos"""
+    video_ids: List[str] = Field(..., min_length=1)
+    title: str = "Course Overview"
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "video_ids": ["dQw4w9WgXcQ", "9bZkp7q19f0", "kJQP7kiw5Fk"],
+                "title": "Machine Learning Fundamentals"
+            }
+        }
+
+
+class CourseVideo(BaseModel):
+    """A video included in a course"""
+    video_id: str
+    title: str
+
+
+class CourseResponse(BaseModel):
+    """Course summary, key points and cumulative quiz"""
+    title: str
+    summary: str
+    key_points: List[str]
+    quiz: List[QuizQuestion]
+    videos: List[CourseVideo]
+    merges_computed: int
+    merges_reused: int
+
+
+class UsageRow(BaseModel):
+    """Token usage for one client on one UTC day"""
+    client_id: str
+    day: str
+    calls: int
+    cache_hits: int
+    prompt_tokens: int
+    cached_prompt_tokens: int = 0
+    completion_tokens: int
+    total_tokens: int
+    avg_latency_ms: Optional[float] = None
+
+
+class UsageResponse(BaseModel):
+    """Aggregated token usage report"""
+    days: int
+    usage: List[UsageRow]
+
+
+class BudgetRequest(BaseModel):
+    """Set a client's daily token budget (null removes it)"""
+    daily_tokens: Optional[int] = Field(None, ge=0)
+
+
+class BudgetResponse(BaseModel):
+    """A client's daily token budget and what it has used today"""
+    client_id: str
+    daily_tokens: Optional[int] = None
+    used_today: int
+
+
 class HealthResponse(BaseModel):
     """Health check response"""
     status: str
     service: str
+    dependencies: Optional[Dict[str, Dict]] = None
+    load: Optional[Dict] = None
+    memory_cache: Optional[Dict] = None
 
 
 class ErrorResponse(BaseModel):
@@ -0,0 +1,237 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of queued"""
+
+    def __init__(self, detail: str, retry_after: int, status_code: int = 503):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+        self.status_code = status_code
+
+
+class _TokenBucket:
+    """Token bucket refilled continuously at `rate` tokens per second"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def try_take(self, amount: float) -> float:
+        """Take tokens; return 0 on success or the seconds until enough are available"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        # A request bigger than the whole bucket is charged a full bucket
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def refund(self, amount: float) -> None:
+        """Return tokens taken for a request that never ran"""
+        self.tokens = min(self.capacity, self.tokens + min(amount, self.capacity))
+
+    def is_full(self, now: float) -> bool:
+        """True once refilled to capacity, when the bucket is no different from a new one"""
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+class AdmissionController:
+    """
+    Admission control for LLM-bound requests
+
+    - At most `max_in_flight` generations run at once per worker
+    - Up to `max_queue` more wait in FIFO order, each for at most `queue_timeout`
+    - Anything beyond that is rejected immediately with 503 + Retry-After
+    - Per-client caps on concurrent requests and on tokens per minute (429)
+
+    Shedding early keeps latency for admitted requests bounded under overload
+    instead of letting every request slow down until it times out.
+    """
+
+    # Buckets that have refilled are dropped; past this many, the least
+    # recently used go too, so callers with new IDs can't grow memory forever
+    MAX_BUCKETS = 10000
+
+    def __init__(self, max_in_flight: Optional[int] = None, max_queue: Optional[int] = None,
+                 queue_timeout: Optional[float] = None, client_concurrency: Optional[int] = None,
+                 client_tokens_per_minute: Optional[int] = None):
+        self.max_in_flight = max_in_flight if max_in_flight is not None else settings.ADMISSION_MAX_IN_FLIGHT
+        self.max_queue = max_queue if max_queue is not None else settings.ADMISSION_MAX_QUEUE
+        self.queue_timeout = queue_timeout if queue_timeout is not None else settings.ADMISSION_QUEUE_TIMEOUT_SECONDS
+        # Without API keys or trusted proxies, clients are told apart only by
+        # address; behind a proxy that is one address for everyone, so the
+        # configured per-client limits would throttle the whole service
+        identified = bool(settings.CLIENT_API_KEYS or settings.TRUSTED_PROXIES)
+        if client_concurrency is None:
+            client_concurrency = settings.ADMISSION_CLIENT_CONCURRENCY if identified else 0
+        if client_tokens_per_minute is None:
+            client_tokens_per_minute = settings.ADMISSION_CLIENT_TOKENS_PER_MINUTE if identified else 0
+        if not identified and (settings.ADMISSION_CLIENT_CONCURRENCY or settings.ADMISSION_CLIENT_TOKENS_PER_MINUTE) \
+                and not (client_concurrency or client_tokens_per_minute):
+            logger.warning(
+                "Per-client admission limits are off: set CLIENT_API_KEYS or TRUSTED_PROXIES to enable them"
+            )
+        self.client_concurrency = client_concurrency
+        self.client_tokens_per_minute = client_tokens_per_minute
+
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._client_active: Dict[str, int] = {}
+        self._buckets: "OrderedDict[str, _TokenBucket]" = OrderedDict()
+        # Exponentially weighted average generation time, for Retry-After hints
+        self._avg_seconds = 10.0
+        self._lock = threading.Lock()
+
+    def _retry_after(self, position: int) -> int:
+        """Estimate seconds until a slot frees up for the given queue position"""
+        waves = (position + 1) / max(1, self.max_in_flight)
+        return max(1, math.ceil(self._avg_seconds * waves))
+
+    def _bucket(self, client_id: str) -> _TokenBucket:
+        """The client's token bucket, created on first use (call with the lock held)"""
+        bucket = self._buckets.get(client_id)
+        if bucket is not None:
+            self._buckets.move_to_end(client_id)
+            return bucket
+        if len(self._buckets) >= self.MAX_BUCKETS:
+            now = time.monotonic()
+            for key in [k for k, b in self._buckets.items() if b.is_full(now)]:
+                del self._buckets[key]
+            while len(self._buckets) >= self.MAX_BUCKETS:
+                self._buckets.popitem(last=False)
+        bucket = _TokenBucket(self.client_tokens_per_minute / 60.0, self.client_tokens_per_minute)
+        self._buckets[client_id] = bucket
+        return bucket
+
+    def _check_client(self, client_id: str, cost_tokens: int) -> None:
+        """Enforce per-client concurrency and token-rate quotas"""
+        with self._lock:
+            if self.client_concurrency and self._client_active.get(client_id, 0) >= self.client_concurrency:
+                raise AdmissionRejected(
+                    "Too many concurrent requests from this client. Please wait for one to finish.",
+                    retry_after=self._retry_after(0),
+                    status_code=429,
+                )
+
+            if self.client_tokens_per_minute:
+                wait = self._bucket(client_id).try_take(cost_tokens)
+                if wait:
+                    raise AdmissionRejected(
+                        "Token quota exceeded for this client. Please slow down.",
+                        retry_after=max(1, math.ceil(wait)),
+                        status_code=429,
+                    )
+
+            self._client_active[client_id] = self._client_active.get(client_id, 0) + 1
+
+    def _release_client(self, client_id: str, refund_tokens: int = 0) -> None:
+        with self._lock:
+            bucket = self._buckets.get(client_id) if refund_tokens else None
+            if bucket is not None:
+                bucket.refund(refund_tokens)
+            remaining = self._client_active.get(client_id, 1) - 1
+            if remaining:
+                self._client_active[client_id] = remaining
+            else:
+                self._client_active.pop(client_id, None)
+
+    async def _acquire_slot(self) -> None:
+        """Take an in-flight slot, waiting in the bounded queue if necessary"""
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            raise AdmissionRejected(
+                "Server is busy. Please retry shortly.",
+                retry_after=self._retry_after(len(self._waiters)),
+            )
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # The slot is handed over directly by _release_slot
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was handed to us just as the deadline hit; give it back
+                self._release_slot()
+            else:
+                waiter.cancel()
+                self._remove_waiter(waiter)
+            raise AdmissionRejected(
+                "Server is busy. Please retry shortly.",
+                retry_after=self._retry_after(len(self._waiters)),
+            )
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release_slot()
+            else:
+                waiter.cancel()
+                self._remove_waiter(waiter)
+            raise
+
+    def _remove_waiter(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _release_slot(self) -> None:
+        """Hand the slot to the next live waiter, or free it"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def admit(self, client_id: str, cost_tokens: int = 0):
+        """
+        Run the enclosed block under admission control
+
+        Raises:
+            AdmissionRejected: when the client is over quota or the queue is full
+        """
+        self._check_client(client_id, cost_tokens)
+        try:
+            await self._acquire_slot()
+        except BaseException:
+            # Shed or abandoned before running: the tokens were never spent
+            self._release_client(client_id, refund_tokens=cost_tokens)
+            raise
+
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * elapsed
+            self._release_slot()
+            self._release_client(client_id)
+
+    def snapshot(self) -> Dict:
+        """Current load, for health reporting"""
+        return {
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+        }
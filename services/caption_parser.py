@@ -0,0 +1,132 @@
+import codecs
+import re
+from typing import Callable, Dict, Iterator, List, Optional
+
+# 00:01:02,500 --> 00:01:05,000 (SRT) or 01:02.500 --> 01:05.000 line:90% (WebVTT)
+_TIMING_RE = re.compile(
+    r"^\s*((?:\d+:)?\d{1,2}:\d{2}[.,]\d{1,3})\s*-->\s*((?:\d+:)?\d{1,2}:\d{2}[.,]\d{1,3})"
+)
+# <i>, </font>, WebVTT voice/class spans and inline <00:00:01.000> timestamps
+_TAG_RE = re.compile(r"</?[^<>\n]{1,64}>")
+
+FORMATS = ("srt", "vtt", "txt")
+
+# Longer lines are split at a space so one newline-free file can't grow the buffer
+_MAX_LINE_CHARS = 16384
+
+
+def _seconds(timestamp: str) -> float:
+    parts = timestamp.replace(",", ".").split(":")
+    seconds = 0.0
+    for part in parts:
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+class CaptionParser:
+    """
+    Incremental parser for SRT, WebVTT and plain-text transcripts
+
+    Bytes are fed in arbitrary pieces (e.g. straight from a request stream);
+    complete cues are yielded as soon as their block ends, so only the current
+    line and cue are ever held in memory.
+
+    Yields dicts with 'text', 'start' and 'duration', with text already
+    cleaned. Plain-text lines get no timing (start and duration are 0).
+    """
+
+    def __init__(self, fmt: str = "auto", clean: Optional[Callable[[str], str]] = None):
+        if fmt not in FORMATS and fmt != "auto":
+            raise ValueError(f"Unsupported transcript format '{fmt}'. Use one of: auto, {', '.join(FORMATS)}")
+        self.format = None if fmt == "auto" else fmt
+        self.clean = clean or (lambda text: " ".join(text.split()))
+        # utf-8-sig drops a leading BOM, common in caption files from Windows tools
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+        self._buffer = ""
+        self._timing = None
+        self._lines: List[str] = []
+        self._last_text = None
+
+    @property
+    def timed(self) -> bool:
+        """Whether cues carry timestamps"""
+        return self.format in ("srt", "vtt")
+
+    def feed(self, data: bytes) -> Iterator[Dict]:
+        """Consume a piece of the file and yield every cue it completes"""
+        self._buffer += self._decoder.decode(data)
+        *lines, self._buffer = self._buffer.split("\n")
+        for line in lines:
+            yield from self._line(line.rstrip("\r"))
+        while len(self._buffer) > _MAX_LINE_CHARS:
+            cut = self._buffer.rfind(" ", 0, _MAX_LINE_CHARS)
+            cut = cut if cut > 0 else _MAX_LINE_CHARS
+            line, self._buffer = self._buffer[:cut], self._buffer[cut:]
+            yield from self._line(line)
+
+    def close(self) -> Iterator[Dict]:
+        """Flush the final line and cue at end of input"""
+        self._buffer += self._decoder.decode(b"", final=True)
+        if self._buffer:
+            yield from self._line(self._buffer.rstrip("\r"))
+            self._buffer = ""
+        yield from self._end_block()
+
+    def _detect(self, line: str) -> None:
+        stripped = line.strip()
+        if not stripped:
+            return
+        if stripped.startswith("WEBVTT"):
+            self.format = "vtt"
+        elif "-->" in stripped and _TIMING_RE.match(stripped):
+            self.format = "srt"
+        elif not stripped.isdigit():
+            # A first line that is neither a header, cue number nor timing is prose
+            self.format = "txt"
+
+    def _line(self, line: str) -> Iterator[Dict]:
+        if self.format is None:
+            self._detect(line)
+            if self.format is None:
+                self._lines.append(line)  # maybe an SRT cue number; decided by the next line
+                return
+            pending, self._lines = self._lines, []
+            for previous in pending:
+                yield from self._line(previous)
+
+        if self.format == "txt":
+            yield from self._emit(line, 0.0, 0.0)
+            return
+
+        if not line.strip():
+            yield from self._end_block()
+            return
+
+        timing = _TIMING_RE.match(line)
+        if timing:
+            # A timing line always starts a new cue, even without a blank line before it
+            yield from self._end_block()
+            start, end = _seconds(timing.group(1)), _seconds(timing.group(2))
+            self._timing = (start, max(0.0, end - start))
+        elif self._timing is not None:
+            self._lines.append(line)
+        # Lines before a timing line are cue numbers/identifiers, WEBVTT/NOTE/STYLE blocks
+
+    def _end_block(self) -> Iterator[Dict]:
+        if self._timing is not None and self._lines:
+            yield from self._emit(" ".join(self._lines), *self._timing)
+        self._timing = None
+        self._lines = []
+
+    def _emit(self, text: str, start: float, duration: float) -> Iterator[Dict]:
+        if self.timed:
+            text = _TAG_RE.sub("", text)
+        text = self.clean(text)
+        if not text:
+            return
+        # Rolling auto-captions repeat the previous cue verbatim
+        if self.timed:
+            if text == self._last_text:
+                return
+            self._last_text = text
+        yield {"text": text, "start": start, "duration": duration}
@@ -0,0 +1,67 @@
+import re
+import zlib
+from typing import List, Optional
+from config import settings
+
+_WORD_RE = re.compile(r"\S+")
+_SENTENCE_END_RE = re.compile(r"[.!?][\"')\]]*$")
+
+
+def _word_fingerprint(word: str) -> int:
+    """Stable 32-bit fingerprint of a word (case and punctuation insensitive)"""
+    return zlib.crc32(word.lower().strip(".,!?;:\"'()[]").encode("utf-8"))
+
+
+def content_defined_chunks(text: str, min_words: Optional[int] = None, avg_words: Optional[int] = None,
+                           max_words: Optional[int] = None) -> List[str]:
+    """
+    Split text into chunks whose boundaries depend only on nearby content
+
+    A gear-style rolling hash runs over word fingerprints; a chunk ends after
+    a word where the low bits of the hash are zero. Each word's influence is
+    shifted out of the 32-bit hash after 32 words. Editing a passage therefore
+    only moves the boundaries around it, and the chunks before and after keep
+    their exact text. Hash boundaries ignore punctuation and may fall
+    mid-sentence. Sentence ends only matter near the hard limit: within the
+    last min_words // 4 words before max_words, the chunk ends at the next
+    sentence end instead of being cut at max_words.
+
+    Args:
+        text: Transcript text
+        min_words: No boundary before this many words
+        avg_words: Target extra words past the minimum (rounded to a power of two)
+        max_words: Forced boundary at this many words
+
+    Returns:
+        Chunks that concatenate (with single spaces) to the normalized text
+    """
+    min_words = min_words or settings.CHUNK_MIN_WORDS
+    avg_words = avg_words or settings.CHUNK_AVG_WORDS
+    max_words = max_words or settings.CHUNK_MAX_WORDS
+    mask = (1 << max(1, (avg_words - 1).bit_length())) - 1
+
+    words = _WORD_RE.findall(text)
+    chunks: List[str] = []
+    start = 0
+    rolling = 0
+    for i, word in enumerate(words):
+        rolling = ((rolling << 1) + _word_fingerprint(word)) & 0xFFFFFFFF
+        length = i + 1 - start
+        if length < min_words:
+            continue
+        at_boundary = (rolling & mask) == 0
+        # Within the last stretch before the hard limit, take the next sentence end
+        near_limit = length >= max_words - min_words // 4 and _SENTENCE_END_RE.search(word)
+        if at_boundary or near_limit or length >= max_words:
+            chunks.append(" ".join(words[start:i + 1]))
+            start = i + 1
+            rolling = 0
+
+    if start < len(words):
+        tail = " ".join(words[start:])
+        # Fold a short tail into the previous chunk rather than sending a tiny request
+        if chunks and len(words) - start < min_words // 2:
+            chunks[-1] = f"{chunks[-1]} {tail}"
+        else:
+            chunks.append(tail)
+    return chunks
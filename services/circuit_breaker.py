@@ -0,0 +1,151 @@
+import math
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Tuple
+from config import settings
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open"""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"{name} is temporarily unavailable. Please retry shortly.")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one upstream dependency
+
+    - closed: calls go through; the last `window_size` outcomes are tracked
+    - open: once at least `min_calls` are tracked and the failure rate or the
+      slow-call rate reaches its threshold, calls fail fast for `open_seconds`
+    - half-open: afterwards up to `half_open_calls` probes are let through;
+      a successful probe closes the circuit, a failed one opens it again
+
+    Failing fast during an outage keeps workers free instead of having every
+    request wait out the full upstream timeout.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, slow_call_seconds: float, failure_rate: Optional[float] = None,
+                 slow_call_rate: Optional[float] = None, window_size: Optional[int] = None,
+                 min_calls: Optional[int] = None, open_seconds: Optional[float] = None,
+                 half_open_calls: Optional[int] = None):
+        self.name = name
+        self.slow_call_seconds = slow_call_seconds
+        self.failure_rate = failure_rate if failure_rate is not None else settings.BREAKER_FAILURE_RATE
+        self.slow_call_rate = slow_call_rate if slow_call_rate is not None else settings.BREAKER_SLOW_CALL_RATE
+        self.window_size = window_size if window_size is not None else settings.BREAKER_WINDOW_SIZE
+        self.min_calls = min_calls if min_calls is not None else settings.BREAKER_MIN_CALLS
+        self.open_seconds = open_seconds if open_seconds is not None else settings.BREAKER_OPEN_SECONDS
+        self.half_open_calls = half_open_calls if half_open_calls is not None else settings.BREAKER_HALF_OPEN_CALLS
+
+        self._state = self.CLOSED
+        # (failed, slow) per call, newest last
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=self.window_size)
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now: float) -> str:
+        if self._state == self.OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def _open(self, now: float) -> None:
+        self._state = self.OPEN
+        self._opened_at = now
+        self._outcomes.clear()
+
+    def _retry_after(self, now: float) -> int:
+        return max(1, math.ceil(self.open_seconds - (now - self._opened_at)))
+
+    def before_call(self) -> None:
+        """
+        Reserve permission for one call
+
+        Raises:
+            CircuitOpenError: the circuit is open, or half-open with all probes taken
+        """
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == self.OPEN:
+                raise CircuitOpenError(self.name, self._retry_after(now))
+            if state == self.HALF_OPEN:
+                if self._probes >= self.half_open_calls:
+                    raise CircuitOpenError(self.name, 1)
+                self._probes += 1
+
+    def record(self, failed: bool, elapsed: float) -> None:
+        """Record the outcome of a call permitted by before_call"""
+        slow = elapsed >= self.slow_call_seconds
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == self.HALF_OPEN:
+                if failed or slow:
+                    self._open(now)
+                else:
+                    self._state = self.CLOSED
+                    self._outcomes.clear()
+                return
+            if state == self.OPEN:
+                return  # a call that started before the circuit opened
+
+            self._outcomes.append((failed, slow))
+            total = len(self._outcomes)
+            if total < self.min_calls:
+                return
+            failures = sum(1 for f, _ in self._outcomes if f)
+            slow_calls = sum(1 for _, s in self._outcomes if s)
+            if failures / total >= self.failure_rate or slow_calls / total >= self.slow_call_rate:
+                self._open(now)
+
+    def call(self, func: Callable, *args, is_failure: Callable[[BaseException], bool] = lambda e: True, **kwargs):
+        """
+        Call `func` through the breaker
+
+        Args:
+            func: The upstream call
+            is_failure: Whether an exception counts against the dependency
+                (e.g. "no captions" is an answer, not an outage)
+
+        Raises:
+            CircuitOpenError: without calling `func` while the circuit is open
+        """
+        self.before_call()
+        started = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            self.record(is_failure(e), time.monotonic() - started)
+            raise
+        self.record(False, time.monotonic() - started)
+        return result
+
+    def snapshot(self) -> Dict:
+        """Current state, for health reporting"""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            total = len(self._outcomes)
+            return {
+                "state": state,
+                "recent_calls": total,
+                "failure_rate": round(sum(1 for f, _ in self._outcomes if f) / total, 3) if total else 0.0,
+                "slow_call_rate": round(sum(1 for _, s in self._outcomes if s) / total, 3) if total else 0.0,
+                "retry_after": self._retry_after(now) if state == self.OPEN else 0,
+            }
@@ -0,0 +1,178 @@
+import json
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+from config import settings
+
+try:
+    import zstandard
+except ImportError:  # optional; zlib is always available
+    zstandard = None
+
+CODECS = ("zstd", "zlib")
+
+
+class CompressedStore:
+    """
+    In-memory LRU that holds values compressed and is bounded by compressed bytes
+
+    Cleaned transcripts and generated materials are long, repetitive text, so
+    they shrink several times over when compressed. Entries stay compressed
+    while cached and are only decompressed when read; eviction counts the
+    compressed size, which is what the process actually holds.
+
+    Uses zstd when the optional `zstandard` package is installed, zlib
+    otherwise. A preset dictionary built from sample values (see
+    `build_dictionary`) helps most with small entries.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, codec: Optional[str] = None,
+                 level: Optional[int] = None, zdict: Optional[bytes] = None):
+        self.max_bytes = max_bytes if max_bytes is not None else settings.MEMORY_CACHE_MAX_BYTES
+        codec = codec or settings.MEMORY_CACHE_CODEC
+        if codec == "auto":
+            codec = "zstd" if zstandard is not None else "zlib"
+        if codec not in CODECS:
+            raise ValueError(f"Unsupported codec '{codec}'. Use one of: auto, {', '.join(CODECS)}")
+        if codec == "zstd" and zstandard is None:
+            raise ValueError("The zstd codec needs the 'zstandard' package")
+        self.codec = codec
+        self.level = level if level is not None else settings.MEMORY_CACHE_LEVEL
+        if zdict is None and settings.MEMORY_CACHE_DICTIONARY_PATH:
+            with open(settings.MEMORY_CACHE_DICTIONARY_PATH, "rb") as f:
+                zdict = f.read()
+        self.zdict = zdict or None
+        # A single entry may not take more than this share of the budget
+        self.max_entry_bytes = self.max_bytes // 4
+
+        if codec == "zstd":
+            self._zstd_dict = zstandard.ZstdCompressionDict(self.zdict) if self.zdict else None
+        self._local = threading.local()
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.compressed_bytes = 0
+        self.raw_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.decompress_seconds = 0.0
+
+    def _zstd(self):
+        # zstd (de)compressors are not thread-safe; keep one pair per thread
+        pair = getattr(self._local, "zstd", None)
+        if pair is None:
+            pair = (
+                zstandard.ZstdCompressor(level=self.level, dict_data=self._zstd_dict),
+                zstandard.ZstdDecompressor(dict_data=self._zstd_dict),
+            )
+            self._local.zstd = pair
+        return pair
+
+    def compress(self, data: bytes) -> bytes:
+        if self.codec == "zstd":
+            return self._zstd()[0].compress(data)
+        if self.zdict:
+            compressor = zlib.compressobj(self.level, zdict=self.zdict)
+            return compressor.compress(data) + compressor.flush()
+        return zlib.compress(data, self.level)
+
+    def decompress(self, blob: bytes) -> bytes:
+        if self.codec == "zstd":
+            return self._zstd()[1].decompress(blob)
+        if self.zdict:
+            decompressor = zlib.decompressobj(zdict=self.zdict)
+            return decompressor.decompress(blob) + decompressor.flush()
+        return zlib.decompress(blob)
+
+    @staticmethod
+    def build_dictionary(samples: Iterable[bytes], size: int = 32 * 1024) -> bytes:
+        """
+        Preset dictionary from representative values
+
+        Trained with zstd when available; otherwise the most recent sample
+        bytes, since zlib only looks back 32KB and favours nearby matches.
+        """
+        samples = list(samples)
+        if zstandard is not None:
+            try:
+                return zstandard.train_dictionary(size, samples).as_bytes()
+            except zstandard.ZstdError:
+                pass  # too few samples to train on
+        return b"".join(samples)[-size:]
+
+    def put(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        """Compress and store bytes under a key, evicting least recently used entries"""
+        blob = self.compress(value)
+        if len(blob) > self.max_entry_bytes:
+            self.delete(key)
+            return
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.compressed_bytes -= len(old[0])
+                self.raw_bytes -= old[1]
+            self._entries[key] = (blob, len(value), expires_at)
+            self.compressed_bytes += len(blob)
+            self.raw_bytes += len(value)
+            while self.compressed_bytes > self.max_bytes and self._entries:
+                _, (evicted, raw, _) = self._entries.popitem(last=False)
+                self.compressed_bytes -= len(evicted)
+                self.raw_bytes -= raw
+                self.evictions += 1
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Decompress and return the value for a key, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and entry[2] <= time.monotonic():
+                self._entries.pop(key)
+                self.compressed_bytes -= len(entry[0])
+                self.raw_bytes -= entry[1]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        started = time.perf_counter()
+        value = self.decompress(entry[0])
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.decompress_seconds += elapsed
+        return value
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.compressed_bytes -= len(entry[0])
+                self.raw_bytes -= entry[1]
+
+    def put_json(self, key: str, value, ttl: Optional[float] = None) -> None:
+        self.put(key, json.dumps(value).encode("utf-8"), ttl)
+
+    def get_json(self, key: str):
+        value = self.get(key)
+        return json.loads(value) if value is not None else None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        """Size, hit rate and time spent decompressing on hits"""
+        with self._lock:
+            return {
+                "codec": self.codec,
+                "entries": len(self._entries),
+                "compressed_bytes": self.compressed_bytes,
+                "raw_bytes": self.raw_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "avg_decompress_ms": round(self.decompress_seconds * 1000 / self.hits, 4) if self.hits else 0.0,
+            }
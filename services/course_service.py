@@ -0,0 +1,169 @@
+import contextvars
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from config import settings
+from services.openai_service import OpenAIService
+from services.prompts import PROMPT_VERSION
+from services.quiz_postprocessor import is_near_duplicate, question_tokens
+from services.shared_cache import SharedCache
+from services.storage_service import MaterialsStore
+
+logger = logging.getLogger(__name__)
+
+
+class VideosNotFoundError(Exception):
+    """Some requested videos have not been processed yet"""
+
+    def __init__(self, video_ids: List[str]):
+        super().__init__(f"Videos not processed yet: {', '.join(video_ids)}")
+        self.video_ids = video_ids
+
+
+class CourseSynthesizer:
+    """
+    Course-level summary and cumulative quiz over already processed videos
+
+    Stored per-video summaries are the leaves of a Merkle-style tree. Each
+    internal node is one LLM call merging its children, and its cache key is
+    the hash of its children's hashes, so a node is only recomputed when
+    something beneath it changed. Group boundaries are content-defined (taken
+    from the child hashes, as in content-defined chunking), so adding a video
+    anywhere in the list only changes the groups on or next to its path to
+    the root. Each level's merges run in parallel.
+    """
+
+    MAX_CONTENT_DEPTH = 32
+
+    def __init__(self, openai_service: OpenAIService, materials_store: MaterialsStore,
+                 shared_cache: SharedCache, fanout: Optional[int] = None, workers: Optional[int] = None):
+        self.openai_service = openai_service
+        self.materials_store = materials_store
+        self.shared_cache = shared_cache
+        self.fanout = max(2, fanout or settings.COURSE_FANOUT)
+        self.workers = workers or settings.COURSE_WORKERS
+
+    def _leaves(self, video_ids: List[str]) -> Tuple[List[Tuple[str, Dict]], Dict[str, Dict]]:
+        """(hash, digest) per video in course order, plus the stored materials"""
+        materials = self.materials_store.get_materials(video_ids)
+        missing = [video_id for video_id in video_ids if video_id not in materials]
+        if missing:
+            raise VideosNotFoundError(missing)
+
+        leaves = []
+        for video_id in video_ids:
+            response = materials[video_id]
+            digest = {
+                "title": response.get("video_title", video_id),
+                "summary": response.get("summary", ""),
+                "key_points": response.get("key_points", []),
+            }
+            leaves.append((MaterialsStore.content_hash(json.dumps(digest, sort_keys=True)), digest))
+        return leaves, materials
+
+    def _group(self, nodes: List[Tuple[str, Dict]], depth: int = 0) -> List[List[Tuple[str, Dict]]]:
+        """
+        Split a level into groups whose boundaries depend only on the nodes themselves
+
+        A group ends after a node whose hash (salted with the depth, so a lone
+        node gets a fresh draw on the next level) is divisible by the fanout.
+        """
+        groups, current = [], []
+        for node in nodes:
+            current.append(node)
+            salted = int(MaterialsStore.content_hash(f"{depth}:{node[0]}")[:8], 16)
+            # Past a sane depth, fall back to size-based groups so reduction always finishes
+            at_boundary = depth < self.MAX_CONTENT_DEPTH and salted % self.fanout == 0
+            if at_boundary or len(current) >= 2 * self.fanout:
+                groups.append(current)
+                current = []
+        if current:
+            groups.append(current)
+        return groups
+
+    def _node_key(self, children: List[Tuple[str, Dict]]) -> str:
+        return MaterialsStore.content_hash(
+            f"course-node:v1:{PROMPT_VERSION}:{self.openai_service.model}:" + ":".join(h for h, _ in children)
+        )
+
+    def reduce(self, leaves: List[Tuple[str, Dict]]) -> Tuple[Dict, Dict[str, int]]:
+        """
+        Merge leaves level by level up to a single root
+
+        Returns:
+            The root digest and counts of merge nodes computed and reused
+        """
+        stats = {"computed": 0, "reused": 0}
+        level = leaves
+        depth = 0
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="course-merge") as executor:
+            while len(level) > 1:
+                groups = self._group(level, depth)
+                depth += 1
+                next_level: List[Optional[Tuple[str, Dict]]] = [None] * len(groups)
+                futures = {}
+                for i, group in enumerate(groups):
+                    if len(group) == 1:
+                        next_level[i] = group[0]  # a lone node passes through unchanged
+                        continue
+                    key = self._node_key(group)
+                    cached = self.shared_cache.get_json(f"course:node:{key}")
+                    if cached is not None:
+                        stats["reused"] += 1
+                        next_level[i] = (key, cached)
+                        continue
+                    stats["computed"] += 1
+                    parts = [digest for _, digest in group]
+                    compute = self.shared_cache.get_or_compute
+                    # Copy the context so usage is attributed to the requesting client
+                    futures[i] = (key, executor.submit(
+                        contextvars.copy_context().run, compute, f"course:node:{key}",
+                        lambda parts=parts: self.openai_service.merge_summaries(parts)
+                    ))
+                for i, (key, future) in futures.items():
+                    next_level[i] = (key, future.result())
+                level = next_level
+        logger.info("Course synthesis: %d merges computed, %d reused", stats["computed"], stats["reused"])
+        return level[0][1], stats
+
+    def build_quiz(self, video_ids: List[str], materials: Dict[str, Dict], limit: int) -> List[Dict]:
+        """
+        Cumulative quiz drawn round-robin from each video's stored quiz
+
+        Questions that overlap heavily with one already chosen (by words in
+        the question and answer) are dropped as duplicates.
+        """
+        queues = [list(materials[video_id].get("quiz", [])) for video_id in video_ids]
+        chosen: List[Dict] = []
+        seen: List[frozenset] = []
+        while len(chosen) < limit and any(queues):
+            for queue in queues:
+                if not queue or len(chosen) >= limit:
+                    continue
+                question = queue.pop(0)
+                tokens = question_tokens(question)
+                if is_near_duplicate(tokens, seen):
+                    continue
+                seen.append(tokens)
+                chosen.append(question)
+        return chosen
+
+    def synthesize(self, video_ids: List[str]) -> Dict:
+        """
+        Build the course summary, key points and deduplicated cumulative quiz
+
+        Raises:
+            VideosNotFoundError: when any video has not been processed
+        """
+        video_ids = list(dict.fromkeys(video_ids))
+        leaves, materials = self._leaves(video_ids)
+        root, stats = self.reduce(leaves)
+        return {
+            "summary": root["summary"],
+            "key_points": root["key_points"],
+            "quiz": self.build_quiz(video_ids, materials, settings.COURSE_QUIZ_QUESTIONS),
+            "videos": [{"video_id": video_id, "title": digest["title"]} for video_id, (_, digest) in zip(video_ids, leaves)],
+            "merges_computed": stats["computed"],
+            "merges_reused": stats["reused"],
+        }
@@ -0,0 +1,102 @@
+import importlib.util
+import logging
+import socket
+from typing import Optional
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """requests adapter that applies a default timeout to every call"""
+
+    def __init__(self, *args, timeout: float = 30.0, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+class HttpClients:
+    """
+    Pooled keep-alive HTTP clients for upstream services
+
+    Created at application startup, warmed up (DNS + TCP/TLS) so the first
+    user request doesn't pay connection setup, and closed on shutdown.
+
+    - youtube: requests.Session used for transcript fetching
+    - groq: httpx.Client handed to the Groq SDK (HTTP/2 when `h2` is installed)
+    """
+
+    YOUTUBE_WARMUP_URL = "https://www.youtube.com/"
+
+    def __init__(self):
+        self.youtube: Optional[requests.Session] = None
+        self.groq: Optional[httpx.Client] = None
+
+    @staticmethod
+    def http2_available() -> bool:
+        """HTTP/2 in httpx needs the optional `h2` package"""
+        return settings.HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+
+    def start(self) -> None:
+        """Create the connection pools"""
+        session = requests.Session()
+        adapter = TimeoutHTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=settings.HTTP_POOL_MAX_CONNECTIONS,
+            max_retries=0,
+            timeout=settings.YOUTUBE_TIMEOUT_SECONDS,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        self.youtube = session
+
+        self.groq = httpx.Client(
+            http2=self.http2_available(),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=settings.HTTP_POOL_KEEPALIVE_SECONDS,
+            ),
+            timeout=httpx.Timeout(settings.GROQ_TIMEOUT_SECONDS, connect=10.0),
+            follow_redirects=True,
+        )
+
+    def warm_up(self) -> None:
+        """
+        Resolve DNS and open one keep-alive connection per upstream
+
+        Failures are logged, never raised: an upstream that's down at startup
+        must not stop the app from serving cached content.
+        """
+        targets = [
+            (self.youtube, self.YOUTUBE_WARMUP_URL),
+            (self.groq, settings.GROQ_BASE_URL),
+        ]
+        for client, url in targets:
+            if client is None or not url:
+                continue
+            try:
+                parts = urlsplit(url)
+                socket.getaddrinfo(parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+                client.head(url, timeout=settings.HTTP_WARMUP_TIMEOUT_SECONDS)
+            except Exception as e:
+                logger.warning("Warm-up request to %s failed: %s", url, e)
+
+    def close(self) -> None:
+        """Close all pooled connections"""
+        if self.youtube is not None:
+            self.youtube.close()
+            self.youtube = None
+        if self.groq is not None:
+            self.groq.close()
+            self.groq = None
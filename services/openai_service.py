@@ -1,151 +1,333 @@
-from groq import Groq
+from groq import Groq, APIConnectionError, APIStatusError
+import httpx
 import json
 import re
-from typing import Dict
+import time
+from typing import Dict, List, Optional
 from config import settings
+from services import prompts
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from services.quiz_postprocessor import QuizPostProcessor
+from services.usage_ledger import BudgetExceededError, UsageLedger
 
 
 class OpenAIService:
     """Service to process transcripts using Groq (Llama 3)"""
     
-    def __init__(self):
-        self.client = Groq(api_key=settings.GROQ_API_KEY)
+    def __init__(self, http_client: Optional[httpx.Client] = None, usage_ledger: Optional[UsageLedger] = None):
+        self.set_http_client(http_client)
+        self.usage_ledger = usage_ledger
+        self.breaker = CircuitBreaker("groq", slow_call_seconds=settings.GROQ_SLOW_CALL_SECONDS)
+        self.quiz_postprocessor = QuizPostProcessor()
         self.model = settings.GROQ_MODEL
         self.temperature = settings.GROQ_TEMPERATURE
         self.max_tokens = settings.GROQ_MAX_TOKENS
     
+    def set_http_client(self, http_client: Optional[httpx.Client]) -> None:
+        """Route Groq calls through a pooled HTTP client (or the SDK default when None)"""
+        self.client = Groq(
+            api_key=settings.GROQ_API_KEY,
+            base_url=settings.GROQ_BASE_URL,
+            timeout=settings.GROQ_TIMEOUT_SECONDS,
+            max_retries=settings.GROQ_MAX_RETRIES,
+            http_client=http_client
+        )
+    
+    def _create_completion(self, messages: List[Dict], temperature: float, max_tokens: int,
+                           cache_key: Optional[str] = None):
+        """
+        Run a chat completion for the current usage context
+        
+        Checks the caller's daily token budget first and records the call's
+        token usage (including prompt tokens served from the provider's
+        prompt cache) and latency in the ledger afterwards. Calls go through
+        the Groq circuit breaker.
+        
+        Args:
+            cache_key: Names the static prompt prefix; sent as a prompt-cache
+                hint when PROMPT_CACHE_HINTS is on
+        
+        Raises:
+            BudgetExceededError: the caller has no budget left today
+            CircuitOpenError: Groq is failing and calls are short-circuited
+        """
+        if self.usage_ledger is not None:
+            self.usage_ledger.check_budget()
+        
+        extra = {}
+        if cache_key and settings.PROMPT_CACHE_HINTS:
+            extra["extra_body"] = {"prompt_cache_key": cache_key}
+        
+        started = time.perf_counter()
+        response = self.breaker.call(
+            self.client.chat.completions.create,
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            is_failure=self._is_upstream_failure,
+            **extra
+        )
+        
+        if self.usage_ledger is not None:
+            usage = getattr(response, "usage", None)
+            details = getattr(usage, "prompt_tokens_details", None)
+            self.usage_ledger.record(
+                model=self.model,
+                prompt_tokens=getattr(usage, "prompt_tokens", 0),
+                completion_tokens=getattr(usage, "completion_tokens", 0),
+                latency_ms=(time.perf_counter() - started) * 1000,
+                cached_tokens=getattr(details, "cached_tokens", 0) or 0
+            )
+        return response
+    
+    @staticmethod
+    def _is_upstream_failure(error: BaseException) -> bool:
+        """Connection problems, timeouts, 5xx and rate limiting count against Groq; bad requests don't"""
+        if isinstance(error, APIConnectionError):
+            return True
+        if isinstance(error, APIStatusError):
+            return error.status_code >= 500 or error.status_code == 429
+        return False
+    
     def _build_system_prompt(self) -> str:
-        """Create strict system prompt for consistent JSON output"""
-        return """You are an expert educational content analyzer. Generate comprehensive learning materials from transcripts.
-
-CRITICAL: Return ONLY valid JSON with this exact structure:
-{
-  "summary": "3 well-written paragraphs separated by \\n\\n",
-  "key_points": ["point 1", "point 2", "point 3", "point 4", "point 5"],
-  "notes": ["detailed note 1", "detailed note 2", "detailed note 3", "detailed note 4", "detailed note 5", "detailed note 6", "detailed note 7"],
-  "quiz": [
-    {
-      "question": "Question text?",
-      "options": ["Option A", "Option B", "Option C", "Option D"],
-      "correct_answer": "Option A"
-    }
-  ]
-}
-
-IMPORTANT RULES:
-- summary: Must be exactly 3 paragraphs providing a high-level overview
-- key_points: Must be exactly 5 BRIEF one-line key insights (short and concise)
-- notes: Must be exactly 7 DETAILED, COMPREHENSIVE study notes. Each note should be 2-4 sentences long with:
-  * In-depth explanations of concepts
-  * Context and background information
-  * Examples and real-world applications
-  * Technical details and nuances
-  * Connections between different ideas
-  * Why the concept matters and how it's used
-- quiz: Must be exactly 10 questions with varied difficulty
-- Each quiz question must have exactly 4 options
-- correct_answer MUST be the EXACT text of one of the 4 options (copy it precisely)
-- No extra fields, no markdown, just pure JSON"""
+        """Strict system prompt for consistent JSON output (compiled once per prompt version)"""
+        return prompts.MATERIALS.system
     
     def _build_user_prompt(self, transcript: str, video_title: str) -> str:
-        """Build user prompt with transcript"""
-        return f"""Video Title: {video_title}
-
-Transcript:
-{transcript}
-
-Generate:
-1. A 3-paragraph summary (high-level overview of the content)
-2. 5 key points (brief, one-line insights - keep these SHORT)
-3. 7 detailed study notes (COMPREHENSIVE and DETAILED - each should be 2-4 sentences with examples, context, explanations, and real-world applications)
-4. 10 multiple-choice quiz questions (varied difficulty levels)
-
-Return as JSON only."""
+        """User prompt carrying only the per-request title and transcript"""
+        return prompts.MATERIALS.user(transcript=transcript, video_title=video_title)
+    
+    def _parse_json_content(self, content: str) -> Dict:
+        """Parse the model's JSON reply, tolerating markdown fences and stray control characters"""
+        # Clean content - remove markdown and invalid characters
+        content = content.strip()
+        
+        # Remove markdown code blocks
+        if content.startswith("```json"):
+            content = content[7:]
+        if content.startswith("```"):
+            content = content[3:]
+        if content.endswith("```"):
+            content = content[:-3]
+        content = content.strip()
+        
+        # Remove or escape invalid control characters (except \n, \r, \t which are valid in JSON strings)
+        # Replace problematic control characters that break JSON parsing
+        content = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', content)
+        
+        # Ensure newlines within string values are properly escaped
+        # This regex finds string values and escapes unescaped newlines within them
+        def escape_newlines_in_strings(match):
+            string_content = match.group(1)
+            # Escape unescaped newlines, carriage returns, and tabs
+            string_content = string_content.replace('\n', '\\n').replace('\r', '\\r').replace('\t', '\\t')
+            return f'"{string_content}"'
+        
+        # Find all string values in JSON and escape special characters
+        content = re.sub(r'"([^"\\]*(?:\\.[^"\\]*)*)"', escape_newlines_in_strings, content)
+        
+        return json.loads(content)
     
     def process_transcript(self, transcript: str, video_title: str) -> Dict:
         """Process transcript with Groq"""
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self._build_system_prompt()},
-                    {"role": "user", "content": self._build_user_prompt(transcript, video_title)}
-                ],
+            response = self._create_completion(
+                messages=prompts.MATERIALS.messages(transcript=transcript, video_title=video_title),
+                cache_key=prompts.MATERIALS.cache_key,
                 temperature=self.temperature,
                 max_tokens=self.max_tokens
             )
             
-            content = response.choices[0].message.content
-            
-            # Clean content - remove markdown and invalid characters
-            content = content.strip()
+            result = self._parse_json_content(response.choices[0].message.content)
             
-            # Remove markdown code blocks
-            if content.startswith("```json"):
-                content = content[7:]
-            if content.startswith("```"):
-                content = content[3:]
-            if content.endswith("```"):
-                content = content[:-3]
-            content = content.strip()
+            # Repair quiz answers and options; regenerate only questions that were dropped
+            self._repair_quiz(result, transcript, video_title, settings.REQUIRED_QUIZ_QUESTIONS)
             
-            # Remove or escape invalid control characters (except \n, \r, \t which are valid in JSON strings)
-            # Replace problematic control characters that break JSON parsing
-            content = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', content)
+            self._validate_response(result)
             
-            # Ensure newlines within string values are properly escaped
-            # This regex finds string values and escapes unescaped newlines within them
-            def escape_newlines_in_strings(match):
-                string_content = match.group(1)
-                # Escape unescaped newlines, carriage returns, and tabs
-                string_content = string_content.replace('\n', '\\n').replace('\r', '\\r').replace('\t', '\\t')
-                return f'"{string_content}"'
+            return result
             
-            # Find all string values in JSON and escape special characters
-            content = re.sub(r'"([^"\\]*(?:\\.[^"\\]*)*)"', escape_newlines_in_strings, content)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON response from AI: {str(e)}")
+        except (BudgetExceededError, CircuitOpenError):
+            raise
+        except Exception as e:
+            raise ValueError(f"OpenAI processing error: {str(e)}")
+    
+    def extract_chunk(self, chunk: str) -> Dict:
+        """
+        Extract intermediate study material from one transcript chunk
+        
+        The video title is deliberately left out of the prompt, so an
+        extraction only depends on the chunk text and can be reused across
+        resubmissions.
+        """
+        try:
+            response = self._create_completion(
+                messages=prompts.CHUNK_EXTRACT.messages(chunk=chunk),
+                cache_key=prompts.CHUNK_EXTRACT.cache_key,
+                temperature=self.temperature,
+                max_tokens=settings.CHUNK_EXTRACT_MAX_TOKENS
+            )
             
-            result = json.loads(content)
+            result = self._parse_json_content(response.choices[0].message.content)
+            if not isinstance(result, dict) or "summary" not in result:
+                raise ValueError("Missing 'summary' in section extraction")
+            for field in ("points", "notes", "quiz"):
+                if not isinstance(result.get(field), list):
+                    result[field] = []
+            self._repair_quiz(result, chunk, "", None)
+            return result
             
-            # Auto-fix quiz answers if they don't match options exactly
-            self._fix_quiz_answers(result)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON response from AI: {str(e)}")
+        except (BudgetExceededError, CircuitOpenError):
+            raise
+        except Exception as e:
+            raise ValueError(f"OpenAI processing error: {str(e)}")
+    
+    def merge_extractions(self, extractions: List[Dict], video_title: str) -> Dict:
+        """
+        Merge per-section extractions into the final learning materials
+        
+        The merge prompt carries only the compact extractions, not the
+        transcript, so it stays cheap however long the video is.
+        """
+        sections = "\n\n".join(
+            f"Section {i + 1}:\n{json.dumps(extraction, ensure_ascii=False)}"
+            for i, extraction in enumerate(extractions)
+        )
+        try:
+            response = self._create_completion(
+                messages=prompts.MERGE_EXTRACTIONS.messages(sections=sections, video_title=video_title),
+                cache_key=prompts.MERGE_EXTRACTIONS.cache_key,
+                temperature=self.temperature,
+                max_tokens=self.max_tokens
+            )
             
+            result = self._parse_json_content(response.choices[0].message.content)
+            self._repair_quiz(result, sections, video_title, settings.REQUIRED_QUIZ_QUESTIONS)
             self._validate_response(result)
-            
             return result
             
         except json.JSONDecodeError as e:
             raise ValueError(f"Invalid JSON response from AI: {str(e)}")
+        except (BudgetExceededError, CircuitOpenError):
+            raise
         except Exception as e:
             raise ValueError(f"OpenAI processing error: {str(e)}")
     
-    def _fix_quiz_answers(self, result: Dict) -> None:
-        """Auto-fix quiz answers that don't match options exactly"""
-        if "quiz" not in result or not isinstance(result["quiz"], list):
-            return
+    def merge_summaries(self, parts: List[Dict]) -> Dict:
+        """
+        Combine the summaries of consecutive course parts into one
         
-        for i, q in enumerate(result["quiz"]):
-            if "correct_answer" not in q or "options" not in q:
-                continue
+        Args:
+            parts: Dicts with 'title', 'summary' and 'key_points', in course order
+        
+        Returns:
+            Dict with 'title', 'summary' and 'key_points' for the combined part
+        """
+        sections = "\n\n".join(
+            f"Part {i + 1}: {part['title']}\nSummary: {part['summary']}\nKey points:\n"
+            + "\n".join(f"- {point}" for point in part["key_points"])
+            for i, part in enumerate(parts)
+        )
+        try:
+            response = self._create_completion(
+                messages=prompts.COURSE_MERGE.messages(sections=sections),
+                cache_key=prompts.COURSE_MERGE.cache_key,
+                temperature=self.temperature,
+                max_tokens=settings.COURSE_MERGE_MAX_TOKENS
+            )
             
-            correct = q["correct_answer"]
-            options = q["options"]
+            result = self._parse_json_content(response.choices[0].message.content)
+            if not isinstance(result, dict) or not isinstance(result.get("summary"), str):
+                raise ValueError("Missing 'summary' in merged course part")
+            if not isinstance(result.get("key_points"), list):
+                raise ValueError("Missing 'key_points' in merged course part")
+            result["title"] = str(result.get("title") or parts[0]["title"])
+            return {"title": result["title"], "summary": result["summary"], "key_points": result["key_points"]}
+            
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON response from AI: {str(e)}")
+        except (BudgetExceededError, CircuitOpenError):
+            raise
+        except Exception as e:
+            raise ValueError(f"OpenAI processing error: {str(e)}")
+    
+    def answer_question(self, question: str, passages: List[str], video_title: str) -> str:
+        """Answer a follow-up question using only the retrieved transcript passages"""
+        context = "\n\n".join(f"[{i + 1}] {p}" for i, p in enumerate(passages))
+        try:
+            response = self._create_completion(
+                messages=prompts.ANSWER_QUESTION.messages(
+                    context=context, question=question, video_title=video_title
+                ),
+                cache_key=prompts.ANSWER_QUESTION.cache_key,
+                temperature=0.2,
+                max_tokens=settings.QA_MAX_ANSWER_TOKENS
+            )
+            return response.choices[0].message.content.strip()
+        except (BudgetExceededError, CircuitOpenError):
+            raise
+        except Exception as e:
+            raise ValueError(f"OpenAI processing error: {str(e)}")
+    
+    def generate_quiz_questions(self, source: str, video_title: str, count: int,
+                                existing: List[Dict]) -> List[Dict]:
+        """
+        Write only the quiz questions a repaired reply is still missing
+        
+        Args:
+            source: Transcript or section extractions the quiz is about
+            video_title: Title of the video
+            count: Number of new questions needed
+            existing: Questions already accepted, which must not be repeated
+        
+        Returns:
+            New quiz questions, unrepaired
+        """
+        asked = "\n".join(f"- {q['question']}" for q in existing) or "- (none)"
+        try:
+            response = self._create_completion(
+                messages=prompts.QUIZ_TOP_UP.messages(
+                    source=source, video_title=video_title, asked=asked, count=count
+                ),
+                cache_key=prompts.QUIZ_TOP_UP.cache_key,
+                temperature=self.temperature,
+                max_tokens=settings.QUIZ_REGENERATE_MAX_TOKENS
+            )
+            result = self._parse_json_content(response.choices[0].message.content)
+            quiz = result.get("quiz") if isinstance(result, dict) else result
+            return quiz if isinstance(quiz, list) else []
             
-            # If correct_answer doesn't match any option exactly
-            if correct not in options:
-                # Try case-insensitive match
-                for opt in options:
-                    if opt.lower().strip() == correct.lower().strip():
-                        q["correct_answer"] = opt
-                        break
-                else:
-                    # Try partial match (if correct_answer is substring of an option)
-                    for opt in options:
-                        if correct.lower() in opt.lower() or opt.lower() in correct.lower():
-                            q["correct_answer"] = opt
-                            break
-                    else:
-                        # Last resort: use the first option
-                        q["correct_answer"] = options[0]
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON response from AI: {str(e)}")
+        except (BudgetExceededError, CircuitOpenError):
+            raise
+        except Exception as e:
+            raise ValueError(f"OpenAI processing error: {str(e)}")
+    
+    def _repair_quiz(self, result: Dict, source: str, video_title: str, count: Optional[int]) -> None:
+        """
+        Repair the quiz in place rather than rejecting the whole reply
+        
+        Questions that can't be repaired are dropped, and only that gap is
+        sent back to the model (once). If it is still short, validation fails
+        as before and the caller retries.
+        """
+        if not isinstance(result, dict):
+            return
+        quiz, stats = self.quiz_postprocessor.repair(result.get("quiz"), count)
+        if stats["missing"]:
+            try:
+                extra = self.generate_quiz_questions(source, video_title, stats["missing"], quiz)
+                more, _ = self.quiz_postprocessor.repair(extra, count, existing=quiz)
+                quiz += more
+            except ValueError:
+                pass
+        result["quiz"] = quiz
     
     def _validate_response(self, result: Dict) -> None:
         """Validate AI response structure"""
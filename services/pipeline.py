@@ -0,0 +1,257 @@
+import base64
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Dict, List, Optional
+from config import settings
+from models import VideoResponse, QuizQuestion
+from services.transcript_service import TranscriptService
+from services.openai_service import OpenAIService
+from services.prompts import PROMPT_VERSION
+from services.storage_service import MaterialsStore
+from services.shared_cache import SharedCache
+from services.segment_store import TranscriptSegments, locate_sources
+from services.chunking import content_defined_chunks
+
+logger = logging.getLogger(__name__)
+
+
+class TranscriptUnavailableError(Exception):
+    """The video has no fetchable transcript"""
+
+
+class TranscriptTooLongError(Exception):
+    """The transcript exceeds the model's context budget"""
+
+
+class MaterialsPipeline:
+    """
+    End-to-end generation of learning materials
+
+    Shared by the API and the batch CLI so both produce identical results,
+    cache keys and stored records.
+    """
+
+    def __init__(self, transcript_service: TranscriptService, openai_service: OpenAIService,
+                 materials_store: MaterialsStore, shared_cache: SharedCache):
+        self.transcript_service = transcript_service
+        self.openai_service = openai_service
+        self.materials_store = materials_store
+        self.shared_cache = shared_cache
+
+    @staticmethod
+    def transcript_cache_key(transcript: str, video_title: str) -> str:
+        """Result cache key for a raw transcript (the title is part of the prompt)"""
+        return "result:transcript:" + MaterialsStore.content_hash(f"{video_title}\n{transcript}")
+
+    @staticmethod
+    def upload_cache_key(transcript: str, video_title: str) -> str:
+        """Result cache key for an uploaded caption file (results carry timestamps)"""
+        return "result:upload:" + MaterialsStore.content_hash(f"{video_title}\n{transcript}")
+
+    @staticmethod
+    def video_cache_key(video_id: str) -> str:
+        """Result cache key for a YouTube video"""
+        return f"result:video:{video_id}"
+
+    def chunk_cache_key(self, chunk: str) -> str:
+        """Cache key for one chunk's extraction (the model and prompt version are part of the key)"""
+        return f"chunk:v1:{PROMPT_VERSION}:{self.openai_service.model}:" + MaterialsStore.content_hash(chunk)
+
+    def extract_chunks(self, chunks: List[str]) -> List[Dict]:
+        """
+        Extract every chunk, reusing cached extractions
+
+        Missing extractions run concurrently. Each one is computed at most
+        once per host.
+        """
+        keys = [self.chunk_cache_key(chunk) for chunk in chunks]
+        extractions: List[Optional[Dict]] = [self.shared_cache.get_json(key) for key in keys]
+        missing = [i for i, extraction in enumerate(extractions) if extraction is None]
+        logger.info("Chunked generation: %d chunks, %d reused", len(chunks), len(chunks) - len(missing))
+
+        def extract(i: int) -> Dict:
+            return self.shared_cache.get_or_compute(keys[i], lambda: self.openai_service.extract_chunk(chunks[i]))
+
+        if len(missing) == 1:
+            extractions[missing[0]] = extract(missing[0])
+        elif missing:
+            workers = min(settings.CHUNK_EXTRACT_WORKERS, len(missing))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chunk-extract") as executor:
+                # Copy the context so usage is attributed to the requesting client
+                futures = {i: executor.submit(contextvars.copy_context().run, extract, i) for i in missing}
+                for i, future in futures.items():
+                    extractions[i] = future.result()
+        return extractions
+
+    def generate_materials(self, transcript: str, video_title: str) -> Dict:
+        """
+        Generate raw AI materials, in one call or chunk by chunk for long transcripts
+
+        Long transcripts are split at content-defined boundaries, so an edit
+        only changes the chunks around it. Unchanged chunks reuse their cached
+        extractions and only a small merge call sees the whole video.
+        """
+        if len(transcript) < settings.CHUNKED_MIN_CHARS:
+            return self.openai_service.process_transcript(transcript, video_title)
+
+        chunks = content_defined_chunks(transcript)
+        if len(chunks) < 2:
+            return self.openai_service.process_transcript(transcript, video_title)
+        return self.openai_service.merge_extractions(self.extract_chunks(chunks), video_title)
+
+    def _persist(self, video_id: str, transcript: str, response: VideoResponse, segments=None) -> None:
+        """Store generated materials; a storage failure must not cost the user their result"""
+        try:
+            self.materials_store.save(video_id, transcript, response.model_dump(), response.duration, segments)
+        except Exception:
+            logger.exception("Failed to persist materials for %s", video_id)
+
+    def generate_from_transcript(self, transcript: str, video_title: str) -> Dict:
+        """Generate, persist and return materials for a raw transcript"""
+        # Process with Groq (synchronous)
+        ai_result = self.generate_materials(transcript, video_title)
+
+        # Build response
+        response = VideoResponse(
+            summary=ai_result["summary"],
+            key_points=ai_result["key_points"],
+            notes=ai_result["notes"],
+            quiz=[
+                QuizQuestion(
+                    question=q["question"],
+                    options=q["options"],
+                    correct_answer=q["correct_answer"]
+                )
+                for q in ai_result["quiz"]
+            ],
+            video_title=video_title,
+            duration="N/A",
+            video_id=MaterialsStore.content_hash(transcript)[:16]
+        )
+        self._persist(response.video_id, transcript, response)
+        return response.model_dump()
+
+    def load_transcript(self, video_url: str, video_id: str) -> Optional[Dict]:
+        """Fetch a video's transcript once per host and share it across workers"""
+        def fetch():
+            data = self.transcript_service.get_transcript(video_url)
+            if not data:
+                return None
+            return {
+                "title": data["title"],
+                "duration": data["duration"],
+                "segments": base64.b64encode(data["segments"].to_bytes()).decode("ascii")
+            }
+
+        cached = self.shared_cache.get_or_compute(f"transcript:{video_id}", fetch)
+        if not cached:
+            return None
+        segments = TranscriptSegments.from_bytes(base64.b64decode(cached["segments"]))
+        return {
+            "text": segments.text,
+            "segments": segments,
+            "title": cached["title"],
+            "duration": cached["duration"]
+        }
+
+    def generate_from_video(self, video_url: str, video_id: str) -> Dict:
+        """
+        Fetch the transcript, generate, persist and return materials for a video
+
+        Raises:
+            TranscriptUnavailableError: the video has no captions
+            TranscriptTooLongError: the transcript exceeds the token budget
+        """
+        # Step 1: Fetch and clean transcript
+        transcript_data = self.load_transcript(video_url, video_id)
+
+        if not transcript_data:
+            raise TranscriptUnavailableError(
+                "Unable to fetch transcript. Video may not have captions or is unavailable."
+            )
+
+        # Step 2: Check transcript length (context window management)
+        if self.transcript_service.is_too_long(transcript_data["text"]):
+            raise TranscriptTooLongError("Video is too long. Please try a video under 60 minutes.")
+
+        # Steps 3-5: Generate, timestamp and build the response
+        return self._generate_timed(
+            transcript_data["segments"],
+            transcript_data["title"],
+            transcript_data["duration"],
+            video_id,
+            self.openai_service.process_transcript
+        )
+
+    def _generate_timed(self, segments: TranscriptSegments, video_title: str, duration: str,
+                        video_id: str, generate) -> Dict:
+        """Generate materials for timed segments, attach source timestamps, persist and return them"""
+        ai_result = generate(segments.text, video_title)
+
+        # Map key points and quiz questions back to video time
+        timestamps = locate_sources(
+            segments,
+            ai_result["key_points"] + [f'{q["question"]} {q["correct_answer"]}' for q in ai_result["quiz"]],
+            settings.SOURCE_WINDOW_SECONDS
+        )
+        key_point_timestamps = timestamps[:len(ai_result["key_points"])]
+        quiz_timestamps = timestamps[len(ai_result["key_points"]):]
+
+        # Build response
+        response = VideoResponse(
+            summary=ai_result["summary"],
+            key_points=ai_result["key_points"],
+            key_point_timestamps=key_point_timestamps,
+            notes=ai_result["notes"],
+            quiz=[
+                QuizQuestion(
+                    question=q["question"],
+                    options=q["options"],
+                    correct_answer=q["correct_answer"],
+                    source_timestamp=ts
+                )
+                for q, ts in zip(ai_result["quiz"], quiz_timestamps)
+            ],
+            video_title=video_title,
+            duration=duration,
+            video_id=video_id
+        )
+        self._persist(video_id, segments.text, response, segments)
+        return response.model_dump()
+
+    def process_transcript(self, transcript: str, video_title: str) -> Dict:
+        """Cached generation for a raw transcript; identical input is generated once per host"""
+        return self.shared_cache.get_or_compute(
+            self.transcript_cache_key(transcript, video_title),
+            lambda: self.generate_from_transcript(transcript, video_title)
+        )
+
+    def generate_from_upload(self, segments: TranscriptSegments, video_title: str, timed: bool) -> Dict:
+        """Generate, persist and return materials for an uploaded transcript file"""
+        if not timed:
+            return self.generate_from_transcript(segments.text, video_title)
+        last = len(segments) - 1
+        end = segments.starts[last] + segments.durations[last] if last >= 0 else 0.0
+        return self._generate_timed(
+            segments,
+            video_title,
+            str(timedelta(seconds=int(end))),
+            MaterialsStore.content_hash(segments.text)[:16],
+            self.generate_materials
+        )
+
+    def process_upload(self, segments: TranscriptSegments, video_title: str, timed: bool) -> Dict:
+        """Cached generation for an uploaded transcript file"""
+        return self.shared_cache.get_or_compute(
+            self.upload_cache_key(segments.text, video_title),
+            lambda: self.generate_from_upload(segments, video_title, timed)
+        )
+
+    def process_video(self, video_url: str, video_id: str) -> Dict:
+        """Cached generation for a video; each unique video is generated once per host"""
+        return self.shared_cache.get_or_compute(
+            self.video_cache_key(video_id),
+            lambda: self.generate_from_video(video_url, video_id)
+        )
@@ -0,0 +1,181 @@
+from typing import Callable, Dict, List
+from config import settings
+
+# Bump whenever any prompt text changes: cached chunk extractions and course
+# merges are keyed on it, and it names the provider-side prompt cache entry
+PROMPT_VERSION = "p2"
+
+
+class PromptTemplate:
+    """
+    A chat prompt with a fixed layout per prompt version
+
+    Everything static lives in the system message (and a fixed user-message
+    lead-in), ahead of any per-request content, so consecutive calls share the
+    longest possible prefix and providers with prefix caching can reuse it.
+    The user message is an f-string compiled with this module. Building a
+    prompt is still slower than the inline f-strings it replaced, by about
+    0.6-0.8us per prompt (benchmarks/bench_prompt_cache.py), which is
+    negligible next to time to first token.
+    """
+
+    def __init__(self, name: str, system: str, user: Callable[..., str]):
+        self.name = name
+        self.system = system
+        self.user = user
+        self.cache_key = f"svlt:{PROMPT_VERSION}:{name}"
+
+    def messages(self, **values) -> List[Dict]:
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.user(**values)},
+        ]
+
+
+_MATERIALS_RULES = """You are an expert educational content analyzer. Generate comprehensive learning materials from transcripts.
+
+CRITICAL: Return ONLY valid JSON with this exact structure:
+{
+  "summary": "3 well-written paragraphs separated by \\n\\n",
+  "key_points": ["point 1", "point 2", "point 3", "point 4", "point 5"],
+  "notes": ["detailed note 1", "detailed note 2", "detailed note 3", "detailed note 4", "detailed note 5", "detailed note 6", "detailed note 7"],
+  "quiz": [
+    {
+      "question": "Question text?",
+      "options": ["Option A", "Option B", "Option C", "Option D"],
+      "correct_answer": "Option A"
+    }
+  ]
+}
+
+IMPORTANT RULES:
+- summary: Must be exactly 3 paragraphs providing a high-level overview
+- key_points: Must be exactly 5 BRIEF one-line key insights (short and concise)
+- notes: Must be exactly 7 DETAILED, COMPREHENSIVE study notes. Each note should be 2-4 sentences long with:
+  * In-depth explanations of concepts
+  * Context and background information
+  * Examples and real-world applications
+  * Technical details and nuances
+  * Connections between different ideas
+  * Why the concept matters and how it's used
+- quiz: Must be exactly 10 questions with varied difficulty
+- Each quiz question must have exactly 4 options
+- correct_answer MUST be the EXACT text of one of the 4 options (copy it precisely)
+- No extra fields, no markdown, just pure JSON"""
+
+MATERIALS = PromptTemplate(
+    "materials",
+    _MATERIALS_RULES + """
+
+For the video title and transcript in the next message, generate:
+1. A 3-paragraph summary (high-level overview of the content)
+2. 5 key points (brief, one-line insights - keep these SHORT)
+3. 7 detailed study notes (COMPREHENSIVE and DETAILED - each should be 2-4 sentences with examples, context, explanations, and real-world applications)
+4. 10 multiple-choice quiz questions (varied difficulty levels)""",
+    lambda video_title, transcript: f"""Video Title: {video_title}
+
+Transcript:
+{transcript}
+
+Return as JSON only."""
+)
+
+# Shares the materials rules as its prefix; the static merge instructions
+# lead the user message so only the extractions vary
+MERGE_EXTRACTIONS = PromptTemplate(
+    "merge-extractions",
+    _MATERIALS_RULES,
+    lambda video_title, sections: f"""The transcript was analyzed section by section, in order. Using only the section extractions below, generate for the whole video:
+1. A 3-paragraph summary (high-level overview of the content)
+2. 5 key points (brief, one-line insights - keep these SHORT)
+3. 7 detailed study notes (COMPREHENSIVE and DETAILED - each should be 2-4 sentences)
+4. 10 multiple-choice quiz questions covering all sections (reuse or improve the candidate questions)
+
+Video Title: {video_title}
+
+Section extractions:
+{sections}
+
+Return as JSON only."""
+)
+
+CHUNK_EXTRACT = PromptTemplate(
+    "chunk-extract",
+    """You extract study material from one section of a lecture transcript.
+
+Return ONLY valid JSON with this exact structure:
+{
+  "summary": "2-3 sentences summarizing this section",
+  "points": ["concise key idea", "..."],
+  "notes": ["detailed 2-4 sentence study note", "..."],
+  "quiz": [{"question": "Question text?", "options": ["A", "B", "C", "D"], "correct_answer": "A"}]
+}
+
+RULES:
+- points: 2-5 brief key ideas from this section only
+- notes: 1-3 detailed notes with explanations and examples from this section
+- quiz: 2-4 questions answerable from this section, each with exactly 4 options
+- correct_answer MUST be the EXACT text of one of the options
+- No extra fields, no markdown, just pure JSON""",
+    lambda chunk: f"""Transcript section:
+{chunk}
+
+Return as JSON only."""
+)
+
+COURSE_MERGE = PromptTemplate(
+    "course-merge",
+    """You combine summaries of consecutive parts of a video course into one.
+
+Return ONLY valid JSON with this exact structure:
+{
+  "title": "short name for the combined material",
+  "summary": "2-3 well-written paragraphs separated by \\n\\n",
+  "key_points": ["brief one-line insight", "..."]
+}
+
+RULES:
+- Cover every part, in order, and connect ideas that build on each other
+- key_points: 5-8 brief insights across all parts, no duplicates
+- No extra fields, no markdown, just pure JSON""",
+    lambda sections: f"""{sections}
+
+Return as JSON only."""
+)
+
+QUIZ_TOP_UP = PromptTemplate(
+    "quiz-top-up",
+    """You write multiple-choice quiz questions about a video lecture.
+
+Return ONLY valid JSON with this exact structure:
+{"quiz": [{"question": "Question text?", "options": ["A", "B", "C", "D"], "correct_answer": "A"}]}
+
+RULES:
+- Each question must have exactly %d options
+- correct_answer MUST be the EXACT text of one of the options
+- Do not repeat or rephrase any existing question
+- No extra fields, no markdown, just pure JSON""" % settings.QUIZ_OPTIONS_COUNT,
+    lambda video_title, source, asked, count: f"""Video Title: {video_title}
+
+Material:
+{source}
+
+Existing questions:
+{asked}
+
+Write {count} new questions. Return as JSON only."""
+)
+
+ANSWER_QUESTION = PromptTemplate(
+    "answer-question",
+    "You are a helpful teaching assistant answering a student's question about a video lecture. "
+    "Answer using ONLY the numbered transcript excerpts provided. "
+    "If the excerpts do not contain the answer, say so briefly. "
+    "Be concise and cite excerpt numbers like [2] where relevant.",
+    lambda video_title, context, question: f"""Video Title: {video_title}
+
+Transcript excerpts:
+{context}
+
+Question: {question}"""
+)
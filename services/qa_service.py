@@ -0,0 +1,134 @@
+import math
+import re
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Callable, Dict, List, Tuple, Union
+from config import settings
+from services.segment_store import TranscriptSegments
+
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by do does for from has have how i in is it its "
+    "of on or so that the this to was what when where which who why will with you".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with common stopwords removed"""
+    return [t for t in re.findall(r"[a-z0-9]+", text.lower()) if t not in STOPWORDS]
+
+
+def chunk_transcript(text: str, chunk_words: int, overlap_words: int) -> List[Dict]:
+    """
+    Split transcript text into overlapping word windows
+
+    Returns:
+        List of dicts with 'text' and 'start_char' (offset into the transcript)
+    """
+    words = [(m.start(), m.end()) for m in re.finditer(r"\S+", text)]
+    if not words:
+        return []
+
+    step = max(1, chunk_words - overlap_words)
+    chunks = []
+    for first in range(0, len(words), step):
+        last = min(first + chunk_words, len(words)) - 1
+        start, end = words[first][0], words[last][1]
+        chunks.append({"text": text[start:end], "start_char": start})
+        if last == len(words) - 1:
+            break
+    return chunks
+
+
+class BM25Index:
+    """In-memory BM25 inverted index over transcript chunks"""
+
+    def __init__(self, chunks: List[Dict], k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        # term -> list of (chunk index, term frequency)
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.doc_lengths: List[int] = []
+
+        for i, chunk in enumerate(chunks):
+            counts: Dict[str, int] = defaultdict(int)
+            tokens = tokenize(chunk["text"])
+            for token in tokens:
+                counts[token] += 1
+            for term, tf in counts.items():
+                self.postings[term].append((i, tf))
+            self.doc_lengths.append(len(tokens))
+
+        self.postings = dict(self.postings)
+        total_length = sum(self.doc_lengths)
+        self.avg_length = (total_length / len(self.doc_lengths)) if total_length else 1.0
+
+    def search(self, query: str, top_k: int) -> List[Tuple[Dict, float]]:
+        """Return the top_k (chunk, score) pairs for a query, in transcript order"""
+        n = len(self.chunks)
+        scores: Dict[int, float] = defaultdict(float)
+
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for i, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[i] / self.avg_length)
+                scores[i] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        # Present passages in transcript order so the model reads them coherently
+        best.sort(key=lambda item: item[0])
+        return [(self.chunks[i], score) for i, score in best]
+
+
+class QAService:
+    """Retrieves the transcript passages relevant to a question"""
+
+    def __init__(self):
+        self.chunk_words = settings.QA_CHUNK_WORDS
+        self.overlap_words = settings.QA_CHUNK_OVERLAP_WORDS
+        self.cache_size = settings.QA_INDEX_CACHE_SIZE
+        # video_id -> (content_hash, BM25Index), least recently used first
+        self._indexes: "OrderedDict[str, Tuple[str, BM25Index]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_index(self, video_id: str, content_hash: str,
+                  load_transcript: Callable[[], Union[str, TranscriptSegments]]) -> BM25Index:
+        """
+        Return the cached index for a video, building it on a miss or content change
+
+        The transcript is only loaded on a miss, so cached questions cost the
+        same regardless of lecture length. When the loader returns timestamped
+        segments, each chunk also carries a 'start_time'.
+        """
+        with self._lock:
+            cached = self._indexes.get(video_id)
+            if cached and cached[0] == content_hash:
+                self._indexes.move_to_end(video_id)
+                return cached[1]
+
+        # Build outside the lock so one long transcript doesn't stall other videos
+        loaded = load_transcript()
+        if isinstance(loaded, TranscriptSegments):
+            chunks = chunk_transcript(loaded.text, self.chunk_words, self.overlap_words)
+            for chunk in chunks:
+                chunk["start_time"] = loaded.time_at_offset(chunk["start_char"])
+        else:
+            chunks = chunk_transcript(loaded, self.chunk_words, self.overlap_words)
+        index = BM25Index(chunks)
+
+        with self._lock:
+            self._indexes[video_id] = (content_hash, index)
+            self._indexes.move_to_end(video_id)
+            while len(self._indexes) > self.cache_size:
+                self._indexes.popitem(last=False)
+        return index
+
+    def retrieve(self, video_id: str, content_hash: str,
+                 load_transcript: Callable[[], Union[str, TranscriptSegments]],
+                 question: str, top_k: int) -> List[Tuple[Dict, float]]:
+        """Top-k transcript chunks for a question"""
+        return self.get_index(video_id, content_hash, load_transcript).search(question, top_k)
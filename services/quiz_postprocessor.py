@@ -0,0 +1,194 @@
+import hashlib
+import random
+import re
+from typing import Dict, List, Optional, Tuple
+from config import settings
+
+# "A) Paris", "b. Paris", "Option C: Paris"
+_LABEL_RE = re.compile(r"^\s*(?:option\s+)?[a-h]\s*[).:\-]\s+", re.IGNORECASE)
+# An answer given as just the option letter: "B", "(c)", "Option D"
+_LETTER_RE = re.compile(r"^\s*(?:option\s+)?\(?([a-h])\)?\s*[.:]?\s*$", re.IGNORECASE)
+
+DUPLICATE_THRESHOLD = 0.7
+
+# Ignored when judging whether a padding distractor is on the question's topic
+_STOPWORDS = frozenset("""
+    about after also and are because been being best between both but can correct could define
+    describe describes did does during each example explain following for from had has have how
+    into its main more most not often only other statement
+    over same should such than that the their them then there these they this those through true
+    under used uses using was were what when where which while who why will with would
+""".split())
+
+
+def normalize_tokens(text: str) -> frozenset:
+    """Lowercased word tokens, ignoring punctuation and option labels"""
+    return frozenset(re.findall(r"\w+", _LABEL_RE.sub("", str(text)).lower()))
+
+
+def question_tokens(question: Dict) -> frozenset:
+    """Tokens of a question and its answer, for near-duplicate detection"""
+    return normalize_tokens(f"{question['question']} {question['correct_answer']}")
+
+
+def similarity(a: frozenset, b: frozenset) -> float:
+    """Jaccard similarity of two token sets"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def content_tokens(text: str) -> frozenset:
+    """Normalized tokens that carry topic, without stopwords and very short words"""
+    return frozenset(t for t in normalize_tokens(text) if len(t) > 2 and t not in _STOPWORDS)
+
+
+def is_near_duplicate(tokens: frozenset, seen: List[frozenset], threshold: float = DUPLICATE_THRESHOLD) -> bool:
+    return any(similarity(tokens, other) >= threshold for other in seen)
+
+
+class QuizPostProcessor:
+    """
+    Repair model-generated quiz questions instead of rejecting the whole reply
+
+    Per question: option labels and duplicate options are removed, the answer
+    is aligned to an option (exact, normalized, by letter, then by token
+    similarity), option lists are trimmed or padded with on-topic distractors
+    from other questions, and options are shuffled deterministically so the
+    answer isn't always first. Near-duplicate questions are dropped. Questions that
+    can't be repaired are dropped too; the caller regenerates only that gap.
+    """
+
+    def __init__(self, options_count: Optional[int] = None, min_similarity: float = 0.5):
+        self.options_count = options_count or settings.QUIZ_OPTIONS_COUNT
+        self.min_similarity = min_similarity
+
+    def _clean_options(self, options) -> List[str]:
+        cleaned, seen = [], set()
+        for option in options if isinstance(options, list) else []:
+            text = _LABEL_RE.sub("", str(option)).strip()
+            key = normalize_tokens(text) or text.lower()
+            if text and key not in seen:
+                seen.add(key)
+                cleaned.append(text)
+        return cleaned
+
+    def align_answer(self, answer, raw_options: List, options: List[str]) -> Optional[str]:
+        """
+        The option the answer refers to, or None when it can't be told
+
+        Args:
+            answer: The model's correct_answer
+            raw_options: Options as the model wrote them (for letter references)
+            options: Cleaned options
+        """
+        answer = str(answer or "").strip()
+        if not answer:
+            return None
+        if answer in options:
+            return answer
+
+        tokens = normalize_tokens(answer)
+        for option in options:
+            if normalize_tokens(option) == tokens and tokens:
+                return option
+
+        letter = _LETTER_RE.match(answer)
+        if letter:
+            index = ord(letter.group(1).lower()) - ord("a")
+            if isinstance(raw_options, list) and index < len(raw_options):
+                label_free = _LABEL_RE.sub("", str(raw_options[index])).strip()
+                if label_free in options:
+                    return label_free
+
+        scored = sorted(
+            ((similarity(tokens, normalize_tokens(option)), option) for option in options),
+            reverse=True
+        )
+        if scored and scored[0][0] >= self.min_similarity and (len(scored) == 1 or scored[0][0] > scored[1][0]):
+            return scored[0][1]
+        return None
+
+    def _shuffle(self, question: str, options: List[str]) -> List[str]:
+        # Seeded by the question and starting from a sorted order, so repairing twice is a no-op
+        seed = hashlib.sha256(question.encode("utf-8")).digest()
+        shuffled = sorted(options)
+        random.Random(seed).shuffle(shuffled)
+        return shuffled
+
+    def repair(self, questions, count: Optional[int] = None,
+               existing: Optional[List[Dict]] = None) -> Tuple[List[Dict], Dict[str, int]]:
+        """
+        Repair a list of quiz questions
+
+        Args:
+            questions: Quiz questions as parsed from the model
+            count: Number of questions wanted, counting `existing`; extras are dropped
+            existing: Already accepted questions, kept as-is and used for duplicate checks
+
+        Returns:
+            The repaired new questions and counts of what was changed; 'missing'
+            is how many more questions are needed to reach `count`
+        """
+        existing = existing or []
+        stats = {"answers_aligned": 0, "options_padded": 0, "options_trimmed": 0,
+                 "duplicates_dropped": 0, "dropped": 0, "missing": 0}
+        candidates = [q for q in questions if isinstance(q, dict)] if isinstance(questions, list) else []
+        stats["dropped"] = (len(questions) if isinstance(questions, list) else 0) - len(candidates)
+        # Distractors for padding come from the options of the other questions,
+        # with the topic words of the question each came from
+        pool = [
+            (option, content_tokens(option) | content_tokens(q.get("question", "")))
+            for q in candidates for option in self._clean_options(q.get("options"))
+        ]
+
+        repaired: List[Dict] = []
+        seen = [question_tokens(q) for q in existing]
+        for q in candidates:
+            text = str(q.get("question", "")).strip()
+            raw_options = q.get("options")
+            options = self._clean_options(raw_options)
+            answer = self.align_answer(q.get("correct_answer"), raw_options, options)
+            given = str(q.get("correct_answer") or "").strip()
+            if answer is None and given and not _LETTER_RE.match(given) and len(options) < self.options_count:
+                # The answer is missing from a short option list; it becomes an option
+                answer = given
+                options.append(answer)
+            if not text or answer is None:
+                stats["dropped"] += 1
+                continue
+            if answer != q.get("correct_answer"):
+                stats["answers_aligned"] += 1
+
+            if len(options) > self.options_count:
+                options = [answer] + [o for o in options if o != answer][:self.options_count - 1]
+                stats["options_trimmed"] += 1
+            if len(options) < self.options_count:
+                # Only on-topic distractors: an unrelated one is obviously wrong and
+                # makes the question trivial, so without enough it becomes a gap
+                topic = content_tokens(text).union(*(content_tokens(o) for o in options))
+                present = {normalize_tokens(o) for o in options}
+                for distractor, related in pool:
+                    if len(options) >= self.options_count:
+                        break
+                    if related & topic and normalize_tokens(distractor) not in present:
+                        present.add(normalize_tokens(distractor))
+                        options.append(distractor)
+                if len(options) < self.options_count:
+                    stats["dropped"] += 1
+                    continue
+                stats["options_padded"] += 1
+
+            fixed = dict(q, question=text, options=self._shuffle(text, options), correct_answer=answer)
+            tokens = question_tokens(fixed)
+            if is_near_duplicate(tokens, seen):
+                stats["duplicates_dropped"] += 1
+                continue
+            seen.append(tokens)
+            repaired.append(fixed)
+
+        if count is not None:
+            room = max(0, count - len(existing))
+            repaired = repaired[:room]
+            stats["missing"] = room - len(repaired)
+        return repaired, stats
@@ -0,0 +1,200 @@
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+class TranscriptSegments:
+    """
+    Compact, array-backed transcript that keeps per-segment timestamps
+
+    Instead of a list of {'text', 'start', 'duration'} dicts, all segment text
+    lives in one string and the timing data in parallel typed arrays:
+
+    - starts[i]     segment start time in seconds (array('d'))
+    - durations[i]  segment duration in seconds (array('d'))
+    - offsets[i]    character offset of segment i in text (array('I'))
+    """
+
+    __slots__ = ("text", "starts", "durations", "offsets")
+
+    _HEADER = struct.Struct("<4sII")
+    _MAGIC = b"TSG1"
+
+    def __init__(self, text: str = "", starts: Optional[array] = None,
+                 durations: Optional[array] = None, offsets: Optional[array] = None):
+        self.text = text
+        self.starts = starts if starts is not None else array("d")
+        self.durations = durations if durations is not None else array("d")
+        self.offsets = offsets if offsets is not None else array("I")
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[Dict], clean: Optional[Callable[[str], str]] = None) -> "TranscriptSegments":
+        """
+        Build from YouTubeTranscriptApi-style entries
+
+        Args:
+            entries: Dicts with 'text' and optional 'start'/'duration'
+            clean: Optional per-segment text cleaner; segments that clean to
+                   an empty string are dropped
+        """
+        builder = SegmentsBuilder()
+        for entry in entries:
+            text = clean(entry["text"]) if clean else entry["text"].strip()
+            builder.add(text, entry.get("start", 0.0), entry.get("duration", 0.0))
+        return builder.build()
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def _end_offset(self, i: int) -> int:
+        return self.offsets[i + 1] if i + 1 < len(self.offsets) else len(self.text)
+
+    def segment_text(self, i: int) -> str:
+        """Text of segment i"""
+        return self.text[self.offsets[i]:self._end_offset(i)].strip()
+
+    def index_at_time(self, seconds: float) -> int:
+        """Index of the segment playing at the given time (clamped to the first/last)"""
+        if not self.starts:
+            raise IndexError("Transcript has no segments")
+        return max(0, bisect_right(self.starts, seconds) - 1)
+
+    def text_at_time(self, seconds: float) -> str:
+        """Text of the segment playing at the given time"""
+        return self.segment_text(self.index_at_time(seconds))
+
+    def text_between(self, start: float, end: float) -> str:
+        """All transcript text from the segment at start up to (not including) segments starting at end"""
+        first = self.index_at_time(start)
+        last = max(first + 1, bisect_left(self.starts, end))
+        end_offset = self.offsets[last] if last < len(self.offsets) else len(self.text)
+        return self.text[self.offsets[first]:end_offset].strip()
+
+    def time_at_offset(self, offset: int) -> float:
+        """Start time of the segment containing a character offset into text"""
+        if not self.offsets:
+            return 0.0
+        return self.starts[max(0, bisect_right(self.offsets, offset) - 1)]
+
+    def windows(self, seconds: float) -> List[Dict]:
+        """
+        Group consecutive segments into time windows of roughly `seconds`
+
+        Returns:
+            List of dicts with 'text', 'start_char', 'start' and 'end'
+        """
+        windows = []
+        n = len(self)
+        first = 0
+        while first < n:
+            last = first
+            while last + 1 < n and self.starts[last + 1] - self.starts[first] < seconds:
+                last += 1
+            windows.append({
+                "text": self.text[self.offsets[first]:self._end_offset(last)].strip(),
+                "start_char": self.offsets[first],
+                "start": self.starts[first],
+                "end": self.starts[last] + self.durations[last],
+            })
+            first = last + 1
+        return windows
+
+    def nbytes(self) -> int:
+        """Approximate in-memory footprint in bytes"""
+        return (
+            sys.getsizeof(self.text)
+            + sum(sys.getsizeof(a) for a in (self.starts, self.durations, self.offsets))
+        )
+
+    def to_bytes(self) -> bytes:
+        """Serialize to a compact binary blob (for storage)"""
+        encoded = self.text.encode("utf-8")
+        starts, durations, offsets = self.starts, self.durations, self.offsets
+        if sys.byteorder == "big":
+            starts, durations, offsets = array("d", starts), array("d", durations), array("I", offsets)
+            for a in (starts, durations, offsets):
+                a.byteswap()
+        return (
+            self._HEADER.pack(self._MAGIC, len(self), len(encoded))
+            + starts.tobytes() + durations.tobytes() + offsets.tobytes() + encoded
+        )
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "TranscriptSegments":
+        """Deserialize a blob produced by to_bytes()"""
+        magic, count, text_len = cls._HEADER.unpack_from(blob)
+        if magic != cls._MAGIC:
+            raise ValueError("Not a transcript segments blob")
+
+        pos = cls._HEADER.size
+        arrays = []
+        for typecode in ("d", "d", "I"):
+            a = array(typecode)
+            size = count * a.itemsize
+            a.frombytes(blob[pos:pos + size])
+            if sys.byteorder == "big":
+                a.byteswap()
+            arrays.append(a)
+            pos += size
+        text = blob[pos:pos + text_len].decode("utf-8")
+        return cls(text, *arrays)
+
+
+class SegmentsBuilder:
+    """
+    Build TranscriptSegments one cleaned segment at a time
+
+    Used when segments arrive incrementally (e.g. a streamed caption file),
+    so no list of entry dicts is ever materialized.
+    """
+
+    def __init__(self):
+        self._segments = TranscriptSegments()
+        self._parts: List[str] = []
+        self.length = 0
+
+    def __len__(self) -> int:
+        return len(self._segments)
+
+    def add(self, text: str, start: float = 0.0, duration: float = 0.0) -> None:
+        """Append one already-cleaned segment; empty text is dropped"""
+        if not text:
+            return
+        # Punctuation that starts a segment attaches to the previous one
+        separator = "" if not self._parts or text[0] in ".,!?" else " "
+        self.length += len(separator)
+        self._segments.starts.append(float(start))
+        self._segments.durations.append(float(duration))
+        self._segments.offsets.append(self.length)
+        self._parts.append(separator)
+        self._parts.append(text)
+        self.length += len(text)
+
+    def build(self) -> TranscriptSegments:
+        """Finish and return the segments"""
+        self._segments.text = "".join(self._parts)
+        self._parts = []
+        return self._segments
+
+
+def locate_sources(segments: TranscriptSegments, queries: List[str], window_seconds: float) -> List[Optional[float]]:
+    """
+    Find the transcript time each query text most likely came from
+
+    Segments are grouped into time windows and ranked with BM25; each query
+    gets the start time of its best window, or None if nothing matches.
+    """
+    # Imported lazily: qa_service imports this module
+    from services.qa_service import BM25Index
+
+    if not len(segments):
+        return [None] * len(queries)
+
+    index = BM25Index(segments.windows(window_seconds))
+    located = []
+    for query in queries:
+        hits = index.search(query, top_k=1)
+        located.append(hits[0][0]["start"] if hits else None)
+    return located
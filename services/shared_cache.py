@@ -0,0 +1,220 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional, Set, Tuple
+from config import settings
+from services.compressed_store import CompressedStore
+from services.storage_service import connect_sqlite
+
+
+class SharedCache:
+    """
+    Host-local cache shared by every worker process
+
+    Backed by a SQLite database in WAL mode, so all uvicorn/gunicorn workers on
+    a host see the same entries. In-flight work is coordinated with leases: the
+    first worker to claim a key computes the value while the others wait for
+    it, so each unique video is generated once per host rather than once per
+    worker. Leases are renewed while the owner works and expire soon after
+    it dies.
+
+    An optional CompressedStore in front keeps recently used entries in this
+    process, compressed, so repeat hits skip SQLite. Front entries expire with
+    the entry they copy; entries are written once per key, so a copy never
+    disagrees with another worker's.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS entries (
+        key TEXT PRIMARY KEY,
+        value BLOB NOT NULL,
+        expires_at REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS leases (
+        key TEXT PRIMARY KEY,
+        owner TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    );
+    """
+
+    PURGE_EVERY = 256
+
+    def __init__(self, db_path: Optional[str] = None, front: Optional[CompressedStore] = None):
+        self.db_path = db_path or settings.SHARED_CACHE_PATH
+        self.front = front
+        self.default_ttl = settings.SHARED_CACHE_TTL_SECONDS
+        self.lease_ttl = settings.SHARED_CACHE_LEASE_SECONDS
+        self.poll_interval = 0.1
+        self._local = threading.local()
+        self._instance = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._sets = 0
+        # (key, owner) leases held while computing, renewed by a background thread
+        self._held: Set[Tuple[str, str]] = set()
+        self._held_lock = threading.Lock()
+        self._renewer: Optional[threading.Thread] = None
+        self._conn().executescript(self.SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect_sqlite(self.db_path)
+            self._local.conn = conn
+        return conn
+
+    def _owner(self) -> str:
+        """Lease owner ID, unique per process and thread"""
+        return f"{self._instance}:{threading.get_ident()}"
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached bytes for a key, or None if missing or expired"""
+        if self.front is not None:
+            value = self.front.get(key)
+            if value is not None:
+                return value
+        now = time.time()
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM entries WHERE key = ? AND expires_at > ?",
+            (key, now),
+        ).fetchone()
+        if not row:
+            return None
+        value = bytes(row["value"])
+        if self.front is not None:
+            self.front.put(key, value, ttl=row["expires_at"] - now)
+        return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        """Store bytes under a key for ttl seconds"""
+        ttl = ttl if ttl is not None else self.default_ttl
+        self._conn().execute(
+            "INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, time.time() + ttl),
+        )
+        if self.front is not None:
+            self.front.put(key, value, ttl=ttl)
+        self._sets += 1
+        if self._sets % self.PURGE_EVERY == 0:
+            self.purge_expired()
+
+    def delete(self, key: str) -> None:
+        """Remove a cached entry"""
+        self._conn().execute("DELETE FROM entries WHERE key = ?", (key,))
+        if self.front is not None:
+            self.front.delete(key)
+
+    def get_json(self, key: str) -> Optional[Dict]:
+        """Return a cached JSON value"""
+        value = self.get(key)
+        return json.loads(value) if value is not None else None
+
+    def set_json(self, key: str, value: Dict, ttl: Optional[float] = None) -> None:
+        """Store a JSON-serializable value"""
+        self.set(key, json.dumps(value).encode("utf-8"), ttl)
+
+    def purge_expired(self) -> None:
+        """Drop expired entries and leases"""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        conn.execute("DELETE FROM leases WHERE expires_at <= ?", (now,))
+
+    def try_acquire(self, key: str, ttl: Optional[float] = None) -> bool:
+        """
+        Claim the lease for a key
+
+        Returns True if this caller now owns the lease. Leases expire after
+        ttl seconds so a crashed worker cannot block a key forever.
+        """
+        now = time.time()
+        owner = self._owner()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT owner, expires_at FROM leases WHERE key = ?", (key,)
+            ).fetchone()
+            if row and row["expires_at"] > now and row["owner"] != owner:
+                conn.execute("COMMIT")
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)",
+                (key, owner, now + (ttl if ttl is not None else self.lease_ttl)),
+            )
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def release(self, key: str) -> None:
+        """Release a lease held by this caller"""
+        self._conn().execute(
+            "DELETE FROM leases WHERE key = ? AND owner = ?", (key, self._owner())
+        )
+
+    def _hold(self, key: str) -> None:
+        """Keep this caller's lease on a key alive until _unhold"""
+        with self._held_lock:
+            self._held.add((key, self._owner()))
+            if self._renewer is None:
+                self._renewer = threading.Thread(target=self._renew_leases, name="shared-cache-leases", daemon=True)
+                self._renewer.start()
+
+    def _unhold(self, key: str) -> None:
+        with self._held_lock:
+            self._held.discard((key, self._owner()))
+
+    def _renew_leases(self) -> None:
+        """Push back the expiry of held leases until none are left"""
+        while True:
+            time.sleep(self.lease_ttl / 3)
+            with self._held_lock:
+                if not self._held:
+                    self._renewer = None
+                    return
+                held = list(self._held)
+            expires_at = time.time() + self.lease_ttl
+            self._conn().executemany(
+                "UPDATE leases SET expires_at = ? WHERE key = ? AND owner = ?",
+                [(expires_at, key, owner) for key, owner in held],
+            )
+
+    def get_or_compute(self, key: str, compute: Callable[[], Optional[Dict]],
+                       ttl: Optional[float] = None) -> Optional[Dict]:
+        """
+        Return the cached JSON value for a key, computing it at most once per host
+
+        The lease is renewed while compute() runs, however long it takes.
+        Other callers wait for the value until the lease is released or
+        expires; if the owner failed (released without a value) or crashed
+        (stopped renewing), the next waiter takes over. A None result is
+        returned but not cached.
+        """
+        cached = self.get_json(key)
+        if cached is not None:
+            return cached
+
+        while True:
+            if self.try_acquire(key):
+                self._hold(key)
+                try:
+                    # Another worker may have finished between our miss and the claim
+                    cached = self.get_json(key)
+                    if cached is not None:
+                        return cached
+                    value = compute()
+                    if value is not None:
+                        self.set_json(key, value, ttl)
+                    return value
+                finally:
+                    self._unhold(key)
+                    self.release(key)
+
+            time.sleep(self.poll_interval)
+            cached = self.get_json(key)
+            if cached is not None:
+                return cached
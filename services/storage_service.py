@@ -0,0 +1,308 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from config import settings
+from services.segment_store import TranscriptSegments
+
+# Match markers for FTS snippets; stripped from indexed text on save
+HIGHLIGHT_OPEN = "\x02"
+HIGHLIGHT_CLOSE = "\x03"
+
+
+def _strip_markers(text: str) -> str:
+    return text.replace(HIGHLIGHT_OPEN, "").replace(HIGHLIGHT_CLOSE, "")
+
+
+def connect_sqlite(db_path: str) -> sqlite3.Connection:
+    """
+    Open a SQLite connection tuned for concurrent readers and a single writer
+
+    - WAL journal so searches never block on writes
+    - NORMAL sync (safe with WAL, far fewer fsyncs)
+    - busy timeout instead of immediate "database is locked" errors
+    """
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    return conn
+
+
+class MaterialsStore:
+    """Persistent store for transcripts and generated learning materials"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS videos (
+        id INTEGER PRIMARY KEY,
+        video_id TEXT NOT NULL UNIQUE,
+        content_hash TEXT NOT NULL,
+        title TEXT NOT NULL,
+        duration TEXT NOT NULL,
+        transcript TEXT NOT NULL,
+        response_json TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        segments BLOB
+    );
+    CREATE INDEX IF NOT EXISTS idx_videos_content_hash ON videos(content_hash);
+    CREATE INDEX IF NOT EXISTS idx_videos_created_at ON videos(created_at);
+    CREATE VIRTUAL TABLE IF NOT EXISTS videos_fts USING fts5(
+        title, key_points, summary, notes,
+        tokenize='porter unicode61'
+    );
+    """
+
+    # bm25 column weights: title, key_points, summary, notes
+    RANK_WEIGHTS = (10.0, 4.0, 2.0, 1.0)
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or settings.DATABASE_PATH
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(self.SCHEMA)
+        self._migrate(conn)
+        # Persist the weighted ranking so ORDER BY rank is computed inside FTS5
+        weights = ", ".join(str(w) for w in self.RANK_WEIGHTS)
+        conn.execute(
+            "INSERT INTO videos_fts (videos_fts, rank) VALUES ('rank', ?)",
+            (f"bm25({weights})",),
+        )
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        """Add columns introduced after a database was first created"""
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(videos)")}
+        if "segments" not in columns:
+            conn.execute("ALTER TABLE videos ADD COLUMN segments BLOB")
+
+    def _conn(self) -> sqlite3.Connection:
+        """Return this thread's connection (sqlite3 connections are not shareable)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect_sqlite(self.db_path)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        """Stable hash of transcript text used for de-duplication"""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def save(self, video_id: str, transcript: str, response: Dict, duration: str = "N/A",
+             segments: Optional[TranscriptSegments] = None) -> None:
+        """
+        Insert or replace the stored materials for a video
+
+        Args:
+            video_id: YouTube video ID (or a transcript-derived ID)
+            transcript: Cleaned transcript text
+            response: VideoResponse payload as a dict
+            duration: Video duration string
+            segments: Optional timestamped segments for the transcript
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                """
+                INSERT INTO videos (video_id, content_hash, title, duration, transcript, response_json, created_at, segments)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(video_id) DO UPDATE SET
+                    content_hash = excluded.content_hash,
+                    title = excluded.title,
+                    duration = excluded.duration,
+                    transcript = excluded.transcript,
+                    response_json = excluded.response_json,
+                    created_at = excluded.created_at,
+                    segments = excluded.segments
+                RETURNING id
+                """,
+                (
+                    video_id,
+                    self.content_hash(transcript),
+                    response.get("video_title", ""),
+                    duration,
+                    transcript,
+                    json.dumps(response),
+                    time.time(),
+                    segments.to_bytes() if segments is not None else None,
+                ),
+            ).fetchone()
+
+            rowid = row["id"]
+            conn.execute("DELETE FROM videos_fts WHERE rowid = ?", (rowid,))
+            conn.execute(
+                "INSERT INTO videos_fts (rowid, title, key_points, summary, notes) VALUES (?, ?, ?, ?, ?)",
+                (
+                    rowid,
+                    _strip_markers(response.get("video_title", "")),
+                    _strip_markers("\n".join(response.get("key_points", []))),
+                    _strip_markers(response.get("summary", "")),
+                    _strip_markers("\n".join(response.get("notes", []))),
+                ),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _row_to_dict(self, row: sqlite3.Row) -> Dict:
+        return {
+            "video_id": row["video_id"],
+            "content_hash": row["content_hash"],
+            "title": row["title"],
+            "duration": row["duration"],
+            "transcript": row["transcript"],
+            "response": json.loads(row["response_json"]),
+            "created_at": row["created_at"],
+            "segments": TranscriptSegments.from_bytes(row["segments"]) if row["segments"] is not None else None,
+        }
+
+    def get_by_video_id(self, video_id: str) -> Optional[Dict]:
+        """Fetch stored materials by video ID"""
+        row = self._conn().execute(
+            "SELECT * FROM videos WHERE video_id = ?", (video_id,)
+        ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def get_video_info(self, video_id: str) -> Optional[Dict]:
+        """Fetch lightweight metadata for a video without loading its transcript or payload"""
+        row = self._conn().execute(
+            "SELECT video_id, content_hash, title, duration, created_at FROM videos WHERE video_id = ?",
+            (video_id,),
+        ).fetchone()
+        return dict(row) if row else None
+
+    def get_materials(self, video_ids: List[str]) -> Dict[str, Dict]:
+        """Fetch the generated materials for many videos in one query, without transcripts"""
+        if not video_ids:
+            return {}
+        placeholders = ",".join("?" * len(video_ids))
+        rows = self._conn().execute(
+            f"SELECT video_id, response_json FROM videos WHERE video_id IN ({placeholders})",
+            list(video_ids),
+        )
+        return {row["video_id"]: json.loads(row["response_json"]) for row in rows}
+
+    def get_transcript(self, video_id: str) -> Optional[str]:
+        """Fetch only the stored transcript text for a video"""
+        row = self._conn().execute(
+            "SELECT transcript FROM videos WHERE video_id = ?", (video_id,)
+        ).fetchone()
+        return row["transcript"] if row else None
+
+    def get_segments(self, video_id: str) -> Optional[TranscriptSegments]:
+        """Fetch the timestamped segments for a video, if they were stored"""
+        row = self._conn().execute(
+            "SELECT segments FROM videos WHERE video_id = ?", (video_id,)
+        ).fetchone()
+        if not row or row["segments"] is None:
+            return None
+        return TranscriptSegments.from_bytes(row["segments"])
+
+    def get_by_content_hash(self, content_hash: str) -> Optional[Dict]:
+        """Fetch the most recent stored materials for a transcript hash"""
+        row = self._conn().execute(
+            "SELECT * FROM videos WHERE content_hash = ? ORDER BY created_at DESC LIMIT 1",
+            (content_hash,),
+        ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def _build_match_query(self, query: str) -> str:
+        """
+        Turn free text into a safe FTS5 MATCH expression
+
+        Every word is quoted (so FTS5 operators in user input are inert) and
+        the last word is prefix-matched to support search-as-you-type.
+        """
+        tokens = re.findall(r"\w+", query.lower())
+        if not tokens:
+            return ""
+        terms = [f'"{t}"' for t in tokens]
+        terms[-1] += "*"
+        return " ".join(terms)
+
+    @staticmethod
+    def _split_highlights(marked: str) -> Tuple[str, List[List[int]]]:
+        """
+        Strip snippet() match markers and return (text, [[start, end], ...])
+
+        Markers are control characters rather than HTML tags, so the snippet
+        stays plain text and clients highlight by offset without having to
+        trust stored (user-supplied) titles and notes.
+        """
+        parts = []
+        highlights = []
+        length = 0
+        for i, piece in enumerate(re.split(f"[{HIGHLIGHT_OPEN}{HIGHLIGHT_CLOSE}]", marked)):
+            if i % 2:
+                highlights.append([length, length + len(piece)])
+            parts.append(piece)
+            length += len(piece)
+        return "".join(parts), highlights
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Dict:
+        """
+        Full-text search over titles, key points, summaries and notes
+
+        Returns:
+            Dict with ranked 'results' and a 'has_more' pagination flag
+        """
+        match = self._build_match_query(query)
+        if not match:
+            return {"results": [], "has_more": False}
+
+        conn = self._conn()
+        # Rank and page inside the FTS index using its built-in rank column,
+        # then build snippets only for the rows actually returned
+        hits = conn.execute(
+            """
+            SELECT rowid, rank FROM videos_fts
+            WHERE videos_fts MATCH ?
+            ORDER BY rank
+            LIMIT ? OFFSET ?
+            """,
+            (match, limit + 1, offset),
+        ).fetchall()
+        page = hits[:limit]
+        if not page:
+            return {"results": [], "has_more": False}
+
+        rowids = [hit["rowid"] for hit in page]
+        placeholders = ",".join("?" * len(rowids))
+        rows = conn.execute(
+            f"""
+            SELECT f.rowid, v.video_id, v.title, v.created_at,
+                   snippet(videos_fts, -1, ?, ?, '...', 16) AS snippet
+            FROM videos_fts f
+            JOIN videos v ON v.id = f.rowid
+            WHERE videos_fts MATCH ? AND f.rowid IN ({placeholders})
+            """,
+            (HIGHLIGHT_OPEN, HIGHLIGHT_CLOSE, match, *rowids),
+        ).fetchall()
+        by_rowid = {row["rowid"]: row for row in rows}
+
+        results = []
+        for hit in page:
+            row = by_rowid.get(hit["rowid"])
+            if row is None:
+                continue
+            snippet, highlights = self._split_highlights(row["snippet"])
+            results.append({
+                "video_id": row["video_id"],
+                "title": row["title"],
+                "snippet": snippet,
+                "highlights": highlights,
+                # bm25() is lower-is-better; flip it so clients sort descending
+                "score": -hit["rank"],
+                "created_at": row["created_at"],
+            })
+        return {"results": results, "has_more": len(hits) > limit}
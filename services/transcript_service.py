@@ -1,18 +1,73 @@
-from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound
+from youtube_transcript_api._errors import (
+    TranscriptsDisabled, NoTranscriptFound, NoTranscriptAvailable, VideoUnavailable, InvalidVideoId
+)
+from youtube_transcript_api._transcripts import TranscriptListFetcher
 import re
-from typing import Dict, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional
+import httplib2
 import isodate
+import requests
 from googleapiclient.discovery import build
 from config import settings
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from services.http_clients import TimeoutHTTPAdapter
+from services.segment_store import TranscriptSegments
+
+# Answers about the video itself, not signs that YouTube is unhealthy
+_VIDEO_ERRORS = (TranscriptsDisabled, NoTranscriptFound, NoTranscriptAvailable, VideoUnavailable, InvalidVideoId)
+
+# Used when metadata is unavailable, slow or not configured
+DEFAULT_METADATA = {"title": "YouTube Video", "duration": "Unknown"}
 
 
 class TranscriptService:
     """Service to handle YouTube transcript extraction and cleaning"""
     
-    def __init__(self):
+    def __init__(self, http_session: Optional[requests.Session] = None):
         self.youtube_api_key = settings.YOUTUBE_API_KEY
         self.MAX_TOKENS = settings.MAX_TRANSCRIPT_TOKENS
+        self.http_session = http_session
+        # Used until a pooled session is set, so every fetch still has a timeout
+        self._fallback_session = requests.Session()
+        self._fallback_session.mount("https://", TimeoutHTTPAdapter(timeout=settings.YOUTUBE_TIMEOUT_SECONDS))
+        self._fallback_session.mount("http://", TimeoutHTTPAdapter(timeout=settings.YOUTUBE_TIMEOUT_SECONDS))
+        self.source_url = settings.TRANSCRIPT_SOURCE_URL.rstrip("/")
+        self.breaker = CircuitBreaker("youtube", slow_call_seconds=settings.YOUTUBE_SLOW_CALL_SECONDS)
+        # googleapiclient resources are not thread-safe; keep one per thread
+        self._local = threading.local()
+        # Runs metadata lookups concurrently with transcript fetches
+        self._metadata_executor = ThreadPoolExecutor(
+            max_workers=settings.METADATA_FETCH_WORKERS,
+            thread_name_prefix="yt-metadata"
+        )
+    
+    def set_http_session(self, http_session: Optional[requests.Session]) -> None:
+        """Fetch transcripts through a pooled keep-alive session (or a fresh one when None)"""
+        self.http_session = http_session
+    
+    def _youtube_client(self):
+        """Build the YouTube Data API client once per thread and reuse it"""
+        youtube = getattr(self._local, "youtube", None)
+        if youtube is None:
+            # httplib2 has no timeout by default; a hung Data API call would hang the request
+            http = httplib2.Http(timeout=settings.YOUTUBE_TIMEOUT_SECONDS)
+            youtube = build('youtube', 'v3', developerKey=self.youtube_api_key, http=http, cache_discovery=False)
+            self._local.youtube = youtube
+        return youtube
+    
+    def _fetch_transcript_entries(self, video_id: str, languages=('en',)) -> List[Dict]:
+        """Fetch raw caption entries, reusing pooled connections when available"""
+        session = self.http_session or self._fallback_session
+        if self.source_url:
+            response = session.get(f"{self.source_url}/transcripts/{video_id}")
+            if response.status_code == 404:
+                raise TranscriptsDisabled(video_id)
+            response.raise_for_status()
+            return response.json()
+        transcript_list = TranscriptListFetcher(session).fetch(video_id)
+        return transcript_list.find_transcript(languages).fetch()
     
     def extract_video_id(self, url: str) -> str:
         """Extract video ID from various YouTube URL formats"""
@@ -31,11 +86,18 @@ class TranscriptService:
     def get_video_metadata(self, video_id: str) -> Dict[str, str]:
         """Fetch video metadata using YouTube Data API"""
         try:
+            if self.source_url:
+                session = self.http_session or self._fallback_session
+                response = session.get(f"{self.source_url}/videos/{video_id}")
+                response.raise_for_status()
+                item = response.json()
+                return {"title": item["title"], "duration": item["duration"]}
+            
             if not self.youtube_api_key:
                 # Fallback if no API key
-                return {"title": "YouTube Video", "duration": "Unknown"}
+                return dict(DEFAULT_METADATA)
             
-            youtube = build('youtube', 'v3', developerKey=self.youtube_api_key)
+            youtube = self._youtube_client()
             request = youtube.videos().list(
                 part="snippet,contentDetails",
                 id=video_id
@@ -54,65 +116,100 @@ class TranscriptService:
         except Exception:
             pass
         
-        return {"title": "YouTube Video", "duration": "Unknown"}
+        return dict(DEFAULT_METADATA)
     
     def get_transcript(self, video_url: str) -> Optional[Dict[str, str]]:
         """
         Fetch and clean transcript from YouTube video
         
         Returns:
-            Dict with 'text', 'title', and 'duration' or None if unavailable
+            Dict with 'text', 'segments', 'title', and 'duration' or None if unavailable
         """
+        metadata_future = None
         try:
             # Extract video ID
             video_id = self.extract_video_id(video_url)
             
-            # Fetch transcript
-            transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
+            # Start the metadata round trip; it is independent of the transcript
+            if self.youtube_api_key or self.source_url:
+                metadata_future = self._metadata_executor.submit(self.get_video_metadata, video_id)
             
-            # Clean and format transcript
-            cleaned_text = self._clean_transcript(transcript_list)
+            # Fetch transcript (fails fast while YouTube is known to be down)
+            transcript_list = self.breaker.call(
+                self._fetch_transcript_entries,
+                video_id,
+                is_failure=lambda e: not isinstance(e, _VIDEO_ERRORS)
+            )
+            
+            # Clean and format transcript (overlaps with the metadata call)
+            segments = self._build_segments(transcript_list)
             
             # Get metadata
-            metadata = self.get_video_metadata(video_id)
+            if metadata_future is not None:
+                try:
+                    metadata = metadata_future.result(timeout=settings.YOUTUBE_TIMEOUT_SECONDS)
+                except FutureTimeoutError:
+                    metadata = dict(DEFAULT_METADATA)
+            else:
+                metadata = self.get_video_metadata(video_id)
             
             return {
-                "text": cleaned_text,
+                "text": segments.text,
+                "segments": segments,
                 "title": metadata["title"],
                 "duration": metadata["duration"]
             }
             
         except (TranscriptsDisabled, NoTranscriptFound):
             return None
+        except CircuitOpenError:
+            raise
         except Exception as e:
             raise Exception(f"Error fetching transcript: {str(e)}")
+        finally:
+            # No transcript means no use for metadata. A lookup still queued is
+            # dropped; one already running (the usual case) can't be interrupted,
+            # so it finishes in the background and its result is ignored
+            if metadata_future is not None and not metadata_future.done():
+                metadata_future.cancel()
     
-    def _clean_transcript(self, transcript_list: list) -> str:
+    def _clean_segment_text(self, text: str) -> str:
         """
-        Clean and format transcript text
+        Clean a single caption segment
         
-        - Combines all segments
-        - Removes duplicate phrases
+        - Removes caption artifacts like [Music] and (inaudible)
         - Fixes spacing and punctuation
-        - Removes timestamps and artifacts
         """
-        # Combine all text
-        full_text = " ".join([entry['text'] for entry in transcript_list])
-        
-        # Remove multiple spaces
-        full_text = re.sub(r'\s+', ' ', full_text)
+        text = re.sub(r'\[.*?\]', '', text)  # Remove [Music], [Applause]
+        text = re.sub(r'\(.*?\)', '', text)  # Remove (inaudible)
         
-        # Remove common caption artifacts
-        full_text = re.sub(r'\[.*?\]', '', full_text)  # Remove [Music], [Applause]
-        full_text = re.sub(r'\(.*?\)', '', full_text)  # Remove (inaudible)
+        # Collapse whitespace (including newlines) to single spaces
+        text = re.sub(r'\s+', ' ', text)
         
         # Clean up punctuation spacing
-        full_text = re.sub(r'\s+([.,!?])', r'\1', full_text)
+        text = re.sub(r'\s+([.,!?])', r'\1', text)
         
-        # Remove extra newlines
-        full_text = re.sub(r'\n+', '\n', full_text)
+        return text.strip()
+    
+    def _build_segments(self, transcript_list: list) -> TranscriptSegments:
+        """
+        Clean transcript entries into a compact segment store
         
-        return full_text.strip()
+        Keeps each segment's start and duration so text can be mapped back to
+        video time. Segments that are pure artifacts are dropped.
+        """
+        return TranscriptSegments.from_entries(transcript_list, clean=self._clean_segment_text)
+    
+    def _clean_transcript(self, transcript_list: list) -> str:
+        """
+        Clean and format transcript text
+        
+        - Combines all segments
+        - Removes caption artifacts
+        - Fixes spacing and punctuation
+        - Removes timestamps
+        """
+        return self._build_segments(transcript_list).text
     
     def is_too_long(self, text: str) -> bool:
         """
@@ -0,0 +1,300 @@
+import contextvars
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from config import settings
+from services.storage_service import connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+# Who an LLM call is made for; set per request so services deep in the
+# pipeline can attribute usage without threading IDs through every call
+usage_context: contextvars.ContextVar = contextvars.ContextVar("usage_context", default=None)
+
+
+def set_usage_context(client_id: str, endpoint: str, video_id: Optional[str] = None) -> None:
+    """Attribute LLM calls made by the current request"""
+    usage_context.set({"client_id": client_id, "endpoint": endpoint, "video_id": video_id})
+
+
+def current_usage_context() -> Dict:
+    """Attribution for the current call (anonymous when outside a request)"""
+    return usage_context.get() or {"client_id": "internal", "endpoint": "unknown", "video_id": None}
+
+
+class BudgetExceededError(Exception):
+    """The client has used up its daily token budget"""
+
+    def __init__(self, client_id: str, used: int, budget: int):
+        super().__init__(f"Daily token budget exhausted for client '{client_id}' ({used}/{budget} tokens)")
+        self.client_id = client_id
+        self.used = used
+        self.budget = budget
+
+
+def _utc_day(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+class UsageLedger:
+    """
+    Append-only ledger of LLM calls with per-client daily token budgets
+
+    Calls are queued in memory and written by a background thread in
+    batches, so recording usage never adds a database write to the request
+    path.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS llm_calls (
+        id INTEGER PRIMARY KEY,
+        ts REAL NOT NULL,
+        day TEXT NOT NULL,
+        client_id TEXT NOT NULL,
+        endpoint TEXT NOT NULL,
+        video_id TEXT,
+        model TEXT NOT NULL,
+        prompt_tokens INTEGER NOT NULL,
+        completion_tokens INTEGER NOT NULL,
+        latency_ms REAL NOT NULL,
+        cache_status TEXT NOT NULL,
+        cached_tokens INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_llm_calls_client_day ON llm_calls(client_id, day);
+    CREATE INDEX IF NOT EXISTS idx_llm_calls_day ON llm_calls(day);
+    CREATE TABLE IF NOT EXISTS budgets (
+        client_id TEXT PRIMARY KEY,
+        daily_tokens INTEGER NOT NULL
+    );
+    """
+
+    BUDGET_CACHE_SECONDS = 5.0
+    # Give up on rows that still cannot be written once the ledger is closing
+    MAX_WRITE_ATTEMPTS_ON_CLOSE = 3
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or settings.USAGE_DB_PATH
+        self.batch_size = settings.USAGE_FLUSH_BATCH
+        self.flush_interval = settings.USAGE_FLUSH_SECONDS
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(self.SCHEMA)
+        self._migrate(conn)
+
+        self._queue: "queue.Queue" = queue.Queue()
+        # Tokens queued but not yet written, per (client_id, day)
+        self._pending: Dict[tuple, int] = {}
+        # (client_id, day) -> (expires_at, tokens already in the database)
+        self._used_cache: Dict[tuple, tuple] = {}
+        self._budget_cache: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self._flushed = threading.Condition(self._lock)
+        self._stopping = False
+        self._writer = threading.Thread(target=self._run_writer, name="usage-ledger", daemon=True)
+        self._writer.start()
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        """Add columns introduced after a ledger was first created"""
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(llm_calls)")}
+        if "cached_tokens" not in columns:
+            conn.execute("ALTER TABLE llm_calls ADD COLUMN cached_tokens INTEGER NOT NULL DEFAULT 0")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect_sqlite(self.db_path)
+            self._local.conn = conn
+        return conn
+
+    def record(self, model: str, prompt_tokens: int, completion_tokens: int, latency_ms: float,
+               cache_status: str = "miss", client_id: Optional[str] = None,
+               endpoint: Optional[str] = None, video_id: Optional[str] = None, cached_tokens: int = 0) -> None:
+        """
+        Queue one LLM call (or cache hit) for the ledger; attribution defaults to the usage context
+
+        Args:
+            cached_tokens: Prompt tokens the provider served from its prompt cache
+                (already included in prompt_tokens)
+        """
+        context = current_usage_context()
+        ts = time.time()
+        row = (
+            ts, _utc_day(ts),
+            client_id or context["client_id"],
+            endpoint or context["endpoint"],
+            video_id if video_id is not None else context["video_id"],
+            model, int(prompt_tokens or 0), int(completion_tokens or 0), float(latency_ms), cache_status,
+            int(cached_tokens or 0),
+        )
+        with self._lock:
+            key = (row[2], row[1])
+            self._pending[key] = self._pending.get(key, 0) + row[6] + row[7]
+        self._queue.put(row)
+
+    def _run_writer(self) -> None:
+        # A batch whose write failed; retried before anything new is taken
+        batch: List[tuple] = []
+        failures = 0
+        while True:
+            try:
+                if not batch:
+                    batch.append(self._queue.get(timeout=self.flush_interval))
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            if batch:
+                try:
+                    self._write(batch)
+                    batch, failures = [], 0
+                except Exception:
+                    failures += 1
+                    logger.exception("Usage ledger write of %d rows failed (attempt %d)", len(batch), failures)
+                    if self._stopping and failures >= self.MAX_WRITE_ATTEMPTS_ON_CLOSE:
+                        return
+                    time.sleep(min(self.flush_interval * failures, 5.0))
+            elif self._stopping:
+                return
+
+            with self._lock:
+                self._flushed.notify_all()
+
+    def _write(self, batch: List[tuple]) -> None:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                """
+                INSERT INTO llm_calls (ts, day, client_id, endpoint, video_id, model,
+                                       prompt_tokens, completion_tokens, latency_ms, cache_status,
+                                       cached_tokens)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                batch,
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        with self._lock:
+            for row in batch:
+                key = (row[2], row[1])
+                tokens = row[6] + row[7]
+                remaining = self._pending.get(key, 0) - tokens
+                if remaining > 0:
+                    self._pending[key] = remaining
+                else:
+                    self._pending.pop(key, None)
+                # Keep the cached database total in step with what we just wrote
+                cached = self._used_cache.get(key)
+                if cached:
+                    self._used_cache[key] = (cached[0], cached[1] + tokens)
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Block until everything queued so far has been written"""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while (self._pending or not self._queue.empty()) and time.monotonic() < deadline:
+                self._flushed.wait(timeout=max(0.0, deadline - time.monotonic()))
+
+    def close(self) -> None:
+        """Flush outstanding rows and stop the writer thread"""
+        self._stopping = True
+        self._writer.join(timeout=max(5.0, self.flush_interval * 2))
+
+    def set_budget(self, client_id: str, daily_tokens: Optional[int]) -> None:
+        """Set (or with None, remove) a client's daily token budget"""
+        conn = self._conn()
+        if daily_tokens is None:
+            conn.execute("DELETE FROM budgets WHERE client_id = ?", (client_id,))
+        else:
+            conn.execute(
+                "INSERT OR REPLACE INTO budgets (client_id, daily_tokens) VALUES (?, ?)",
+                (client_id, int(daily_tokens)),
+            )
+        with self._lock:
+            self._budget_cache.pop(client_id, None)
+
+    def get_budget(self, client_id: str) -> Optional[int]:
+        """A client's daily token budget, falling back to the default (None = unlimited)"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._budget_cache.get(client_id)
+            if cached and cached[0] > now:
+                return cached[1]
+
+        row = self._conn().execute(
+            "SELECT daily_tokens FROM budgets WHERE client_id = ?", (client_id,)
+        ).fetchone()
+        budget = row["daily_tokens"] if row else (settings.DEFAULT_DAILY_TOKEN_BUDGET or None)
+        with self._lock:
+            self._budget_cache[client_id] = (now + self.BUDGET_CACHE_SECONDS, budget)
+        return budget
+
+    def list_budgets(self) -> Dict[str, int]:
+        """All explicitly configured budgets"""
+        rows = self._conn().execute("SELECT client_id, daily_tokens FROM budgets ORDER BY client_id")
+        return {row["client_id"]: row["daily_tokens"] for row in rows}
+
+    def used_today(self, client_id: str) -> int:
+        """Tokens used by a client today, including calls not yet written"""
+        key = (client_id, _utc_day(time.time()))
+        now = time.monotonic()
+        with self._lock:
+            cached = self._used_cache.get(key)
+            pending = self._pending.get(key, 0)
+        if cached and cached[0] > now:
+            return cached[1] + pending
+
+        row = self._conn().execute(
+            "SELECT COALESCE(SUM(prompt_tokens + completion_tokens), 0) AS used "
+            "FROM llm_calls WHERE client_id = ? AND day = ?",
+            key,
+        ).fetchone()
+        with self._lock:
+            self._used_cache[key] = (now + self.BUDGET_CACHE_SECONDS, row["used"])
+            pending = self._pending.get(key, 0)
+        return row["used"] + pending
+
+    def check_budget(self, client_id: Optional[str] = None) -> None:
+        """
+        Raise BudgetExceededError if the client has no budget left today
+
+        Args:
+            client_id: Client to check (defaults to the current usage context)
+        """
+        client_id = client_id or current_usage_context()["client_id"]
+        budget = self.get_budget(client_id)
+        if budget is None:
+            return
+        used = self.used_today(client_id)
+        if used >= budget:
+            raise BudgetExceededError(client_id, used, budget)
+
+    def usage(self, client_id: Optional[str] = None, days: int = 7) -> List[Dict]:
+        """Aggregated usage per client and UTC day, most recent first"""
+        since = (datetime.now(timezone.utc) - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        query = """
+            SELECT client_id, day,
+                   COUNT(*) AS calls,
+                   SUM(cache_status = 'hit') AS cache_hits,
+                   SUM(prompt_tokens) AS prompt_tokens,
+                   SUM(cached_tokens) AS cached_prompt_tokens,
+                   SUM(completion_tokens) AS completion_tokens,
+                   SUM(prompt_tokens + completion_tokens) AS total_tokens,
+                   AVG(CASE WHEN cache_status != 'hit' THEN latency_ms END) AS avg_latency_ms
+            FROM llm_calls
+            WHERE day >= ?
+        """
+        params: list = [since]
+        if client_id:
+            query += " AND client_id = ?"
+            params.append(client_id)
+        query += " GROUP BY client_id, day ORDER BY day DESC, total_tokens DESC"
+        return [dict(row) for row in self._conn().execute(query, params)]
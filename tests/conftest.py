@@ -0,0 +1,14 @@
+"""
+Shared pytest configuration
+"""
+import os
+import tempfile
+
+# Keep the app's on-disk stores out of the working tree during tests.
+# Must run before config.settings is imported by any test module.
+_test_data_dir = tempfile.mkdtemp(prefix="svlt-tests-")
+os.environ.setdefault("DATABASE_PATH", os.path.join(_test_data_dir, "materials.db"))
+os.environ.setdefault("SHARED_CACHE_PATH", os.path.join(_test_data_dir, "shared_cache.db"))
+os.environ.setdefault("USAGE_DB_PATH", os.path.join(_test_data_dir, "usage.db"))
+# Don't open connections to real upstreams when tests start the app lifespan
+os.environ.setdefault("HTTP_WARMUP_ENABLED", "False")
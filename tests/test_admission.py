@@ -0,0 +1,166 @@
+"""
+Unit tests for admission control
+"""
+import asyncio
+import time
+
+import pytest
+from services.admission import AdmissionController, AdmissionRejected
+
+
+async def _job(controller, client_id, seconds, results, cost=0):
+    start = time.monotonic()
+    try:
+        async with controller.admit(client_id, cost):
+            await asyncio.sleep(seconds)
+        results.append(("ok", time.monotonic() - start))
+    except AdmissionRejected as e:
+        results.append((e.status_code, time.monotonic() - start, e.retry_after))
+
+
+class TestAdmissionController:
+    """Test cases for AdmissionController"""
+    
+    def _controller(self, **overrides):
+        options = dict(max_in_flight=2, max_queue=2, queue_timeout=5,
+                       client_concurrency=0, client_tokens_per_minute=0)
+        options.update(overrides)
+        return AdmissionController(**options)
+    
+    def test_sheds_load_beyond_queue(self):
+        """Test overload is rejected fast with 503 instead of queuing forever"""
+        controller = self._controller()
+        results = []
+        
+        async def run():
+            await asyncio.gather(*[_job(controller, f"c{i}", 0.1, results) for i in range(10)])
+        
+        asyncio.run(run())
+        
+        ok = [r for r in results if r[0] == "ok"]
+        shed = [r for r in results if r[0] == 503]
+        assert len(ok) == 4  # 2 in flight + 2 queued
+        assert len(shed) == 6
+        assert all(r[1] < 0.05 for r in shed)  # rejected immediately
+        assert all(r[2] >= 1 for r in shed)    # with a Retry-After hint
+        assert controller.in_flight == 0
+    
+    def test_queue_deadline(self):
+        """Test queued requests give up after the queue timeout"""
+        controller = self._controller(max_in_flight=1, max_queue=5, queue_timeout=0.05)
+        results = []
+        
+        async def run():
+            await asyncio.gather(
+                _job(controller, "a", 0.3, results),
+                _job(controller, "b", 0.01, results)
+            )
+        
+        asyncio.run(run())
+        
+        assert sorted(str(r[0]) for r in results) == ["503", "ok"]
+        assert controller.in_flight == 0
+        assert controller.snapshot()["queued"] == 0
+    
+    def test_queued_requests_run_in_order(self):
+        """Test freed slots are handed to waiters FIFO"""
+        controller = self._controller(max_in_flight=1, max_queue=3)
+        order = []
+        
+        async def job(name):
+            async with controller.admit(name):
+                order.append(name)
+                await asyncio.sleep(0.01)
+        
+        async def run():
+            await asyncio.gather(*[job(n) for n in "abcd"])
+        
+        asyncio.run(run())
+        assert order == list("abcd")
+    
+    def test_per_client_concurrency(self):
+        """Test one client cannot hog every slot"""
+        controller = self._controller(max_in_flight=10, client_concurrency=1)
+        results = []
+        
+        async def run():
+            await asyncio.gather(
+                _job(controller, "greedy", 0.05, results),
+                _job(controller, "greedy", 0.05, results),
+                _job(controller, "polite", 0.05, results)
+            )
+        
+        asyncio.run(run())
+        assert sorted(str(r[0]) for r in results) == ["429", "ok", "ok"]
+    
+    def test_per_client_token_quota(self):
+        """Test clients over their token rate get 429 with a wait hint"""
+        controller = self._controller(client_tokens_per_minute=6000)
+        results = []
+        
+        async def run():
+            await _job(controller, "c", 0, results, cost=5000)
+            await _job(controller, "c", 0, results, cost=5000)
+            await _job(controller, "other", 0, results, cost=5000)
+        
+        asyncio.run(run())
+        assert [r[0] for r in results] == ["ok", 429, "ok"]
+        assert results[1][2] == pytest.approx(40, abs=1)
+    
+    def test_exception_releases_slot(self):
+        """Test a failing generation frees its slot"""
+        controller = self._controller(max_in_flight=1)
+        
+        async def run():
+            with pytest.raises(RuntimeError):
+                async with controller.admit("c"):
+                    raise RuntimeError("boom")
+        
+        asyncio.run(run())
+        assert controller.in_flight == 0
+        assert controller._client_active == {}
+    
+    def test_shed_request_gets_its_tokens_back(self):
+        """Test a request rejected because the queue is full is not charged"""
+        controller = self._controller(max_in_flight=1, max_queue=0, client_tokens_per_minute=6000)
+        results = []
+        
+        async def run():
+            await asyncio.gather(
+                _job(controller, "a", 0.05, results),
+                _job(controller, "b", 0, results, cost=5000)
+            )
+            await _job(controller, "b", 0, results, cost=5000)
+        
+        asyncio.run(run())
+        assert [r[0] for r in results] == [503, "ok", "ok"]
+    
+    def test_token_buckets_are_bounded(self, monkeypatch):
+        """Test new client IDs can't grow the bucket map without limit"""
+        monkeypatch.setattr(AdmissionController, "MAX_BUCKETS", 50)
+        controller = self._controller(client_tokens_per_minute=6000)
+        
+        async def run():
+            for i in range(200):
+                async with controller.admit(f"client-{i}", 10):
+                    pass
+        
+        asyncio.run(run())
+        assert len(controller._buckets) <= 50
+        assert "client-199" in controller._buckets
+    
+    def test_per_client_limits_need_an_identity_source(self, monkeypatch, caplog):
+        """Test per-client limits stay off (with a warning) when every caller may share one address"""
+        from config import settings
+        
+        monkeypatch.setattr(settings, "ADMISSION_CLIENT_CONCURRENCY", 2)
+        monkeypatch.setattr(settings, "ADMISSION_CLIENT_TOKENS_PER_MINUTE", 60000)
+        monkeypatch.setattr(settings, "CLIENT_API_KEYS", [])
+        monkeypatch.setattr(settings, "TRUSTED_PROXIES", [])
+        controller = AdmissionController()
+        assert (controller.client_concurrency, controller.client_tokens_per_minute) == (0, 0)
+        assert "CLIENT_API_KEYS or TRUSTED_PROXIES" in caplog.text
+        
+        monkeypatch.setattr(settings, "TRUSTED_PROXIES", ["10.0.0.1"])
+        controller = AdmissionController()
+        assert (controller.client_concurrency, controller.client_tokens_per_minute) == (2, 60000)
@@ -52,3 +52,228 @@ class TestAPIEndpoints:
         )
         # We expect either success or a specific error (404, 500), not validation error (422)
         assert response.status_code in [200, 404, 500, 413]
+    
+    def test_search_requires_query(self):
+        """Test search rejects a missing query"""
+        response = client.get("/search")
+        assert response.status_code == 422
+    
+    def test_search_returns_paginated_results(self):
+        """Test search response shape"""
+        response = client.get("/search", params={"q": "machine learning", "limit": 5})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["query"] == "machine learning"
+        assert data["limit"] == 5
+        assert isinstance(data["results"], list)
+    
+    def test_ask_unknown_video(self):
+        """Test asking about an unprocessed video returns 404"""
+        response = client.post("/videos/does-not-exist/ask", json={"question": "What is covered?"})
+        assert response.status_code == 404
+    
+    def test_ask_validates_question(self):
+        """Test empty questions are rejected"""
+        response = client.post("/videos/any/ask", json={"question": ""})
+        assert response.status_code == 422
+    
+    def test_overload_sheds_with_retry_after_but_serves_cache_hits(self, monkeypatch):
+        """Test a saturated server rejects new work fast but still serves cached results"""
+        import main
+        from services.admission import AdmissionController
+        from services.storage_service import MaterialsStore
+        
+        monkeypatch.setattr(main, "admission", AdmissionController(
+            max_in_flight=0, max_queue=0, queue_timeout=1,
+            client_concurrency=0, client_tokens_per_minute=0
+        ))
+        transcript = "An overloaded server should shed load. " * 5
+        
+        response = client.post("/process-transcript", json={"transcript": transcript, "video_title": "T"})
+        assert response.status_code == 503
+        assert int(response.headers["Retry-After"]) >= 1
+        
+        cached = {
+            "summary": "S", "key_points": ["k"] * 5, "notes": ["n"] * 5, "quiz": [],
+            "video_title": "T", "duration": "N/A", "video_id": "abc"
+        }
+        main.shared_cache.set_json(
+            "result:transcript:" + MaterialsStore.content_hash(f"T\n{transcript}"), cached
+        )
+        response = client.post("/process-transcript", json={"transcript": transcript, "video_title": "T"})
+        assert response.status_code == 200
+        assert response.json()["summary"] == "S"
+    
+    def test_admin_usage_requires_key(self, monkeypatch):
+        """Test admin endpoints are closed without the configured key"""
+        from config import settings
+        
+        monkeypatch.setattr(settings, "ADMIN_API_KEY", "secret")
+        assert client.get("/admin/usage").status_code == 403
+        assert client.get("/admin/usage", headers={"X-Admin-Key": "wrong"}).status_code == 403
+        
+        response = client.get("/admin/usage", headers={"X-Admin-Key": "secret"})
+        assert response.status_code == 200
+        assert response.json()["days"] == 7
+    
+    def test_exhausted_budget_returns_429(self, monkeypatch):
+        """Test a client over its daily budget is refused before any LLM call"""
+        import main
+        from config import settings
+        
+        monkeypatch.setattr(settings, "ADMIN_API_KEY", "secret")
+        monkeypatch.setattr(settings, "CLIENT_API_KEYS", ["client-key"])
+        headers = {"X-Admin-Key": "secret"}
+        response = client.put("/admin/budgets/broke-client", json={"daily_tokens": 0}, headers=headers)
+        assert response.status_code == 200
+        assert response.json()["daily_tokens"] == 0
+        
+        transcript = "A client without budget should be refused early. " * 5
+        response = client.post(
+            "/process-transcript",
+            json={"transcript": transcript, "video_title": "Budget"},
+            headers={"X-Client-ID": "broke-client", "X-API-Key": "client-key"}
+        )
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+        
+        main.usage_ledger.set_budget("broke-client", None)
+    
+    def test_client_id_header_needs_api_key_or_trusted_proxy(self, monkeypatch):
+        """Test callers can't pick their own quota identity with X-Client-ID"""
+        import main
+        from config import settings
+        from starlette.requests import Request
+        
+        monkeypatch.setattr(settings, "CLIENT_API_KEYS", ["client-key"])
+        monkeypatch.setattr(settings, "TRUSTED_PROXIES", ["10.0.0.1"])
+        
+        def request(peer, **headers):
+            raw = [(k.replace("_", "-").lower().encode(), v.encode()) for k, v in headers.items()]
+            return Request({"type": "http", "headers": raw, "client": (peer, 1234)})
+        
+        assert main._client_id(request("1.2.3.4", x_client_id="alice")) == "1.2.3.4"
+        assert main._client_id(request("1.2.3.4", x_client_id="alice", x_api_key="wrong")) == "1.2.3.4"
+        assert main._client_id(request("1.2.3.4", x_client_id="alice", x_api_key="client-key")) == "alice"
+        assert main._client_id(request("10.0.0.1", x_client_id="bob")) == "bob"
+        assert main._client_id(request("10.0.0.1", x_forwarded_for="6.6.6.6, 5.6.7.8")) == "5.6.7.8"
+    
+    def test_open_circuit_serves_stale_or_fails_fast(self, monkeypatch):
+        """Test an open upstream circuit returns stored materials or a fast 503"""
+        import main
+        from services.circuit_breaker import CircuitOpenError
+        
+        def down(*args):
+            raise CircuitOpenError("groq", retry_after=12)
+        
+        monkeypatch.setattr(main.pipeline, "process_transcript", down)
+        transcript = "While the model provider is down we should still answer. " * 5
+        
+        response = client.post("/process-transcript", json={"transcript": transcript, "video_title": "Outage"})
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "12"
+        
+        stored = {
+            "summary": "Stored", "key_points": ["k"] * 5, "notes": ["n"] * 5, "quiz": [],
+            "video_title": "Outage", "duration": "N/A", "video_id": "outage1"
+        }
+        main.materials_store.save("outage1", transcript, stored, "N/A")
+        response = client.post("/process-transcript", json={"transcript": transcript, "video_title": "Outage"})
+        assert response.status_code == 200
+        assert response.json()["summary"] == "Stored"
+        assert "Stale" in response.headers["Warning"]
+    
+    def test_health_reports_dependencies(self):
+        """Test health exposes circuit breaker state and load"""
+        data = client.get("/health").json()
+        assert set(data["dependencies"]) == {"youtube", "groq"}
+        assert data["dependencies"]["groq"]["state"] == "closed"
+        assert "in_flight" in data["load"]
+    
+    def test_upload_transcript_streams_captions_into_pipeline(self, monkeypatch):
+        """Test a raw SRT body is parsed into timed segments and processed"""
+        import main
+        
+        seen = {}
+        
+        def fake_process_upload(segments, video_title, timed):
+            seen.update(text=segments.text, starts=list(segments.starts), title=video_title, timed=timed)
+            return {
+                "summary": "S", "key_points": ["k"] * 5, "notes": ["n"] * 5, "quiz": [],
+                "video_title": video_title, "duration": "0:00:10", "video_id": "up1"
+            }
+        
+        monkeypatch.setattr(main.pipeline, "process_upload", fake_process_upload)
+        srt = "".join(
+            f"{i + 1}\n00:00:{i:02d},000 --> 00:00:{i + 1:02d},000\nCaption line number {i} about streaming.\n\n"
+            for i in range(10)
+        )
+        response = client.post(
+            "/upload-transcript?video_title=Uploaded",
+            content=srt.encode("utf-8"),
+            headers={"Content-Type": "application/x-subrip"}
+        )
+        assert response.status_code == 200
+        assert seen["timed"] is True
+        assert seen["title"] == "Uploaded"
+        assert seen["starts"] == [float(i) for i in range(10)]
+        assert seen["text"].startswith("Caption line number 0 about streaming.")
+    
+    def test_upload_transcript_rejects_multipart_and_short_files(self):
+        """Test multipart bodies and near-empty files are refused"""
+        response = client.post(
+            "/upload-transcript",
+            content=b"--x\r\n",
+            headers={"Content-Type": "multipart/form-data; boundary=x"}
+        )
+        assert response.status_code == 415
+        
+        response = client.post("/upload-transcript", content=b"too short", headers={"Content-Type": "text/plain"})
+        assert response.status_code == 400
+    
+    def test_synthesize_course_requires_processed_videos(self):
+        """Test course synthesis reports videos that were never processed"""
+        response = client.post("/courses/synthesize", json={"video_ids": ["never-processed"]})
+        assert response.status_code == 404
+        assert "never-processed" in response.json()["detail"]
+        
+        response = client.post("/courses/synthesize", json={"video_ids": []})
+        assert response.status_code == 422
+    
+    def test_duplicate_requests_share_one_generation(self, monkeypatch):
+        """Test concurrent requests for one uncached transcript take a single admission slot"""
+        import asyncio
+        import threading
+        import time
+        import httpx
+        import main
+        from services.admission import AdmissionController
+        
+        monkeypatch.setattr(main, "admission", AdmissionController(
+            max_in_flight=1, max_queue=0, queue_timeout=1,
+            client_concurrency=0, client_tokens_per_minute=0
+        ))
+        calls = []
+        lock = threading.Lock()
+        
+        def slow_generation(transcript, title):
+            with lock:
+                calls.append(title)
+            time.sleep(0.2)
+            return {
+                "summary": "S", "key_points": ["k"] * 5, "notes": ["n"] * 5, "quiz": [],
+                "video_title": title, "duration": "N/A", "video_id": "dup"
+            }
+        
+        monkeypatch.setattr(main.pipeline, "process_transcript", slow_generation)
+        payload = {"transcript": "Five students ask about the same new lecture at once. " * 5, "video_title": "Dup"}
+        
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+                return await asyncio.gather(*[ac.post("/process-transcript", json=payload) for _ in range(5)])
+        
+        responses = asyncio.run(run())
+        assert [r.status_code for r in responses] == [200] * 5
+        assert calls == ["Dup"]
+        assert main._generations == {}
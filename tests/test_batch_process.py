@@ -0,0 +1,130 @@
+"""
+Tests for the offline batch CLI
+"""
+import json
+import time
+
+import pytest
+import batch_process
+from services.pipeline import MaterialsPipeline
+from services.shared_cache import SharedCache
+from services.storage_service import MaterialsStore
+from services.transcript_service import TranscriptService
+
+
+class FakeOpenAIService:
+    """Stand-in for Groq that counts calls and can fail on demand"""
+    
+    def __init__(self, fail_on=None):
+        self.calls = []
+        self.fail_on = fail_on
+    
+    def process_transcript(self, transcript, video_title):
+        self.calls.append(video_title)
+        if video_title == self.fail_on:
+            raise ValueError("model unavailable")
+        return {
+            "summary": f"Summary of {video_title}",
+            "key_points": ["k"] * 5,
+            "notes": ["n"] * 5,
+            "quiz": []
+        }
+
+
+class TestBatchProcess:
+    """Test cases for batch_process"""
+    
+    @pytest.fixture(autouse=True)
+    def setup_files(self, tmp_path):
+        """Setup input files and a pipeline with fake AI"""
+        self.tmp = tmp_path
+        self.jsonl = tmp_path / "items.jsonl"
+        self.jsonl.write_text("\n".join(
+            json.dumps({"transcript": f"Lecture {i} transcript text. " * 10, "video_title": f"Lecture {i}"})
+            for i in range(5)
+        ) + "\n")
+        self.output = tmp_path / "out.jsonl"
+    
+    def _pipeline(self, ai):
+        return MaterialsPipeline(
+            TranscriptService(), ai,
+            MaterialsStore(str(self.tmp / "m.db")), SharedCache(str(self.tmp / "c.db"))
+        )
+    
+    def _args(self, *extra):
+        args = batch_process.build_parser().parse_args(
+            ["--jsonl", str(self.jsonl), "--output", str(self.output), "--workers", "3", *extra]
+        )
+        args.checkpoint = str(self.output) + ".checkpoint"
+        return args
+    
+    def test_processes_all_items(self):
+        """Test every item is generated and written"""
+        ai = FakeOpenAIService()
+        counts = batch_process.run(self._args(), self._pipeline(ai))
+        
+        assert counts == {"ok": 5, "failed": 0, "skipped": 0}
+        lines = [json.loads(l) for l in self.output.read_text().splitlines()]
+        assert sorted(l["result"]["video_title"] for l in lines) == [f"Lecture {i}" for i in range(5)]
+    
+    def test_resume_skips_finished_items(self):
+        """Test an interrupted run resumes without redoing finished items"""
+        first = FakeOpenAIService(fail_on="Lecture 3")
+        counts = batch_process.run(self._args("--no-cache"), self._pipeline(first))
+        assert counts == {"ok": 4, "failed": 1, "skipped": 0}
+        
+        second = FakeOpenAIService()
+        counts = batch_process.run(self._args("--no-cache"), self._pipeline(second))
+        assert counts == {"ok": 1, "failed": 0, "skipped": 4}
+        assert second.calls == ["Lecture 3"]
+    
+    def test_bad_input_lines_are_recorded_and_skipped(self):
+        """Test unreadable URLs and JSONL lines fail individually instead of aborting the run"""
+        urls = self.tmp / "urls.txt"
+        urls.write_text("not a url\n")
+        with open(self.jsonl, "a") as f:
+            f.write("{broken json\n")
+            f.write(json.dumps({"title": "no transcript"}) + "\n")
+        args = self._args("--urls", str(urls))
+        
+        counts = batch_process.run(args, self._pipeline(FakeOpenAIService()))
+        
+        assert counts == {"ok": 5, "failed": 3, "skipped": 0}
+        records = [json.loads(l) for l in open(args.checkpoint)]
+        failed = sorted(r["id"] for r in records if r["status"] == "error")
+        assert failed == [f"{self.jsonl}:6", f"{self.jsonl}:7", f"{urls}:1"]
+    
+    def test_unreadable_transcript_file_is_recorded_and_skipped(self):
+        """Test a missing --transcripts file fails as one item while the other sources still run"""
+        missing = str(self.tmp / "missing.txt")
+        undecodable = self.tmp / "latin1.txt"
+        undecodable.write_bytes("Caf\xe9 lecture".encode("latin-1"))
+        args = self._args("--transcripts", missing, str(undecodable))
+        
+        counts = batch_process.run(args, self._pipeline(FakeOpenAIService()))
+        
+        assert counts == {"ok": 5, "failed": 2, "skipped": 0}
+        records = [json.loads(l) for l in open(args.checkpoint)]
+        failed = sorted(r["id"] for r in records if r["status"] == "error")
+        assert failed == sorted([missing, str(undecodable)])
+    
+    def test_warms_shared_cache(self):
+        """Test results land in the cache the API reads"""
+        pipeline = self._pipeline(FakeOpenAIService())
+        batch_process.run(self._args("--no-output"), pipeline)
+        
+        key = MaterialsPipeline.transcript_cache_key("Lecture 0 transcript text. " * 10, "Lecture 0")
+        assert pipeline.shared_cache.get_json(key)["summary"] == "Summary of Lecture 0"
+    
+    def test_rate_limiter_spaces_starts(self):
+        """Test the rate limiter enforces the configured interval"""
+        limiter = batch_process.RateLimiter(per_minute=1200)  # one every 50ms
+        start = time.monotonic()
+        for _ in range(4):
+            limiter.wait()
+        assert time.monotonic() - start >= 0.14
+    
+    def test_requires_an_input(self):
+        """Test the CLI refuses to run without inputs"""
+        with pytest.raises(SystemExit):
+            batch_process.main(["--output", str(self.output)])
@@ -0,0 +1,91 @@
+"""
+Unit tests for the incremental caption parser
+"""
+import pytest
+from services.caption_parser import CaptionParser
+from services.transcript_service import TranscriptService
+
+SRT = """1
+00:00:01,000 --> 00:00:04,500
+<i>Welcome</i> to the lecture [Music]
+
+2
+00:00:04,500 --> 00:00:09,000
+Today we cover
+gradient descent .
+
+3
+01:00:00,000 --> 01:00:02,000
+(inaudible) Thanks!
+"""
+
+VTT = """WEBVTT
+Kind: captions
+
+NOTE this block is ignored
+
+intro
+00:01.000 --> 00:03.000 align:start position:0%
+<v Speaker>Hello <00:00:01.500><c>everyone</c>
+
+00:03.000 --> 00:05.000
+Hello <c>everyone</c>
+
+00:05.000 --> 00:07.250
+Next topic
+"""
+
+
+def _parse(data: bytes, fmt="auto", piece=7):
+    """Feed the data in small pieces, as a request stream would"""
+    parser = CaptionParser(fmt, clean=TranscriptService()._clean_segment_text)
+    cues = []
+    for i in range(0, len(data), piece):
+        cues.extend(parser.feed(data[i:i + piece]))
+    cues.extend(parser.close())
+    return parser, cues
+
+
+class TestCaptionParser:
+    """Test cases for CaptionParser"""
+
+    def test_srt_cues_are_timed_and_cleaned(self):
+        """Test SRT cues keep timing and go through transcript cleaning"""
+        parser, cues = _parse(SRT.encode("utf-8"))
+        assert parser.format == "srt"
+        assert parser.timed
+        assert cues == [
+            {"text": "Welcome to the lecture", "start": 1.0, "duration": 3.5},
+            {"text": "Today we cover gradient descent.", "start": 4.5, "duration": 4.5},
+            {"text": "Thanks!", "start": 3600.0, "duration": 2.0},
+        ]
+
+    def test_vtt_skips_header_notes_tags_and_repeats(self):
+        """Test WebVTT metadata blocks, inline tags and repeated rolling captions are dropped"""
+        parser, cues = _parse(VTT.encode("utf-8"))
+        assert parser.format == "vtt"
+        assert [c["text"] for c in cues] == ["Hello everyone", "Next topic"]
+        assert cues[1]["start"] == 5.0
+        assert cues[1]["duration"] == pytest.approx(2.25)
+
+    def test_plain_text_with_bom_and_split_multibyte_characters(self):
+        """Test plain text is detected and UTF-8 split across pieces decodes intact"""
+        data = "﻿Café lecture notes\n\nsecond line — done\n".encode("utf-8")
+        parser, cues = _parse(data, piece=3)
+        assert parser.format == "txt"
+        assert not parser.timed
+        assert [c["text"] for c in cues] == ["Café lecture notes", "second line — done"]
+
+    def test_long_lines_do_not_grow_the_buffer(self):
+        """Test a file without newlines is emitted in bounded pieces"""
+        parser = CaptionParser("txt")
+        cues = list(parser.feed(("word " * 20000).encode("ascii")))
+        assert cues
+        assert len(parser._buffer) <= 16384
+        cues.extend(parser.close())
+        assert sum(len(c["text"].split()) for c in cues) == 20000
+
+    def test_rejects_unknown_format(self):
+        """Test an unsupported format name is an error"""
+        with pytest.raises(ValueError):
+            CaptionParser("docx")
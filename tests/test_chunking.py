@@ -0,0 +1,103 @@
+"""
+Tests for content-defined chunking and incremental reprocessing
+"""
+import random
+
+import pytest
+from services.chunking import content_defined_chunks
+from services.pipeline import MaterialsPipeline
+from services.shared_cache import SharedCache
+from services.storage_service import MaterialsStore
+from services.transcript_service import TranscriptService
+
+
+def _lecture(words=6000, seed=7):
+    rng = random.Random(seed)
+    vocabulary = [f"term{i}" for i in range(400)]
+    out = []
+    for i in range(words):
+        word = rng.choice(vocabulary)
+        out.append(word + ("." if i % 17 == 16 else ""))
+    return " ".join(out)
+
+
+class FakeOpenAIService:
+    """Stand-in for Groq that records which chunks it was asked to extract"""
+
+    model = "fake-model"
+
+    def __init__(self):
+        self.extracted = []
+        self.merges = 0
+
+    def extract_chunk(self, chunk):
+        self.extracted.append(chunk)
+        return {"summary": chunk[:20], "points": [], "notes": [], "quiz": []}
+
+    def merge_extractions(self, extractions, video_title):
+        self.merges += 1
+        return {"summary": video_title, "key_points": ["k"] * 5, "notes": ["n"] * 5, "quiz": []}
+
+    def process_transcript(self, transcript, video_title):
+        raise AssertionError("long transcripts should be chunked")
+
+
+class TestContentDefinedChunks:
+    """Test cases for content_defined_chunks"""
+
+    def test_chunks_cover_text_within_size_limits(self):
+        """Test chunks rejoin to the text and respect min/max sizes"""
+        text = _lecture()
+        chunks = content_defined_chunks(text, min_words=100, avg_words=256, max_words=600)
+
+        assert " ".join(chunks) == text
+        assert len(chunks) > 5
+        sizes = [len(c.split()) for c in chunks]
+        assert all(size <= 600 for size in sizes)
+        assert all(size >= 100 for size in sizes[:-1])
+
+    def test_local_edit_only_changes_nearby_chunks(self):
+        """Test an edit in the middle leaves chunks far from it untouched"""
+        words = _lecture().split()
+        edited = list(words)
+        edited[3000] = "corrected"
+        edited.insert(3001, "caption")
+
+        before = content_defined_chunks(" ".join(words), min_words=100, avg_words=256, max_words=600)
+        after = content_defined_chunks(" ".join(edited), min_words=100, avg_words=256, max_words=600)
+
+        changed = set(after) - set(before)
+        assert 1 <= len(changed) <= 2
+        assert len(set(after) & set(before)) >= len(before) - 3
+
+
+class TestIncrementalGeneration:
+    """Test cases for chunked generation in MaterialsPipeline"""
+
+    @pytest.fixture(autouse=True)
+    def setup_pipeline(self, tmp_path, monkeypatch):
+        """Setup a pipeline with fake AI and small chunks"""
+        from config import settings
+        monkeypatch.setattr(settings, "CHUNKED_MIN_CHARS", 1000)
+        monkeypatch.setattr(settings, "CHUNK_MIN_WORDS", 100)
+        monkeypatch.setattr(settings, "CHUNK_AVG_WORDS", 256)
+        monkeypatch.setattr(settings, "CHUNK_MAX_WORDS", 600)
+        self.ai = FakeOpenAIService()
+        self.pipeline = MaterialsPipeline(
+            TranscriptService(), self.ai,
+            MaterialsStore(str(tmp_path / "m.db")), SharedCache(str(tmp_path / "c.db"))
+        )
+
+    def test_resubmitted_edit_reprocesses_only_affected_chunks(self):
+        """Test a small caption fix re-extracts a chunk or two plus the merge"""
+        words = _lecture().split()
+        self.pipeline.process_transcript(" ".join(words), "Lecture")
+        first_run = len(self.ai.extracted)
+        assert first_run > 5
+        assert self.ai.merges == 1
+
+        words[3000] = "corrected"
+        self.pipeline.process_transcript(" ".join(words), "Lecture")
+
+        assert 1 <= len(self.ai.extracted) - first_run <= 2
+        assert self.ai.merges == 2
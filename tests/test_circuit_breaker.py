@@ -0,0 +1,85 @@
+"""
+Unit tests for upstream circuit breakers
+"""
+import time
+
+import pytest
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+def _fail():
+    raise ConnectionError("upstream down")
+
+
+class TestCircuitBreaker:
+    """Test cases for CircuitBreaker"""
+
+    def setup_method(self):
+        """Setup a breaker with a small window"""
+        self.breaker = CircuitBreaker(
+            "upstream", slow_call_seconds=0.05, failure_rate=0.5, slow_call_rate=0.5,
+            window_size=4, min_calls=4, open_seconds=0.1, half_open_calls=1
+        )
+
+    def _trip(self):
+        for _ in range(4):
+            with pytest.raises(ConnectionError):
+                self.breaker.call(_fail)
+
+    def test_opens_on_error_rate_and_fails_fast(self):
+        """Test the circuit opens at the error threshold and then skips the call"""
+        self.breaker.call(lambda: "ok")
+        self.breaker.call(lambda: "ok")
+        with pytest.raises(ConnectionError):
+            self.breaker.call(_fail)
+        assert self.breaker.state == "closed"
+
+        with pytest.raises(ConnectionError):
+            self.breaker.call(_fail)
+        assert self.breaker.state == "open"
+
+        calls = []
+        with pytest.raises(CircuitOpenError) as excinfo:
+            self.breaker.call(lambda: calls.append(1))
+        assert calls == []
+        assert excinfo.value.retry_after >= 1
+
+    def test_opens_on_slow_calls(self):
+        """Test calls over the latency threshold open the circuit"""
+        for _ in range(4):
+            self.breaker.call(time.sleep, 0.06)
+        assert self.breaker.state == "open"
+
+    def test_ignored_errors_do_not_count(self):
+        """Test errors classified as non-failures leave the circuit closed"""
+        for _ in range(6):
+            with pytest.raises(ConnectionError):
+                self.breaker.call(_fail, is_failure=lambda e: False)
+        assert self.breaker.state == "closed"
+
+    def test_half_open_probe_closes_on_success(self):
+        """Test a successful probe after the cool-down closes the circuit"""
+        self._trip()
+        time.sleep(0.12)
+        assert self.breaker.state == "half_open"
+
+        assert self.breaker.call(lambda: "ok") == "ok"
+        assert self.breaker.state == "closed"
+
+    def test_half_open_probe_reopens_on_failure(self):
+        """Test a failed probe opens the circuit again and only one probe runs"""
+        self._trip()
+        time.sleep(0.12)
+
+        self.breaker.before_call()
+        with pytest.raises(CircuitOpenError):
+            self.breaker.before_call()
+        self.breaker.record(True, 0.0)
+        assert self.breaker.state == "open"
+
+    def test_snapshot_reports_state(self):
+        """Test the health snapshot exposes state and rates"""
+        self._trip()
+        snapshot = self.breaker.snapshot()
+        assert snapshot["state"] == "open"
+        assert snapshot["retry_after"] >= 1
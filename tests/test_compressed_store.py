@@ -0,0 +1,105 @@
+"""
+Unit tests for the compressed in-memory store and the shared cache front
+"""
+import os
+import time
+
+import pytest
+from services.compressed_store import CompressedStore
+from services.shared_cache import SharedCache
+
+
+def _text(i, words=400):
+    return " ".join(f"lecture{i} explains gradient descent step {n}" for n in range(words // 6)).encode("utf-8")
+
+
+class TestCompressedStore:
+    """Test cases for CompressedStore"""
+
+    def setup_method(self):
+        """Setup a small zlib store"""
+        self.store = CompressedStore(max_bytes=4096, codec="zlib", level=6, zdict=b"")
+
+    def test_round_trip_keeps_values_compressed(self):
+        """Test values come back intact while the store holds fewer bytes than given"""
+        self.store.put("a", _text(1))
+        self.store.put_json("b", {"summary": "s", "quiz": [1, 2]})
+
+        assert self.store.get("a") == _text(1)
+        assert self.store.get_json("b") == {"summary": "s", "quiz": [1, 2]}
+        stats = self.store.stats()
+        assert stats["compressed_bytes"] < stats["raw_bytes"]
+        assert stats["hits"] == 2
+
+    def test_evicts_least_recently_used_by_compressed_bytes(self):
+        """Test the compressed total stays under budget and recently read keys survive"""
+        for i in range(40):
+            self.store.put(f"k{i}", _text(i))
+            self.store.get("k0")
+
+        stats = self.store.stats()
+        assert stats["compressed_bytes"] <= 4096
+        assert stats["evictions"] > 0
+        assert self.store.get("k0") == _text(0)
+        assert self.store.get("k1") is None
+
+    def test_oversized_values_and_expired_entries_are_skipped(self):
+        """Test an entry larger than a quarter of the budget is not stored, and TTLs expire"""
+        big = CompressedStore(max_bytes=4096, codec="zlib", zdict=b"")
+        big.put("noise", os.urandom(2048))
+        assert big.get("noise") is None
+
+        self.store.put("short", b"value", ttl=0.05)
+        assert self.store.get("short") == b"value"
+        time.sleep(0.06)
+        assert self.store.get("short") is None
+        assert self.store.stats()["entries"] == 0
+
+    def test_dictionary_shrinks_small_entries(self):
+        """Test a preset dictionary built from samples compresses similar entries better"""
+        samples = [_text(i, 60) for i in range(20)]
+        zdict = CompressedStore.build_dictionary(samples)
+        plain = CompressedStore(max_bytes=1 << 20, codec="zlib", zdict=b"")
+        primed = CompressedStore(max_bytes=1 << 20, codec="zlib", zdict=zdict)
+        for store in (plain, primed):
+            store.put("x", _text(99, 60))
+
+        assert primed.get("x") == _text(99, 60)
+        assert primed.compressed_bytes < plain.compressed_bytes
+
+    def test_unknown_codec_is_rejected(self):
+        """Test a bad codec name fails at construction"""
+        with pytest.raises(ValueError):
+            CompressedStore(codec="lz4")
+
+
+class TestSharedCacheFront:
+    """Test SharedCache with a compressed in-memory front"""
+
+    @pytest.fixture(autouse=True)
+    def setup_cache(self, tmp_path):
+        """Setup a cache with a front and a second worker's view of the same database"""
+        self.db_path = str(tmp_path / "shared.db")
+        self.front = CompressedStore(max_bytes=1 << 20, codec="zlib", zdict=b"")
+        self.cache = SharedCache(self.db_path, front=self.front)
+        self.other_worker = SharedCache(self.db_path)
+
+    def test_hits_are_served_from_the_front(self):
+        """Test a value written by another worker is copied in once and then read from memory"""
+        self.other_worker.set_json("result:video:abc", {"summary": "generated"})
+
+        assert self.cache.get_json("result:video:abc") == {"summary": "generated"}
+        self.other_worker._conn().execute("DELETE FROM entries")
+        assert self.cache.get_json("result:video:abc") == {"summary": "generated"}
+        assert self.front.stats()["hits"] == 1
+
+    def test_front_follows_entry_ttl_and_deletes(self):
+        """Test front copies expire with the entry and are dropped on delete"""
+        self.cache.set_json("short", {"v": 1}, ttl=0.05)
+        self.cache.set_json("kept", {"v": 2})
+        self.cache.delete("kept")
+        time.sleep(0.06)
+
+        assert self.cache.get_json("short") is None
+        assert self.cache.get_json("kept") is None
+        assert len(self.front) == 0
@@ -0,0 +1,105 @@
+"""
+Tests for course-level synthesis
+"""
+import threading
+
+import pytest
+from services.course_service import CourseSynthesizer, VideosNotFoundError
+from services.shared_cache import SharedCache
+from services.storage_service import MaterialsStore
+
+
+class FakeOpenAIService:
+    """Stand-in for Groq that concatenates titles and counts merges"""
+
+    model = "fake-model"
+
+    def __init__(self):
+        self.merges = 0
+        self._lock = threading.Lock()
+
+    def merge_summaries(self, parts):
+        with self._lock:
+            self.merges += 1
+        return {
+            "title": "+".join(p["title"] for p in parts),
+            "summary": " ".join(p["summary"] for p in parts),
+            "key_points": [kp for p in parts for kp in p["key_points"]][:8],
+        }
+
+
+def _materials(i, quiz=None):
+    return {
+        "summary": f"Summary {i}.",
+        "key_points": [f"point {i}"],
+        "notes": [],
+        "quiz": quiz if quiz is not None else [
+            {"question": f"What is concept {i}?", "options": ["a", "b", "c", "d"], "correct_answer": "a"}
+        ],
+        "video_title": f"Video {i}",
+        "duration": "N/A",
+        "video_id": f"v{i}",
+    }
+
+
+class TestCourseSynthesizer:
+    """Test cases for CourseSynthesizer"""
+
+    @pytest.fixture(autouse=True)
+    def setup_course(self, tmp_path):
+        """Setup a store with processed videos and a synthesizer with fake AI"""
+        self.store = MaterialsStore(str(tmp_path / "m.db"))
+        for i in range(60):
+            self.store.save(f"v{i}", f"transcript {i}", _materials(i), "N/A")
+        self.ai = FakeOpenAIService()
+        self.synth = CourseSynthesizer(self.ai, self.store, SharedCache(str(tmp_path / "c.db")), fanout=3)
+
+    def test_tree_reduce_covers_every_video_in_order(self):
+        """Test the root summary merges all videos, in course order"""
+        ids = [f"v{i}" for i in range(10)]
+        result = self.synth.synthesize(ids)
+
+        assert result["summary"] == " ".join(f"Summary {i}." for i in range(10))
+        assert [v["title"] for v in result["videos"]] == [f"Video {i}" for i in range(10)]
+        assert result["merges_computed"] == self.ai.merges
+        assert result["merges_reused"] == 0
+
+    def test_repeat_is_fully_cached(self):
+        """Test synthesizing the same course again makes no LLM calls"""
+        ids = [f"v{i}" for i in range(10)]
+        self.synth.synthesize(ids)
+        calls = self.ai.merges
+
+        result = self.synth.synthesize(ids)
+        assert self.ai.merges == calls
+        assert result["merges_computed"] == 0
+
+    @pytest.mark.parametrize("position", [0, 25, 50])
+    def test_adding_a_video_recomputes_only_its_path(self, position):
+        """Test inserting one video recomputes only the merges near its path to the root"""
+        ids = [f"v{i}" for i in range(50)]
+        self.synth.synthesize(ids)
+        first = self.ai.merges
+
+        ids.insert(position, "v55")
+        result = self.synth.synthesize(ids)
+
+        assert result["merges_computed"] == self.ai.merges - first
+        assert 1 <= result["merges_computed"] <= first // 3
+        assert result["merges_reused"] > 0
+        assert "Summary 55." in result["summary"]
+
+    def test_quiz_is_cumulative_and_deduplicated(self):
+        """Test the quiz draws from every video and drops near-duplicate questions"""
+        duplicate = [{"question": "What is concept 1?", "options": ["a", "b", "c", "d"], "correct_answer": "a"}]
+        self.store.save("dup", "transcript dup", _materials(99, quiz=duplicate), "N/A")
+
+        result = self.synth.synthesize(["v1", "dup", "v2"])
+        questions = [q["question"] for q in result["quiz"]]
+        assert questions == ["What is concept 1?", "What is concept 2?"]
+
+    def test_unprocessed_videos_are_reported(self):
+        """Test missing videos raise with their IDs"""
+        with pytest.raises(VideosNotFoundError) as excinfo:
+            self.synth.synthesize(["v1", "nope"])
+        assert excinfo.value.video_ids == ["nope"]
@@ -0,0 +1,91 @@
+"""
+Unit tests for pooled upstream HTTP clients
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from services.http_clients import HttpClients
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    ports = []
+    
+    def do_GET(self):
+        _Handler.ports.append(self.client_address[1])
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+    
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def local_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _Handler.ports = []
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+
+
+class TestHttpClients:
+    """Test cases for HttpClients"""
+    
+    def test_start_and_close(self):
+        """Test pools are created and torn down"""
+        clients = HttpClients()
+        clients.start()
+        assert clients.youtube is not None
+        assert clients.groq is not None
+        clients.close()
+        assert clients.youtube is None and clients.groq is None
+    
+    def test_connections_are_reused(self, local_server):
+        """Test sequential calls share one keep-alive connection per client"""
+        clients = HttpClients()
+        clients.start()
+        try:
+            for _ in range(3):
+                assert clients.youtube.get(local_server).status_code == 200
+            for _ in range(3):
+                assert clients.groq.get(local_server).status_code == 200
+        finally:
+            clients.close()
+        
+        # One client port for the requests session, one for the httpx client
+        assert len(set(_Handler.ports)) == 2
+    
+    def test_default_timeout_applied(self):
+        """Test the youtube session has an adapter-level timeout"""
+        clients = HttpClients()
+        clients.start()
+        try:
+            adapter = clients.youtube.get_adapter("https://www.youtube.com/")
+            assert adapter.timeout > 0
+        finally:
+            clients.close()
+    
+    def test_warm_up_never_raises(self, monkeypatch):
+        """Test an unreachable upstream at startup is only logged"""
+        monkeypatch.setattr(HttpClients, "YOUTUBE_WARMUP_URL", "http://127.0.0.1:9/")
+        clients = HttpClients()
+        clients.start()
+        try:
+            clients.warm_up()
+        finally:
+            clients.close()
+    
+    def test_lifespan_wires_pooled_clients(self):
+        """Test app startup hands pooled clients to the services and shutdown closes them"""
+        with TestClient(main.app):
+            assert main.transcript_service.http_session is main.http_clients.youtube
+            assert main.http_clients.groq is not None
+        assert main.transcript_service.http_session is None
+        assert main.http_clients.groq is None
@@ -0,0 +1,33 @@
+"""
+Smoke test for the offline load-test harness
+"""
+import asyncio
+
+from benchmarks import loadtest
+from benchmarks.fake_upstreams import FakeConfig, FakeUpstreams
+
+
+class TestLoadTest:
+    """Test cases for benchmarks.loadtest"""
+
+    def test_virtual_users_are_served_not_throttled(self, tmp_path):
+        """Test a short run against fast fakes succeeds for (nearly) every request"""
+        upstreams = FakeUpstreams(FakeConfig(
+            latency_ms=0, tokens_per_second=0, youtube_latency_ms=0, transcript_words=400
+        )).start()
+        process = None
+        try:
+            process, app_url = loadtest.start_app(upstreams.url, str(tmp_path), workers=1)
+            plan = loadtest._plan(40, video_share=0.5, repeat_share=0.3, transcript_words=400, seed=1)
+            results, elapsed = asyncio.run(loadtest.drive(app_url, plan, concurrency=8))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=30)
+            upstreams.stop()
+
+        statuses = [status for _, status, _ in results]
+        failed = [status for status in statuses if not 200 <= status < 300]
+        assert len(statuses) == 40
+        assert 429 not in failed, loadtest.report(results, elapsed)
+        assert len(failed) / len(statuses) <= 0.05, loadtest.report(results, elapsed)
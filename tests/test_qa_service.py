@@ -0,0 +1,93 @@
+"""
+Unit tests for the video Q&A retrieval service
+"""
+from services.qa_service import BM25Index, QAService, chunk_transcript, tokenize
+
+
+TRANSCRIPT = (
+    "Today we introduce linear regression and how to fit a line to data. "
+    "Next we discuss overfitting, which happens when a model memorizes noise in the training set. "
+    "Regularization such as L2 penalties helps reduce overfitting. "
+    "Finally we cover cross validation for estimating performance on unseen data."
+)
+
+
+class TestChunking:
+    """Test cases for transcript chunking"""
+    
+    def test_chunks_overlap_and_cover_text(self):
+        """Test windows overlap and the last word is included"""
+        text = " ".join(f"w{i}" for i in range(25))
+        chunks = chunk_transcript(text, chunk_words=10, overlap_words=3)
+        
+        assert chunks[0]["text"].split()[:3] == ["w0", "w1", "w2"]
+        assert chunks[1]["text"].split()[0] == "w7"
+        assert chunks[-1]["text"].split()[-1] == "w24"
+        for chunk in chunks:
+            assert text[chunk["start_char"]:].startswith(chunk["text"])
+    
+    def test_empty_transcript(self):
+        """Test empty text yields no chunks"""
+        assert chunk_transcript("   ", 10, 2) == []
+    
+    def test_tokenize_drops_stopwords(self):
+        """Test stopwords are removed"""
+        assert tokenize("What is the Overfitting?") == ["overfitting"]
+
+
+class TestBM25Index:
+    """Test cases for BM25Index"""
+    
+    def test_search_returns_relevant_chunk(self):
+        """Test the chunk mentioning the query terms scores highest"""
+        index = BM25Index(chunk_transcript(TRANSCRIPT, chunk_words=12, overlap_words=0))
+        hits = index.search("what is overfitting and regularization", top_k=1)
+        
+        assert len(hits) == 1
+        assert "overfitting" in hits[0][0]["text"].lower()
+    
+    def test_search_no_match(self):
+        """Test unknown terms return nothing"""
+        index = BM25Index(chunk_transcript(TRANSCRIPT, 12, 0))
+        assert index.search("photosynthesis", top_k=3) == []
+    
+    def test_results_in_transcript_order(self):
+        """Test hits are returned in reading order"""
+        index = BM25Index(chunk_transcript(TRANSCRIPT, 8, 0))
+        hits = index.search("regression overfitting validation", top_k=3)
+        starts = [chunk["start_char"] for chunk, _ in hits]
+        assert starts == sorted(starts)
+
+
+class TestQAService:
+    """Test cases for QAService index caching"""
+    
+    def setup_method(self):
+        """Setup test fixtures"""
+        self.service = QAService()
+        self.loads = 0
+    
+    def _loader(self, text):
+        def load():
+            self.loads += 1
+            return text
+        return load
+    
+    def test_index_cached_per_content_hash(self):
+        """Test the transcript is loaded once until its content changes"""
+        self.service.retrieve("v1", "h1", self._loader(TRANSCRIPT), "overfitting", 2)
+        self.service.retrieve("v1", "h1", self._loader(TRANSCRIPT), "regression", 2)
+        assert self.loads == 1
+        
+        self.service.retrieve("v1", "h2", self._loader(TRANSCRIPT), "regression", 2)
+        assert self.loads == 2
+    
+    def test_lru_eviction(self):
+        """Test least recently used indexes are evicted"""
+        self.service.cache_size = 2
+        self.service.get_index("a", "h", self._loader(TRANSCRIPT))
+        self.service.get_index("b", "h", self._loader(TRANSCRIPT))
+        self.service.get_index("a", "h", self._loader(TRANSCRIPT))  # refresh a
+        self.service.get_index("c", "h", self._loader(TRANSCRIPT))  # evicts b
+        
+        assert list(self.service._indexes) == ["a", "c"]
@@ -0,0 +1,131 @@
+"""
+Tests for quiz repair and gap-only regeneration
+"""
+import json
+from types import SimpleNamespace
+
+from services.openai_service import OpenAIService
+from services.quiz_postprocessor import QuizPostProcessor
+
+
+TOPICS = (
+    "gradient descent", "photosynthesis", "supply curves", "plate tectonics", "binary search",
+    "french revolution", "cell division", "ohms law", "market inflation", "protein folding",
+    "hash tables", "water cycle", "roman empire", "linear regression", "quantum tunneling",
+    "sorting networks", "climate feedback", "poetic meter", "enzyme kinetics", "game theory",
+    "neural pruning", "tidal forces", "vaccine trials",
+)
+
+
+def _question(i, answer=None, options=None):
+    topic = TOPICS[i]
+    options = options or [f"{topic} core idea", f"{topic} myth", f"{topic} side effect", f"{topic} history"]
+    return {"question": f"Explain {topic}?", "options": options, "correct_answer": answer or options[0]}
+
+
+def _reply(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class TestQuizPostProcessor:
+    """Test cases for QuizPostProcessor"""
+
+    def setup_method(self):
+        """Setup a four-option post-processor"""
+        self.processor = QuizPostProcessor(options_count=4)
+
+    def test_aligns_answers_by_letter_label_and_similarity(self):
+        """Test answers given as letters, labelled text or paraphrases map to the right option"""
+        quiz = [
+            _question(1, answer="B", options=["A) Paris", "B) Lyon", "C) Nice", "D) Lille"]),
+            _question(2, answer="option b: the mitochondria", options=["The nucleus", "The mitochondria", "Ribosomes", "Golgi body"]),
+            _question(3, answer="it lowers the learning rate", options=["Raises momentum", "Lowers the learning rate", "Adds dropout", "Stops training"]),
+        ]
+        repaired, stats = self.processor.repair(quiz)
+
+        assert [q["correct_answer"] for q in repaired] == ["Lyon", "The mitochondria", "Lowers the learning rate"]
+        assert all(q["correct_answer"] in q["options"] for q in repaired)
+        assert stats["answers_aligned"] == 3
+        assert stats["dropped"] == 0
+
+    def test_pads_trims_and_deduplicates_options(self):
+        """Test option lists end up with exactly four distinct options that include the answer"""
+        quiz = [
+            {"question": "Which gas does photosynthesis release?", "options": ["Oxygen", "oxygen", "Nitrogen"],
+             "correct_answer": "Oxygen"},
+            _question(2, answer="f", options=["a", "b", "c", "d", "e", "f"]),
+            {"question": "Which pigment drives photosynthesis?", "options": ["Chlorophyll", "Melanin", "Keratin", "Hemoglobin"],
+             "correct_answer": "Chlorophyll"},
+        ]
+        repaired, stats = self.processor.repair(quiz)
+
+        assert len(repaired) == 3
+        for q in repaired:
+            assert len(q["options"]) == 4
+            assert len({o.lower() for o in q["options"]}) == 4
+            assert q["correct_answer"] in q["options"]
+        assert stats["options_padded"] == 1
+        assert stats["options_trimmed"] == 1
+
+    def test_unrelated_distractors_are_not_used_for_padding(self):
+        """Test a short option list with no on-topic distractors becomes a gap, not a trivial question"""
+        quiz = [
+            {"question": "What is a feature in machine learning?", "options": ["An input variable", "A label"],
+             "correct_answer": "An input variable"},
+            {"question": "What causes ocean tides?", "options": ["The moon", "Wind", "Earthquakes", "Ocean tides myth"],
+             "correct_answer": "The moon"},
+        ]
+        repaired, stats = self.processor.repair(quiz, count=2)
+
+        assert [q["question"] for q in repaired] == ["What causes ocean tides?"]
+        assert stats["options_padded"] == 0
+        assert stats["missing"] == 1
+
+    def test_drops_near_duplicates_and_unanswerable_and_reports_gap(self):
+        """Test duplicates and questions with an unknowable answer leave a gap to regenerate"""
+        quiz = [_question(i) for i in range(8)]
+        quiz.append(dict(_question(3), question="Explain plate tectonics, briefly?"))
+        quiz.append(_question(9, answer="none of these", options=["a b", "c d", "e f", "g h"]))
+        repaired, stats = self.processor.repair(quiz, count=10)
+
+        assert len(repaired) == 8
+        assert stats["duplicates_dropped"] == 1
+        assert stats["dropped"] == 1
+        assert stats["missing"] == 2
+
+    def test_shuffle_is_deterministic_and_idempotent(self):
+        """Test the answer isn't always first, and repairing again changes nothing"""
+        quiz = [_question(i) for i in range(20)]
+        repaired, _ = self.processor.repair(quiz)
+
+        assert {q["options"].index(q["correct_answer"]) for q in repaired} != {0}
+        assert self.processor.repair(quiz)[0] == repaired
+        assert self.processor.repair(repaired)[0] == repaired
+
+
+class TestQuizRegeneration:
+    """Test OpenAIService regenerates only the missing questions"""
+
+    def test_process_transcript_tops_up_instead_of_retrying(self, monkeypatch):
+        """Test a reply with two broken questions costs one small extra call, not a full retry"""
+        service = OpenAIService()
+        quiz = [_question(i) for i in range(8)] + [
+            _question(8, answer="???", options=["a b", "c d", "e f", "g h"]),
+            _question(1),
+        ]
+        materials = {"summary": "S", "key_points": ["k"] * 5, "notes": ["n"] * 7, "quiz": quiz}
+        calls = []
+
+        def fake_completion(messages, temperature, max_tokens, cache_key=None):
+            calls.append(messages)
+            if len(calls) == 1:
+                return _reply(json.dumps(materials))
+            assert "Write 2 new questions" in messages[1]["content"]
+            return _reply(json.dumps({"quiz": [_question(20), _question(21)]}))
+
+        monkeypatch.setattr(service, "_create_completion", fake_completion)
+        result = service.process_transcript("transcript text", "Title")
+
+        assert len(calls) == 2
+        assert len(result["quiz"]) == 10
+        assert [q["question"] for q in result["quiz"]][-2:] == ["Explain neural pruning?", "Explain tidal forces?"]
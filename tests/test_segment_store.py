@@ -0,0 +1,97 @@
+"""
+Unit tests for the timestamped transcript segment store
+"""
+import sys
+
+import pytest
+from services.segment_store import TranscriptSegments, locate_sources
+
+
+ENTRIES = [
+    {"text": "Welcome to the lecture", "start": 0.0, "duration": 2.5},
+    {"text": "today we cover gradient descent", "start": 2.5, "duration": 3.0},
+    {"text": ", a way to minimize loss", "start": 5.5, "duration": 2.0},
+    {"text": "next is backpropagation", "start": 40.0, "duration": 4.0},
+]
+
+
+def _deep_size(entries):
+    """Memory of a list of dicts including keys' values"""
+    size = sys.getsizeof(entries)
+    for entry in entries:
+        size += sys.getsizeof(entry)
+        size += sum(sys.getsizeof(v) for v in entry.values())
+    return size
+
+
+class TestTranscriptSegments:
+    """Test cases for TranscriptSegments"""
+    
+    def setup_method(self):
+        """Setup test fixtures"""
+        self.segments = TranscriptSegments.from_entries(ENTRIES)
+    
+    def test_text_joins_segments(self):
+        """Test segments join with spaces, punctuation attaches left"""
+        assert self.segments.text == (
+            "Welcome to the lecture today we cover gradient descent, a way to minimize loss next is backpropagation"
+        )
+        assert self.segments.segment_text(1) == "today we cover gradient descent"
+    
+    def test_time_to_text(self):
+        """Test lookup of the segment playing at a time"""
+        assert self.segments.text_at_time(3.0) == "today we cover gradient descent"
+        assert self.segments.text_at_time(100.0) == "next is backpropagation"
+        assert self.segments.text_at_time(-1.0) == "Welcome to the lecture"
+        assert self.segments.text_between(2.5, 40.0) == "today we cover gradient descent, a way to minimize loss"
+    
+    def test_offset_to_time(self):
+        """Test mapping a character offset back to video time"""
+        offset = self.segments.text.index("backpropagation")
+        assert self.segments.time_at_offset(offset) == 40.0
+        assert self.segments.time_at_offset(0) == 0.0
+    
+    def test_clean_drops_empty_segments(self):
+        """Test segments that clean to nothing are dropped"""
+        segments = TranscriptSegments.from_entries(
+            [{"text": "[Music]", "start": 0.0}, {"text": "hi", "start": 1.0}],
+            clean=lambda t: "" if t.startswith("[") else t
+        )
+        assert len(segments) == 1
+        assert segments.starts[0] == 1.0
+    
+    def test_windows_group_by_time(self):
+        """Test time-windowed grouping"""
+        windows = self.segments.windows(30)
+        assert [w["start"] for w in windows] == [0.0, 40.0]
+        assert windows[0]["end"] == 7.5
+    
+    def test_bytes_round_trip(self):
+        """Test binary serialization round-trips"""
+        restored = TranscriptSegments.from_bytes(self.segments.to_bytes())
+        assert restored.text == self.segments.text
+        assert list(restored.starts) == list(self.segments.starts)
+        assert list(restored.offsets) == list(self.segments.offsets)
+    
+    def test_from_bytes_rejects_garbage(self):
+        """Test unknown blobs are rejected"""
+        with pytest.raises(ValueError):
+            TranscriptSegments.from_bytes(b"XXXX" + bytes(8))
+    
+    def test_memory_lower_than_list_of_dicts(self):
+        """Test an hour of captions is much smaller than the raw entries"""
+        hour = [
+            {"text": f"this is caption line number {i} of the lecture", "start": i * 3.0, "duration": 3.0}
+            for i in range(1200)
+        ]
+        segments = TranscriptSegments.from_entries(hour)
+        assert segments.nbytes() * 3 < _deep_size(hour)
+
+
+class TestLocateSources:
+    """Test cases for locate_sources"""
+    
+    def test_locates_best_window(self):
+        """Test queries map to the window they came from"""
+        segments = TranscriptSegments.from_entries(ENTRIES)
+        assert locate_sources(segments, ["backpropagation", "gradient descent", "zebra"], 30) == [40.0, 0.0, None]
@@ -0,0 +1,134 @@
+"""
+Unit tests for the cross-worker shared cache
+"""
+import multiprocessing
+import threading
+import time
+
+import pytest
+from services.shared_cache import SharedCache
+
+
+def _worker(db_path, counter_path, results):
+    """Simulate a separate worker process requesting the same video"""
+    cache = SharedCache(db_path)
+    
+    def compute():
+        with open(counter_path, "a") as f:
+            f.write("x")
+        time.sleep(0.3)
+        return {"summary": "generated"}
+    
+    results.put(cache.get_or_compute("result:video:abc", compute))
+
+
+class TestSharedCache:
+    """Test cases for SharedCache"""
+    
+    @pytest.fixture(autouse=True)
+    def setup_cache(self, tmp_path):
+        """Setup a fresh cache per test"""
+        self.db_path = str(tmp_path / "shared.db")
+        self.cache = SharedCache(self.db_path)
+        self.cache.poll_interval = 0.02
+    
+    def test_set_get_json(self):
+        """Test JSON values round-trip"""
+        self.cache.set_json("k", {"a": 1})
+        assert self.cache.get_json("k") == {"a": 1}
+        assert self.cache.get_json("missing") is None
+    
+    def test_expired_entries_are_misses(self):
+        """Test ttl expiry"""
+        self.cache.set_json("k", {"a": 1}, ttl=-1)
+        assert self.cache.get_json("k") is None
+    
+    def test_lease_is_exclusive(self):
+        """Test only one owner can hold a lease"""
+        other = SharedCache(self.db_path)
+        assert self.cache.try_acquire("k")
+        assert not other.try_acquire("k")
+        self.cache.release("k")
+        assert other.try_acquire("k")
+    
+    def test_expired_lease_can_be_taken_over(self):
+        """Test a crashed owner's lease expires"""
+        other = SharedCache(self.db_path)
+        assert self.cache.try_acquire("k", ttl=-1)
+        assert other.try_acquire("k")
+    
+    def test_none_result_not_cached(self):
+        """Test unavailable results are not cached"""
+        assert self.cache.get_or_compute("k", lambda: None) is None
+        assert self.cache.get_or_compute("k", lambda: {"v": 2}) == {"v": 2}
+    
+    def test_failed_compute_releases_lease(self):
+        """Test a failing owner lets the next caller compute"""
+        def boom():
+            raise RuntimeError("upstream down")
+        
+        with pytest.raises(RuntimeError):
+            self.cache.get_or_compute("k", boom)
+        assert self.cache.get_or_compute("k", lambda: {"v": 1}) == {"v": 1}
+    
+    def test_threads_compute_once(self):
+        """Test concurrent threads in one worker share a single computation"""
+        calls = []
+        results = []
+        
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return {"v": 1}
+        
+        threads = [
+            threading.Thread(target=lambda: results.append(self.cache.get_or_compute("k", compute)))
+            for _ in range(5)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        
+        assert len(calls) == 1
+        assert results == [{"v": 1}] * 5
+    
+    def test_slow_compute_outlasting_the_lease_runs_once(self):
+        """Test the owner renews its lease so waiters don't start a second generation"""
+        other = SharedCache(self.db_path)
+        other.poll_interval = 0.02
+        for cache in (self.cache, other):
+            cache.lease_ttl = 0.15
+        calls = []
+        results = []
+        
+        def compute():
+            calls.append(1)
+            time.sleep(0.6)
+            return {"v": 1}
+        
+        owner = threading.Thread(target=lambda: results.append(self.cache.get_or_compute("slow", compute)))
+        owner.start()
+        time.sleep(0.05)
+        results.append(other.get_or_compute("slow", compute))
+        owner.join()
+        
+        assert len(calls) == 1
+        assert results == [{"v": 1}] * 2
+    
+    def test_processes_compute_once(self, tmp_path):
+        """Test separate worker processes generate a video once per host"""
+        counter_path = str(tmp_path / "calls")
+        results = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(target=_worker, args=(self.db_path, counter_path, results))
+            for _ in range(4)
+        ]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join(timeout=30)
+        
+        assert [results.get(timeout=5) for _ in workers] == [{"summary": "generated"}] * 4
+        with open(counter_path) as f:
+            assert f.read() == "x"
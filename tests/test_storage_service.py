@@ -0,0 +1,110 @@
+"""
+Unit tests for the materials store
+"""
+import pytest
+from services.segment_store import TranscriptSegments
+from services.storage_service import MaterialsStore
+
+
+def _response(title, summary, key_points=None, notes=None):
+    return {
+        "summary": summary,
+        "key_points": key_points or ["Point"] * 5,
+        "notes": notes or ["Note"] * 5,
+        "quiz": [],
+        "video_title": title,
+        "duration": "N/A",
+    }
+
+
+class TestMaterialsStore:
+    """Test cases for MaterialsStore"""
+    
+    @pytest.fixture(autouse=True)
+    def setup_store(self, tmp_path):
+        """Setup a fresh store per test"""
+        self.store = MaterialsStore(str(tmp_path / "materials.db"))
+    
+    def test_save_and_get_by_video_id(self):
+        """Test stored payload round-trips"""
+        response = _response("Intro to Python", "Python is a language.")
+        self.store.save("abc123", "transcript text", response, "0:10:00")
+        
+        stored = self.store.get_by_video_id("abc123")
+        assert stored["response"] == response
+        assert stored["transcript"] == "transcript text"
+        assert stored["duration"] == "0:10:00"
+        assert stored["content_hash"] == MaterialsStore.content_hash("transcript text")
+    
+    def test_get_by_content_hash(self):
+        """Test lookup by transcript hash"""
+        self.store.save("abc123", "same text", _response("T", "S"))
+        stored = self.store.get_by_content_hash(MaterialsStore.content_hash("same text"))
+        assert stored["video_id"] == "abc123"
+        assert self.store.get_by_content_hash("missing") is None
+    
+    def test_save_replaces_existing_video(self):
+        """Test re-saving a video updates its search index"""
+        self.store.save("abc123", "t", _response("Old title", "Gradient descent"))
+        self.store.save("abc123", "t", _response("New title", "Backpropagation"))
+        
+        assert self.store.search("gradient")["results"] == []
+        results = self.store.search("backpropagation")["results"]
+        assert [r["video_id"] for r in results] == ["abc123"]
+    
+    def test_search_ranks_title_matches_first(self):
+        """Test title hits outrank note hits"""
+        self.store.save("notes", "t1", _response("Cooking basics", "Food.", notes=["Neural networks appear once"]))
+        self.store.save("title", "t2", _response("Neural networks explained", "An overview."))
+        
+        results = self.store.search("neural networks")["results"]
+        assert [r["video_id"] for r in results] == ["title", "notes"]
+        assert results[0]["score"] >= results[1]["score"]
+    
+    def test_search_pagination(self):
+        """Test limit/offset paging and has_more flag"""
+        for i in range(5):
+            self.store.save(f"v{i}", f"t{i}", _response(f"Lecture {i}", "Linear algebra"))
+        
+        first = self.store.search("algebra", limit=2, offset=0)
+        last = self.store.search("algebra", limit=2, offset=4)
+        assert len(first["results"]) == 2 and first["has_more"]
+        assert len(last["results"]) == 1 and not last["has_more"]
+    
+    def test_search_ignores_fts_syntax(self):
+        """Test user input cannot inject FTS5 operators"""
+        self.store.save("v1", "t", _response("Title", "Summary"))
+        assert self.store.search('NEAR( "unterminated')["results"] == []
+        assert self.store.search("!!!")["results"] == []
+    
+    def test_search_prefix_matches_last_word(self):
+        """Test search-as-you-type prefix matching"""
+        self.store.save("v1", "t", _response("Photosynthesis", "Plants"))
+        assert self.store.search("photosyn")["results"][0]["video_id"] == "v1"
+    
+    def test_search_snippet_is_plain_text_with_offsets(self):
+        """Test user-supplied markup is returned verbatim and matches come back as offsets"""
+        title = "<img src=x onerror=alert(1)> Entropy \x02lecture\x03"
+        self.store.save("v1", "t", _response(title, "Entropy in thermodynamics"))
+        
+        [result] = self.store.search("entropy")["results"]
+        assert "<b>" not in result["snippet"]
+        assert "\x02" not in result["snippet"] and "\x03" not in result["snippet"]
+        assert "<img src=x onerror=alert(1)>" in result["snippet"]
+        assert [result["snippet"][start:end] for start, end in result["highlights"]] == ["Entropy"]
+    
+    def test_segments_round_trip(self):
+        """Test timestamped segments are stored alongside the transcript"""
+        segments = TranscriptSegments.from_entries([
+            {"text": "first", "start": 0.0, "duration": 1.0},
+            {"text": "second", "start": 1.0, "duration": 1.0},
+        ])
+        self.store.save("abc123", segments.text, _response("T", "S"), segments=segments)
+        
+        restored = self.store.get_segments("abc123")
+        assert restored.text == "first second"
+        assert list(restored.starts) == [0.0, 1.0]
+        assert self.store.get_by_video_id("abc123")["segments"].text == "first second"
+        
+        self.store.save("plain", "no timing", _response("T", "S"))
+        assert self.store.get_segments("plain") is None
@@ -1,7 +1,12 @@
 """
 Unit tests for transcript service
 """
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
+from youtube_transcript_api._errors import TranscriptsDisabled
 from services.transcript_service import TranscriptService
 
 
@@ -65,3 +70,120 @@ class TestTranscriptService:
         
         assert len(truncated) <= self.service.MAX_TOKENS * 4
         assert truncated.endswith("...")
+    
+    def test_build_segments_keeps_timestamps(self):
+        """Test cleaned segments keep their start times"""
+        transcript = [
+            {"text": "[Applause]", "start": 0.0, "duration": 1.0},
+            {"text": "Hello   world", "start": 1.0, "duration": 2.0},
+            {"text": "Test content", "start": 3.0, "duration": 2.0}
+        ]
+        segments = self.service._build_segments(transcript)
+        assert segments.text == "Hello world Test content"
+        assert list(segments.starts) == [1.0, 3.0]
+        assert segments.text_at_time(3.5) == "Test content"
+    
+    def test_get_transcript_fetches_metadata_concurrently(self, monkeypatch):
+        """Test the metadata round trip overlaps the transcript fetch (fake upstream latency)"""
+        latency = 0.2
+        
+        def slow_transcript(video_id, languages=('en',)):
+            time.sleep(latency)
+            return [{"text": "Hello world", "start": 0.0, "duration": 1.0}]
+        
+        def slow_metadata(video_id):
+            time.sleep(latency)
+            return {"title": "Fake Video", "duration": "0:01:00"}
+        
+        self.service.youtube_api_key = "fake-key"
+        monkeypatch.setattr(self.service, "_fetch_transcript_entries", slow_transcript)
+        monkeypatch.setattr(self.service, "get_video_metadata", slow_metadata)
+        
+        start = time.monotonic()
+        result = self.service.get_transcript("https://www.youtube.com/watch?v=dQw4w9WgXcQ")
+        elapsed = time.monotonic() - start
+        
+        assert result["title"] == "Fake Video"
+        assert result["text"] == "Hello world"
+        # Sequential would take 2 * latency
+        assert elapsed < latency * 1.5
+    
+    def test_get_transcript_does_not_wait_for_metadata_when_unavailable(self, monkeypatch):
+        """Test a missing transcript returns at once; a running metadata lookup is left to finish"""
+        started = threading.Event()
+        
+        def slow_metadata(video_id):
+            started.set()
+            time.sleep(0.5)
+            return {"title": "T", "duration": "1:00"}
+        
+        def no_transcript(video_id, languages=('en',)):
+            started.wait(1)
+            raise TranscriptsDisabled(video_id)
+        
+        self.service.youtube_api_key = "fake-key"
+        monkeypatch.setattr(self.service, "_fetch_transcript_entries", no_transcript)
+        monkeypatch.setattr(self.service, "get_video_metadata", slow_metadata)
+        
+        start = time.monotonic()
+        assert self.service.get_transcript("https://youtu.be/dQw4w9WgXcQ") is None
+        assert time.monotonic() - start < 0.4
+    
+    def test_slow_metadata_falls_back_to_default_title(self, monkeypatch):
+        """Test a hung metadata lookup can't hold up the transcript past the YouTube timeout"""
+        from config import settings
+        
+        monkeypatch.setattr(settings, "YOUTUBE_TIMEOUT_SECONDS", 0.1)
+        self.service.youtube_api_key = "fake-key"
+        monkeypatch.setattr(self.service, "_fetch_transcript_entries",
+                            lambda video_id, languages=('en',): [{"text": "hello there", "start": 0.0, "duration": 2.0}])
+        monkeypatch.setattr(self.service, "get_video_metadata", lambda video_id: time.sleep(1))
+        
+        start = time.monotonic()
+        result = self.service.get_transcript("https://youtu.be/dQw4w9WgXcQ")
+        assert time.monotonic() - start < 0.5
+        assert result["title"] == "YouTube Video"
+        assert result["text"] == "hello there"
+    
+    def test_data_api_client_has_a_timeout(self, monkeypatch):
+        """Test the YouTube Data API client is built with an HTTP timeout"""
+        from config import settings
+        from services import transcript_service
+        
+        built = {}
+        monkeypatch.setattr(transcript_service, "build", lambda *args, **kwargs: built.update(kwargs))
+        self.service._youtube_client()
+        assert built["http"].timeout == settings.YOUTUBE_TIMEOUT_SECONDS
+    
+    def test_get_transcript_drops_queued_metadata_when_unavailable(self, monkeypatch):
+        """Test a metadata lookup that hasn't started yet is dropped when there is no transcript"""
+        metadata_calls = []
+        release = threading.Event()
+        
+        def no_transcript(video_id, languages=('en',)):
+            raise TranscriptsDisabled(video_id)
+        
+        self.service.youtube_api_key = "fake-key"
+        self.service._metadata_executor = ThreadPoolExecutor(max_workers=1)
+        # Occupy the only metadata worker so the lookup is still queued
+        self.service._metadata_executor.submit(release.wait)
+        monkeypatch.setattr(self.service, "_fetch_transcript_entries", no_transcript)
+        monkeypatch.setattr(self.service, "get_video_metadata", lambda vid: metadata_calls.append(vid))
+        
+        assert self.service.get_transcript("https://youtu.be/dQw4w9WgXcQ") is None
+        release.set()
+        self.service._metadata_executor.shutdown(wait=True)
+        assert metadata_calls == []
+    
+    def test_transcript_source_url_serves_transcript_and_metadata(self):
+        """Test a configured transcript source replaces YouTube, e.g. the load-test stand-in"""
+        from benchmarks.fake_upstreams import FakeConfig, FakeUpstreams
+        upstreams = FakeUpstreams(FakeConfig(youtube_latency_ms=0, transcript_words=100)).start()
+        try:
+            self.service.source_url = upstreams.url
+            result = self.service.get_transcript("https://www.youtube.com/watch?v=lecture42")
+            assert result["title"] == "Lecture lecture42"
+            assert len(result["text"].split()) == 100
+            assert self.service.get_transcript("https://www.youtube.com/watch?v=missing1") is None
+        finally:
+            upstreams.stop()
@@ -0,0 +1,164 @@
+"""
+Unit tests for the token usage ledger
+"""
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from services.openai_service import OpenAIService
+from services.usage_ledger import BudgetExceededError, UsageLedger, set_usage_context
+
+
+class TestUsageLedger:
+    """Test cases for UsageLedger"""
+
+    @pytest.fixture(autouse=True)
+    def setup_ledger(self, tmp_path):
+        """Setup a fresh ledger per test"""
+        self.ledger = UsageLedger(str(tmp_path / "usage.db"))
+        yield
+        self.ledger.close()
+
+    def test_records_are_aggregated_per_client_and_day(self):
+        """Test usage is summed per client with cache hits counted separately"""
+        self.ledger.record("m", 100, 50, 200.0, client_id="alice", endpoint="/process-video")
+        self.ledger.record("m", 10, 5, 100.0, client_id="alice", endpoint="/videos/{video_id}/ask")
+        self.ledger.record("m", 0, 0, 0.0, cache_status="hit", client_id="alice", endpoint="/process-video")
+        self.ledger.record("m", 7, 3, 50.0, client_id="bob", endpoint="/process-video")
+        self.ledger.flush()
+
+        rows = {row["client_id"]: row for row in self.ledger.usage()}
+        assert rows["alice"]["calls"] == 3
+        assert rows["alice"]["cache_hits"] == 1
+        assert rows["alice"]["total_tokens"] == 165
+        assert rows["alice"]["avg_latency_ms"] == pytest.approx(150.0)
+        assert rows["bob"]["total_tokens"] == 10
+        assert [row["client_id"] for row in self.ledger.usage(client_id="bob")] == ["bob"]
+
+    def test_attribution_comes_from_usage_context(self):
+        """Test calls are attributed to the client set for the current request"""
+        def request():
+            set_usage_context("carol", "/process-transcript", "vid1")
+            self.ledger.record("m", 1, 1, 1.0)
+
+        thread = threading.Thread(target=request)
+        thread.start()
+        thread.join()
+        self.ledger.flush()
+
+        row = self.ledger._conn().execute("SELECT client_id, endpoint, video_id FROM llm_calls").fetchone()
+        assert tuple(row) == ("carol", "/process-transcript", "vid1")
+
+    def test_budget_counts_unflushed_usage(self):
+        """Test the budget check sees calls still waiting to be written"""
+        self.ledger.set_budget("dave", 100)
+        self.ledger.check_budget("dave")
+
+        self.ledger.record("m", 80, 30, 10.0, client_id="dave")
+        with pytest.raises(BudgetExceededError):
+            self.ledger.check_budget("dave")
+
+        self.ledger.flush()
+        with pytest.raises(BudgetExceededError):
+            self.ledger.check_budget("dave")
+        assert self.ledger.used_today("dave") == 110
+
+    def test_writer_survives_a_failed_write(self, monkeypatch):
+        """Test a transient write error is retried instead of killing the writer thread"""
+        self.ledger.flush_interval = 0.05
+        write = self.ledger._write
+        calls = []
+
+        def flaky_write(batch):
+            calls.append(len(batch))
+            if len(calls) == 1:
+                raise sqlite3.OperationalError("database is locked")
+            write(batch)
+
+        monkeypatch.setattr(self.ledger, "_write", flaky_write)
+        self.ledger.record("m", 10, 5, 1.0, client_id="gina")
+        self.ledger.flush()
+
+        assert self.ledger._writer.is_alive()
+        assert len(calls) >= 2
+        self.ledger.record("m", 1, 1, 1.0, client_id="gina")
+        self.ledger.flush()
+        assert self.ledger.usage(client_id="gina")[0]["prompt_tokens"] == 11
+
+    def test_removing_budget_makes_client_unlimited(self):
+        """Test a removed budget no longer blocks calls"""
+        self.ledger.set_budget("erin", 1)
+        self.ledger.record("m", 5, 5, 1.0, client_id="erin")
+        self.ledger.set_budget("erin", None)
+
+        self.ledger.check_budget("erin")
+        assert self.ledger.get_budget("erin") is None
+
+    def test_openai_service_checks_budget_and_records_usage(self):
+        """Test LLM calls are blocked once over budget and recorded otherwise"""
+        service = OpenAIService(usage_ledger=self.ledger)
+        calls = []
+
+        def create(**kwargs):
+            calls.append(kwargs)
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=SimpleNamespace(content="An answer"))],
+                usage=SimpleNamespace(prompt_tokens=40, completion_tokens=20)
+            )
+
+        service.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        self.ledger.set_budget("frank", 50)
+        set_usage_context("frank", "/videos/{video_id}/ask")
+
+        assert service.answer_question("Why?", ["passage"], "Title") == "An answer"
+        with pytest.raises(BudgetExceededError):
+            service.answer_question("Why?", ["passage"], "Title")
+        assert len(calls) == 1
+
+        self.ledger.flush()
+        assert self.ledger.used_today("frank") == 60
+
+    def test_cached_prompt_tokens_recorded_after_migrating_old_ledger(self, tmp_path):
+        """Test a ledger created before cached_tokens existed gains the column"""
+        path = str(tmp_path / "old.db")
+        conn = sqlite3.connect(path)
+        conn.executescript(UsageLedger.SCHEMA.replace(",\n        cached_tokens INTEGER NOT NULL DEFAULT 0", ""))
+        conn.execute(
+            "INSERT INTO llm_calls (ts, day, client_id, endpoint, model, prompt_tokens, completion_tokens, "
+            "latency_ms, cache_status) VALUES (?, ?, 'old', '/x', 'm', 10, 1, 1.0, 'miss')",
+            (time.time(), time.strftime("%Y-%m-%d", time.gmtime()))
+        )
+        conn.commit()
+        conn.close()
+
+        ledger = UsageLedger(path)
+        ledger.record("m", 100, 5, 10.0, client_id="old", endpoint="/x", cached_tokens=80)
+        ledger.flush()
+        [row] = ledger.usage(client_id="old")
+        ledger.close()
+        assert row["prompt_tokens"] == 110
+        assert row["cached_prompt_tokens"] == 80
+
+    def test_provider_prompt_cache_hits_are_recorded(self, monkeypatch):
+        """Test cached prompt tokens reported by the provider reach the ledger, with cache hints on"""
+        from benchmarks.fake_upstreams import FakeConfig, FakeUpstreams
+        from config import settings
+        upstreams = FakeUpstreams(FakeConfig(latency_ms=0, tokens_per_second=0)).start()
+        monkeypatch.setattr(settings, "GROQ_BASE_URL", upstreams.url)
+        monkeypatch.setattr(settings, "GROQ_API_KEY", "fake")
+        monkeypatch.setattr(settings, "PROMPT_CACHE_HINTS", True)
+        try:
+            service = OpenAIService(usage_ledger=self.ledger)
+            set_usage_context("carol", "/videos/{video_id}/ask")
+            passages = ["A long passage about gradient descent. " * 40]
+            service.answer_question("Why?", passages, "Title")
+            service.answer_question("How?", passages, "Title")
+        finally:
+            upstreams.stop()
+
+        self.ledger.flush()
+        [row] = self.ledger.usage(client_id="carol")
+        assert row["calls"] == 2
+        assert 0 < row["cached_prompt_tokens"] < row["prompt_tokens"] / 2